@@ -3,23 +3,44 @@
 集成智谱AI GLM-4.6V-Flash 图像识别
 支持单食物和多食物识别
 支持AI识别失败后的食物分类选择备选流程
+
+数据库会话是同步的，任何数据库访问都不在事件循环中执行：
+- 只读接口声明为普通 def，由 FastAPI 在线程池中执行
+- 需要等待 AI 识别的 async 接口通过 run_in_threadpool 访问数据库
+- 写入记录通过 run_db_write 在限流的写线程中执行，写入高峰不会占满线程池；
+  开启组提交（RECORD_GROUP_COMMIT）时由 record_writer 合并提交
+
+识别接口在请求截止时间（X-Request-Timeout-Ms）内返回，客户端断开连接时取消识别；
+也可以提交异步识别任务（/analyze/jobs），通过轮询或 SSE 获取结果
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import Optional, List, Dict
+from typing import Any, Awaitable, Callable, Optional, List, Dict
 from datetime import datetime, date, timedelta
+import asyncio
+import functools
 import logging
 import os
 
-from ..models.database import get_db
+from ..models.database import SessionLocal, get_db, run_db_write
 from ..models.visual_portion import VisualPortion
 from ..models.meal_record import MealRecord
 from ..models.daily_goal import DailyGoal
+from ..models.daily_total import DailyTotal
+from ..models.idempotency_key import IdempotencyKey, IdempotencyKeyReused
+from ..config.timezone import local_today
 from ..services.ai_service import AIService, GLMError
 from ..services.portion_service import PortionService
-from ..data.extended_food_database import EXTENDED_FOOD_DATABASE, FOOD_CATEGORIES
-from pydantic import BaseModel
+from ..services.knowledge_index import get_knowledge_index
+from ..services.food_search import food_search_index
+from ..services.record_writer import record_writer
+from ..services.food_catalog import FoodEntry, food_catalog
+from ..services.deadline import Deadline
+from ..services.recognition_jobs import JobFailed, JobQueueFull, RecognitionJob, recognition_jobs
+from pydantic import BaseModel, Field
 
 
 # 配置日志
@@ -42,6 +63,18 @@ class AnalyzeImageRequest(BaseModel):
     multi_food: bool = False  # 是否支持多食物识别
 
 
+class PortionOption(BaseModel):
+    id: int
+    food_name: str
+    portion_name: str
+    weight_grams: float
+    calories: float
+    protein: float
+
+    class Config:
+        from_attributes = True
+
+
 class FoodRecognitionItem(BaseModel):
     """单个食物识别结果"""
     food_name: str
@@ -61,16 +94,15 @@ class MultiFoodAnalyzeResponse(BaseModel):
     ai_used: bool = False
 
 
-class PortionOption(BaseModel):
-    id: int
-    food_name: str
-    portion_name: str
-    weight_grams: float
-    calories: float
-    protein: float
-
-    class Config:
-        from_attributes = True
+class RecognitionJobResponse(BaseModel):
+    """异步识别任务状态"""
+    job_id: str
+    status: str  # queued / running / succeeded / failed
+    multi_food: bool
+    result: Optional[Dict] = None  # 成功时为 AnalyzeImageResponse 或 MultiFoodAnalyzeResponse
+    error: Optional[Dict] = None   # 失败时的错误信息（格式同识别接口的错误详情）
+    created_at: datetime
+    updated_at: datetime
 
 
 class CreateRecordRequest(BaseModel):
@@ -103,6 +135,22 @@ class DailyBalanceResponse(BaseModel):
     suggestions: list = []  # 智能建议列表
 
 
+class BatchRecordItem(BaseModel):
+    food_name: str
+    visual_portion_id: int
+
+
+class BatchRecordRequest(BaseModel):
+    """一餐多食物批量记录（同一张图片）"""
+    image_url: str
+    items: List[BatchRecordItem] = Field(..., min_length=1, max_length=50)
+
+
+class BatchRecordResponse(BaseModel):
+    records: List[MealRecordResponse]
+    balance: DailyBalanceResponse  # 写入后的今日余额
+
+
 class SuggestionItem(BaseModel):
     id: int
     food_name: str
@@ -181,115 +229,69 @@ async def get_food_categories():
     获取所有食物分类
     用于AI识别失败后的手动选择界面
     """
-    categories = [
-        CategoryInfo(
-            key=key,
-            name=info["name"],
-            icon=info["icon"],
-            description=info["description"]
-        )
-        for key, info in FOOD_CATEGORIES.items()
-    ]
+    categories = [CategoryInfo(**spec._asdict()) for spec in food_catalog.categories.values()]
 
     return FoodCategoryListResponse(categories=categories)
 
 
 @router.get("/foods-by-category/{category_key}", response_model=FoodsByCategoryResponse)
-async def get_foods_by_category(category_key: str, db: Session = Depends(get_db)):
+def get_foods_by_category(category_key: str, db: Session = Depends(get_db)):
     """
     获取指定分类下的所有食物
     用于AI识别失败后的手动选择界面
     """
     # 验证分类是否存在
-    if category_key not in FOOD_CATEGORIES:
+    category_spec = food_catalog.categories.get(category_key)
+    if category_spec is None:
         raise HTTPException(status_code=404, detail=f"分类「{category_key}」不存在")
 
-    category_info = FOOD_CATEGORIES[category_key]
-
-    # 获取该分类下的所有食物
-    foods = []
-    for food_name, food_data in EXTENDED_FOOD_DATABASE.items():
-        if food_data["category"] == category_key:
-            # 检查数据库中是否有份量数据
-            portions = db.query(VisualPortion).filter(
-                VisualPortion.food_name == food_name
-            ).all()
-
-            foods.append(FoodItemInfo(
-                name=food_name,
-                category=category_key,
-                aliases=food_data["aliases"],
-                calories_per_100g=food_data["calories_per_100g"],
-                protein_per_100g=food_data["protein_per_100g"],
-                portion_count=len(portions) if portions else 0
-            ))
+    # 获取该分类下的所有食物（份量数量来自知识索引，无需逐个查询）
+    knowledge_index = get_knowledge_index(db)
+    foods = [
+        _build_food_item_info(entry, knowledge_index)
+        for entry in food_catalog.foods_in(category_key)
+    ]
 
     # 按热量排序
     foods.sort(key=lambda f: f.calories_per_100g)
 
     return FoodsByCategoryResponse(
-        category=CategoryInfo(
-            key=category_key,
-            name=category_info["name"],
-            icon=category_info["icon"],
-            description=category_info["description"]
-        ),
+        category=CategoryInfo(**category_spec._asdict()),
         foods=foods
     )
 
 
 @router.get("/food-search", response_model=List[FoodItemInfo])
-async def search_foods(q: str, db: Session = Depends(get_db)):
+def search_foods(q: str, db: Session = Depends(get_db)):
     """
     搜索食物
-    支持按名称或别名模糊搜索
+    支持按名称、别名或拼音首字母搜索，结果按相关度排序
     """
     if not q or len(q) < 1:
         return []
 
-    q_lower = q.lower()
-    results = []
-
-    for food_name, food_data in EXTENDED_FOOD_DATABASE.items():
-        # 检查名称是否匹配
-        if q_lower in food_name.lower():
-            portions = db.query(VisualPortion).filter(
-                VisualPortion.food_name == food_name
-            ).all()
-
-            results.append(FoodItemInfo(
-                name=food_name,
-                category=food_data["category"],
-                aliases=food_data["aliases"],
-                calories_per_100g=food_data["calories_per_100g"],
-                protein_per_100g=food_data["protein_per_100g"],
-                portion_count=len(portions) if portions else 0
-            ))
-            continue
+    knowledge_index = get_knowledge_index(db)
 
-        # 检查别名是否匹配
-        for alias in food_data["aliases"]:
-            if q_lower in alias.lower():
-                portions = db.query(VisualPortion).filter(
-                    VisualPortion.food_name == food_name
-                ).all()
+    return [
+        _build_food_item_info(food_catalog.get(hit.food_name), knowledge_index)
+        for hit in food_search_index.search(q, limit=20)
+    ]
 
-                results.append(FoodItemInfo(
-                    name=food_name,
-                    category=food_data["category"],
-                    aliases=food_data["aliases"],
-                    calories_per_100g=food_data["calories_per_100g"],
-                    protein_per_100g=food_data["protein_per_100g"],
-                    portion_count=len(portions) if portions else 0
-                ))
-                break
 
-    # 限制返回数量
-    return results[:20]
+def _build_food_item_info(entry: FoodEntry, knowledge_index) -> FoodItemInfo:
+    """构建食物项信息，份量数量从知识索引读取"""
+    return FoodItemInfo(
+        name=entry.name,
+        category=entry.category,
+        aliases=list(entry.aliases),
+        calories_per_100g=entry.calories_per_100g,
+        protein_per_100g=entry.protein_per_100g,
+        portion_count=knowledge_index.portion_count(entry.name)
+    )
 
 
 @router.get("/portions/{food_name}", response_model=AnalyzeImageResponse)
-async def get_portions_by_food_name(food_name: str, db: Session = Depends(get_db)):
+def get_portions_by_food_name(food_name: str, db: Session = Depends(get_db)):
     """
     根据食物名称直接获取份量选项（无需AI识别）
     用于用户手动选择食物后的备选流程
@@ -318,8 +320,55 @@ async def get_portions_by_food_name(food_name: str, db: Session = Depends(get_db
     )
 
 
+# 客户端已断开连接（沿用 nginx 的 499 状态码，客户端实际收不到响应）
+CLIENT_CLOSED_REQUEST = 499
+
+
+async def _wait_for_disconnect(http_request: Request):
+    """等待客户端断开连接（请求体已读取完，之后只会收到 http.disconnect）"""
+    while (await http_request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _run_until_disconnect(http_request: Request, work: Awaitable[Any]) -> Any:
+    """
+    执行识别流程，客户端断开连接（如前端超时放弃）时立即取消
+
+    取消会一直传递到进行中的 GLM 请求（没有其他等待者时），不再为已离开的客户端等待结果
+    """
+    work_task = asyncio.ensure_future(work)
+    disconnect_task = asyncio.ensure_future(_wait_for_disconnect(http_request))
+    try:
+        await asyncio.wait({work_task, disconnect_task}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        disconnect_task.cancel()
+        if not work_task.done():
+            work_task.cancel()
+
+    if not work_task.cancelled():
+        await asyncio.wait({work_task})
+        if not work_task.cancelled():
+            return work_task.result()
+    logger.info("客户端已断开连接，取消识别")
+    return Response(status_code=CLIENT_CLOSED_REQUEST)
+
+
+def _check_deadline(deadline: Deadline):
+    """截止时间已过（客户端已放弃）时不再查询数据库"""
+    if deadline.expired:
+        raise HTTPException(
+            status_code=504,
+            detail={"message": "识别超时，请重试", "code": "DEADLINE_EXCEEDED"}
+        )
+
+
 @router.post("/analyze", response_model=AnalyzeImageResponse)
-async def analyze_image(request: AnalyzeImageRequest, db: Session = Depends(get_db)):
+async def analyze_image(
+    request: AnalyzeImageRequest,
+    http_request: Request,
+    db: Session = Depends(get_db),
+    x_request_timeout_ms: Optional[str] = Header(None, max_length=20)
+):
     """
     分析食物图片（单食物）
 
@@ -331,10 +380,19 @@ async def analyze_image(request: AnalyzeImageRequest, db: Session = Depends(get_
     降级机制：
     - 如果 GLM_API_KEY 未配置，自动降级到模拟识别
     - 如果 GLM 调用失败（网络错误、限流等），自动降级到模拟识别
+    - 如果 GLM 在请求截止时间（X-Request-Timeout-Ms，默认 ANALYZE_DEADLINE_MS）内没有返回，自动降级到模拟识别
     """
+    deadline = Deadline.from_header(x_request_timeout_ms)
+    return await _run_until_disconnect(http_request, _analyze_single_food(request, db, deadline))
+
+
+async def _analyze_single_food(request: AnalyzeImageRequest, db: Session,
+                               deadline: Deadline) -> AnalyzeImageResponse:
     # AI 识别
     try:
-        food_names, ai_used = await AIService.analyze_image_multi(request.image_base64, multi_food=False)
+        food_names, ai_used = await AIService.analyze_image_multi(
+            request.image_base64, multi_food=False, deadline=deadline
+        )
         food_name = food_names[0] if food_names else AIService.mock_analyze_image(request.image_base64)
         logger.info(f"AI识别结果: {food_name} (使用真实AI: {ai_used})")
     except Exception as e:
@@ -343,27 +401,17 @@ async def analyze_image(request: AnalyzeImageRequest, db: Session = Depends(get_
         food_name = AIService.mock_analyze_image(request.image_base64)
         ai_used = False
 
-    # 查询该食物的份量选项
-    portions = db.query(VisualPortion).filter(
-        VisualPortion.food_name == food_name
-    ).all()
+    _check_deadline(deadline)
+    # 使用 PortionService 获取按PRD排序的份量选项（来自内存知识索引）
+    # 同步的数据库会话只在线程池中使用，避免阻塞事件循环
+    portion_options_data = await run_in_threadpool(
+        PortionService.get_portion_options_for_food, db, food_name
+    )
 
-    if not portions:
+    if not portion_options_data:
         # 根据环境变量控制错误信息详细程度
         logger.warning(f"知识库中暂无「{food_name}」的数据")
-        error_detail = _build_error_detail(food_name, ai_used, db)
-        raise HTTPException(
-            status_code=400 if ENV_MODE == "production" else 404,
-            detail=error_detail
-        )
-
-    # 使用 PortionService 获取按PRD排序的份量选项
-    portion_options_data = PortionService.get_portion_options_for_food(db, food_name)
-
-    if not portion_options_data:
-        # 如果排序后没有结果（不应该发生），返回原始错误
-        logger.warning(f"份量选项为空: {food_name}")
-        error_detail = _build_error_detail(food_name, ai_used, db)
+        error_detail = await run_in_threadpool(_build_error_detail, food_name, ai_used, db)
         raise HTTPException(
             status_code=400 if ENV_MODE == "production" else 404,
             detail=error_detail
@@ -382,16 +430,29 @@ async def analyze_image(request: AnalyzeImageRequest, db: Session = Depends(get_
 
 
 @router.post("/analyze-multi", response_model=MultiFoodAnalyzeResponse)
-async def analyze_multi_food(request: AnalyzeImageRequest, db: Session = Depends(get_db)):
+async def analyze_multi_food(
+    request: AnalyzeImageRequest,
+    http_request: Request,
+    db: Session = Depends(get_db),
+    x_request_timeout_ms: Optional[str] = Header(None, max_length=20)
+):
     """
     分析食物图片（支持多食物识别）
 
     返回图片中识别出的所有食物及其份量选项
-    用户可以选择性地添加到一餐记录中
+    用户可以选择性地添加到一餐记录中；截止时间和断开连接的处理同 /analyze
     """
+    deadline = Deadline.from_header(x_request_timeout_ms)
+    return await _run_until_disconnect(http_request, _analyze_multi_food(request, db, deadline))
+
+
+async def _analyze_multi_food(request: AnalyzeImageRequest, db: Session,
+                              deadline: Deadline) -> MultiFoodAnalyzeResponse:
     # AI 识别（多食物模式）
     try:
-        food_names, ai_used = await AIService.analyze_image_multi(request.image_base64, multi_food=True)
+        food_names, ai_used = await AIService.analyze_image_multi(
+            request.image_base64, multi_food=True, deadline=deadline
+        )
         logger.info(f"多食物AI识别结果: {food_names} (使用真实AI: {ai_used})")
     except Exception as e:
         logger.error(f"多食物AI识别异常: {str(e)}")
@@ -399,22 +460,16 @@ async def analyze_multi_food(request: AnalyzeImageRequest, db: Session = Depends
         food_names = AIService.mock_analyze_multi_image(request.image_base64, count=2)
         ai_used = False
 
-    # 为每个识别的食物获取份量选项
-    food_items = []
-    for food_name in food_names:
-        portion_options_data = PortionService.get_portion_options_for_food(db, food_name)
-
-        if portion_options_data:
-            portion_options = [PortionOption(**option) for option in portion_options_data]
-            food_items.append(FoodRecognitionItem(
-                food_name=food_name,
-                portion_options=portion_options
-            ))
+    _check_deadline(deadline)
+    # 为每个识别的食物获取份量选项（在线程池中访问数据库会话）
+    food_items = await run_in_threadpool(_build_food_recognition_items, db, food_names)
 
     # 如果没有找到任何有效食物
     if not food_items:
         logger.warning(f"多食物识别未找到有效食物: {food_names}")
-        error_detail = _build_error_detail(food_names[0] if food_names else "未知食物", ai_used, db)
+        error_detail = await run_in_threadpool(
+            _build_error_detail, food_names[0] if food_names else "未知食物", ai_used, db
+        )
         raise HTTPException(
             status_code=400 if ENV_MODE == "production" else 404,
             detail=error_detail
@@ -426,6 +481,108 @@ async def analyze_multi_food(request: AnalyzeImageRequest, db: Session = Depends
     )
 
 
+# SSE 心跳间隔（秒），避免代理断开空闲连接
+JOB_EVENTS_HEARTBEAT = 15.0
+
+
+async def run_recognition_job(job: RecognitionJob, deadline: Deadline) -> Dict:
+    """识别任务执行函数（由识别任务工作协程调用），结果格式与同步识别接口相同"""
+    request = AnalyzeImageRequest(image_base64=job.image_base64, multi_food=job.multi_food)
+    analyze = _analyze_multi_food if job.multi_food else _analyze_single_food
+    db = SessionLocal()
+    try:
+        response = await analyze(request, db, deadline)
+    except HTTPException as e:
+        detail = e.detail if isinstance(e.detail, dict) else {"message": str(e.detail)}
+        raise JobFailed({**detail, "status_code": e.status_code})
+    finally:
+        db.close()
+    return response.model_dump(mode="json")
+
+
+def _job_response(job: RecognitionJob) -> RecognitionJobResponse:
+    data = job.to_dict()
+    data["created_at"] = datetime.fromtimestamp(job.created_at)
+    data["updated_at"] = datetime.fromtimestamp(job.updated_at)
+    return RecognitionJobResponse(**data)
+
+
+@router.post("/analyze/jobs", response_model=RecognitionJobResponse, status_code=202)
+async def create_recognition_job(request: AnalyzeImageRequest):
+    """
+    提交异步识别任务，立即返回任务 ID
+
+    识别在后台执行（GLM 不可用时同样降级到模拟识别），结果通过以下方式获取：
+    - 轮询 GET /api/analyze/jobs/{job_id}
+    - 订阅 GET /api/analyze/jobs/{job_id}/events（SSE，状态每次变化推送一次，完成后关闭）
+    """
+    try:
+        job = await recognition_jobs.submit(request.image_base64, request.multi_food)
+    except JobQueueFull:
+        raise HTTPException(
+            status_code=503,
+            detail={"message": "识别任务繁忙，请稍后重试", "code": "JOB_QUEUE_FULL"}
+        )
+    return _job_response(job)
+
+
+@router.get("/analyze/jobs/{job_id}", response_model=RecognitionJobResponse)
+async def get_recognition_job(job_id: str):
+    """查询异步识别任务状态，完成后 result 中包含识别结果和份量选项"""
+    job = await recognition_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="识别任务不存在或已过期")
+    return _job_response(job)
+
+
+@router.get("/analyze/jobs/{job_id}/events")
+async def stream_recognition_job(job_id: str):
+    """
+    以 SSE 推送异步识别任务状态
+
+    事件名为任务状态（queued / running / succeeded / failed），数据同 GET /api/analyze/jobs/{job_id}；
+    任务完成后推送最终状态并关闭连接
+    """
+    if await recognition_jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="识别任务不存在或已过期")
+
+    async def events():
+        version = None
+        while True:
+            job = await recognition_jobs.get(job_id)
+            if job is None:
+                return
+            if job.version != version:
+                version = job.version
+                data = _job_response(job).model_dump_json()
+                yield f"event: {job.status}\ndata: {data}\n\n"
+                if job.finished:
+                    return
+            if not await recognition_jobs.wait_for_change(job_id, version, JOB_EVENTS_HEARTBEAT):
+                yield ": keepalive\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _build_food_recognition_items(db: Session, food_names: List[str]) -> List[FoodRecognitionItem]:
+    """为识别出的每个食物获取份量选项，知识库中没有的食物会被跳过"""
+    food_items = []
+    for food_name in food_names:
+        portion_options_data = PortionService.get_portion_options_for_food(db, food_name)
+
+        if portion_options_data:
+            portion_options = [PortionOption(**option) for option in portion_options_data]
+            food_items.append(FoodRecognitionItem(
+                food_name=food_name,
+                portion_options=portion_options
+            ))
+    return food_items
+
+
 def _build_error_detail(food_name: str, ai_used: bool, db: Session) -> dict:
     """
     根据环境变量构建不同详细程度的错误信息
@@ -451,42 +608,177 @@ def _build_error_detail(food_name: str, ai_used: bool, db: Session) -> dict:
 
 
 @router.post("/records", response_model=MealRecordResponse)
-async def create_record(request: CreateRecordRequest, db: Session = Depends(get_db)):
+async def create_record(
+    request: CreateRecordRequest,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, max_length=200)
+):
     """
     创建饮食记录
     用户选择份量后调用此接口完成记录
+
+    携带 Idempotency-Key 请求头时，相同键的重试直接返回第一次的结果；
+    相同的键用于不同的请求体时返回 422
+    """
+    return await _create_meal_record(
+        db, "records", idempotency_key, request, request.visual_portion_id, request.image_url, request.food_name
+    )
+
+
+async def _create_meal_record(db: Session, endpoint: str, idempotency_key: Optional[str],
+                              request: BaseModel, visual_portion_id: int, image_url: str,
+                              food_name: Optional[str] = None):
+    """
+    写入一条饮食记录
+
+    开启组提交时与同一时间窗口内的其他记录合并提交；
+    携带幂等键的请求不参与组提交，键与记录在同一事务中保存
+    """
+    if idempotency_key or not record_writer.enabled:
+        return await run_db_write(
+            _idempotent_write, db, endpoint, idempotency_key, request,
+            functools.partial(_stage_meal_record, db, visual_portion_id, image_url, food_name)
+        )
+
+    record = await record_writer.submit(visual_portion_id, image_url, food_name)
+    if record is None:
+        raise HTTPException(status_code=404, detail="份量选项不存在")
+    logger.info(f"创建记录: {record.food_name}, {record.calories}大卡")
+    return record
+
+
+def _idempotent_write(db: Session, endpoint: str, idempotency_key: Optional[str],
+                      request: BaseModel, stage: Callable[[], BaseModel]):
+    """
+    执行一次写入并提交（在数据库写线程中执行）
+
+    Args:
+        idempotency_key: 为空时不做幂等处理；已保存过的键直接返回保存的响应
+        request: 请求体，其哈希与幂等键一起保存
+        stage: 暂存写入（不提交）并返回响应
+
+    Raises:
+        HTTPException(422): 幂等键已用于请求体不同的请求
+    """
+    if not idempotency_key:
+        response = stage()
+        db.commit()
+        return response
+
+    request_hash = IdempotencyKey.hash_request(request.model_dump(mode="json"))
+    try:
+        stored = IdempotencyKey.lookup(db, endpoint, idempotency_key, request_hash)
+        if stored is not None:
+            logger.info(f"幂等键重复请求，返回已保存结果: {endpoint} {idempotency_key}")
+            return stored
+
+        response = stage()
+        IdempotencyKey.save(db, endpoint, idempotency_key, response.model_dump(mode="json"), request_hash)
+        try:
+            db.commit()
+        except IntegrityError:
+            # 相同键的并发请求已先提交
+            db.rollback()
+            stored = IdempotencyKey.lookup(db, endpoint, idempotency_key, request_hash)
+            if stored is None:
+                raise
+            return stored
+        return response
+    except IdempotencyKeyReused as e:
+        db.rollback()
+        logger.warning(str(e))
+        raise HTTPException(
+            status_code=422,
+            detail={"message": "幂等键已用于不同的请求", "code": "IDEMPOTENCY_KEY_REUSED"}
+        )
+
+
+def _stage_meal_record(db: Session, visual_portion_id: int, image_url: str,
+                       food_name: Optional[str] = None) -> MealRecordResponse:
+    """
+    暂存一条饮食记录（不提交）
+
+    Args:
+        food_name: 记录的食物名称，为空时使用份量对应的食物名称
     """
     # 查询 VisualPortion
     portion = db.query(VisualPortion).filter(
-        VisualPortion.id == request.visual_portion_id
+        VisualPortion.id == visual_portion_id
     ).first()
 
     if not portion:
         raise HTTPException(status_code=404, detail="份量选项不存在")
 
     # 创建记录（营养数据从 VisualPortion 计算）
-    record = MealRecord(
-        image_url=request.image_url,
-        food_name=request.food_name,
-        visual_portion_id=request.visual_portion_id,
-        calories=portion.get_calories(),
-        protein=portion.get_protein(),
-        record_date=datetime.utcnow()
-    )
+    record = MealRecord.from_portion(portion, image_url, food_name)
     db.add(record)
-    db.commit()
-    db.refresh(record)
+    # 每日汇总与记录在同一事务中更新
+    DailyTotal.add_record(db, record)
+    db.flush()  # 分配 ID，响应直接由内存中的记录生成，无需提交后再读回
 
-    logger.info(f"创建记录: {request.food_name}, {portion.get_calories()}大卡")
-    return record
+    logger.info(f"创建记录: {record.food_name}, {record.calories}大卡")
+    return MealRecordResponse.model_validate(record)
+
+
+@router.post("/records/batch", response_model=BatchRecordResponse)
+async def create_records_batch(
+    request: BatchRecordRequest,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, max_length=200)
+):
+    """
+    批量创建饮食记录
+    多食物识别后一次提交整餐选择的份量，全部成功或全部失败
+    返回创建的记录和写入后的今日余额
+
+    携带 Idempotency-Key 请求头时，相同键的重试直接返回第一次的结果；
+    相同的键用于不同的请求体时返回 422
+    """
+    return await run_db_write(
+        _idempotent_write, db, "records/batch", idempotency_key, request,
+        functools.partial(_stage_meal_records_batch, db, request)
+    )
+
+
+def _stage_meal_records_batch(db: Session, request: BatchRecordRequest) -> BatchRecordResponse:
+    """在同一事务中暂存整餐记录（不提交），余额按事务内的汇总计算"""
+    # 一次查询所有份量选项
+    portion_ids = {item.visual_portion_id for item in request.items}
+    portions = {
+        portion.id: portion
+        for portion in db.query(VisualPortion).filter(VisualPortion.id.in_(portion_ids))
+    }
+    missing = sorted(portion_ids - portions.keys())
+    if missing:
+        raise HTTPException(status_code=404, detail=f"份量选项不存在: {missing}")
+
+    now = datetime.utcnow()
+    records = [
+        MealRecord.from_portion(portions[item.visual_portion_id], request.image_url, item.food_name, now)
+        for item in request.items
+    ]
+    db.add_all(records)
+    DailyTotal.add_records(db, records)
+    db.flush()
+
+    logger.info(f"批量创建记录: {len(records)} 条, {sum(r.calories for r in records)}大卡")
+    return BatchRecordResponse(
+        records=[MealRecordResponse.model_validate(record) for record in records],
+        balance=_build_daily_balance(db)
+    )
 
 
 @router.get("/balance", response_model=DailyBalanceResponse)
-async def get_daily_balance(db: Session = Depends(get_db)):
+def get_daily_balance(db: Session = Depends(get_db)):
     """
     获取今日余额
     返回今日剩余的热量和蛋白质额度，以及智能推荐食物
     """
+    return _build_daily_balance(db)
+
+
+def _build_daily_balance(db: Session) -> DailyBalanceResponse:
+    """计算今日余额和智能建议"""
     # 获取目标
     goal = DailyGoal.get_latest_goal(db)
     if goal:
@@ -496,23 +788,11 @@ async def get_daily_balance(db: Session = Depends(get_db)):
         target_calories = 2000  # 默认值
         target_protein = 120
 
-    # 计算今日已摄入
-    today = date.today()
-    start_of_day = datetime.combine(today, datetime.min.time())
-    end_of_day = datetime.combine(today, datetime.max.time())
-
-    result = db.query(
-        func.sum(MealRecord.calories).label("total_calories"),
-        func.sum(MealRecord.protein).label("total_protein"),
-        func.count(MealRecord.id).label("meals_count")
-    ).filter(
-        MealRecord.record_date >= start_of_day,
-        MealRecord.record_date <= end_of_day
-    ).first()
-
-    consumed_calories = result.total_calories or 0
-    consumed_protein = result.total_protein or 0
-    meals_count = result.meals_count or 0
+    # 今日已摄入（读取每日汇总）
+    today_total = DailyTotal.get_day(db, local_today())
+    consumed_calories = today_total.calories if today_total else 0
+    consumed_protein = today_total.protein if today_total else 0
+    meals_count = today_total.meals_count if today_total else 0
 
     remaining_calories = max(0, target_calories - consumed_calories)
     remaining_protein = max(0, target_protein - consumed_protein)
@@ -533,7 +813,7 @@ async def get_daily_balance(db: Session = Depends(get_db)):
 
 
 @router.get("/progress", response_model=ProgressResponse)
-async def get_progress(
+def get_progress(
     range: Optional[str] = "all",
     db: Session = Depends(get_db)
 ):
@@ -549,7 +829,7 @@ async def get_progress(
         target_calories = 2000
 
     # 确定日期范围
-    end_date = date.today()
+    end_date = local_today()
     if range == "week":
         start_date = end_date - timedelta(days=7)
     elif range == "month":
@@ -557,16 +837,8 @@ async def get_progress(
     else:  # all
         start_date = date.min
 
-    # 查询记录
-    records = db.query(
-        func.date(MealRecord.record_date).label("date"),
-        func.sum(MealRecord.calories).label("calories")
-    ).filter(
-        MealRecord.record_date >= datetime.combine(start_date, datetime.min.time()),
-        MealRecord.record_date <= datetime.combine(end_date, datetime.max.time())
-    ).group_by(
-        func.date(MealRecord.record_date)
-    ).all()
+    # 查询每日汇总
+    records = DailyTotal.get_range(db, start_date, end_date)
 
     # 计算每日缺口和累计
     total_deficit = 0
@@ -578,7 +850,7 @@ async def get_progress(
         total_deficit += daily_deficit
 
         data_points.append({
-            "date": record.date.isoformat(),
+            "date": record.day.isoformat(),
             "calorie_deficit": round(daily_deficit, 2),
             "consumed_calories": round(daily_intake, 2)
         })
@@ -596,7 +868,7 @@ async def get_progress(
 
 
 @router.post("/goals", response_model=GoalResponse)
-async def set_goal(request: SetGoalRequest, db: Session = Depends(get_db)):
+def set_goal(request: SetGoalRequest, db: Session = Depends(get_db)):
     """
     设置每日目标
     新目标会覆盖旧目标
@@ -633,7 +905,7 @@ async def set_goal(request: SetGoalRequest, db: Session = Depends(get_db)):
 
 
 @router.get("/goals", response_model=Optional[GoalResponse])
-async def get_current_goal(db: Session = Depends(get_db)):
+def get_current_goal(db: Session = Depends(get_db)):
     """获取当前目标"""
     return DailyGoal.get_latest_goal(db)
 
@@ -650,6 +922,7 @@ def _generate_suggestions(db: Session, remaining_calories: float, remaining_prot
     - 剩余 > 100kcal: 推荐蔬菜沙拉等低热量食物
     """
     suggestions = []
+    knowledge_index = get_knowledge_index(db)
 
     # 定义推荐规则：(最小热量, 食物名称, 份量名称, 推荐理由)
     recommendation_rules = [
@@ -670,13 +943,11 @@ def _generate_suggestions(db: Session, remaining_calories: float, remaining_prot
 
     for min_calories, food_name, portion_desc, reason in recommendation_rules:
         if remaining_calories >= min_calories:
-            # 查询数据库中该食物的最小份量选项
-            portion = db.query(VisualPortion).filter(
-                VisualPortion.food_name == food_name
-            ).order_by(VisualPortion.calories_per_100g.asc()).first()
+            # 从知识索引中取该食物的首个份量选项
+            portion = knowledge_index.first_portion(food_name)
 
             if portion:
-                calories = portion.get_calories()
+                calories = portion.calories
                 # 确保推荐的食物热量不超过剩余额度
                 if calories <= remaining_calories:
                     suggestions.append({
@@ -684,7 +955,7 @@ def _generate_suggestions(db: Session, remaining_calories: float, remaining_prot
                         "food_name": food_name,
                         "portion_name": portion.portion_name,
                         "calories": round(calories, 1),
-                        "protein": round(portion.get_protein(), 1),
+                        "protein": round(portion.protein, 1),
                         "reason": reason
                     })
 
@@ -716,31 +987,14 @@ class QuickRecordRequest(BaseModel):
 
 
 @router.post("/quick-record", response_model=MealRecordResponse)
-async def create_quick_record(request: QuickRecordRequest, db: Session = Depends(get_db)):
+async def create_quick_record(
+    request: QuickRecordRequest,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, max_length=200)
+):
     """
     快速记录 - 无需拍照
     用于智能建议的快捷记录功能
     """
-    # 查询 VisualPortion
-    portion = db.query(VisualPortion).filter(
-        VisualPortion.id == request.visual_portion_id
-    ).first()
-
-    if not portion:
-        raise HTTPException(status_code=404, detail="份量选项不存在")
-
-    # 创建记录（无图片URL）
-    record = MealRecord(
-        image_url="",  # 快速记录无图片
-        food_name=portion.food_name,
-        visual_portion_id=request.visual_portion_id,
-        calories=portion.get_calories(),
-        protein=portion.get_protein(),
-        record_date=datetime.utcnow()
-    )
-    db.add(record)
-    db.commit()
-    db.refresh(record)
-
-    logger.info(f"快速记录: {portion.food_name}, {portion.get_calories()}大卡")
-    return record
+    # 快速记录无图片，食物名称取自份量选项
+    return await _create_meal_record(db, "quick-record", idempotency_key, request, request.visual_portion_id, "")
@@ -1,12 +1,24 @@
 """
 系统信息 API - 提供系统级别的信息接口
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
 import socket
 import subprocess
 import platform
 from typing import List
 
+from ..models.database import engine, get_db, get_sqlite_settings
+from ..models.migrations import get_schema_version
+from ..services.knowledge_index import load_knowledge_index
+from ..services.recognition_cache import recognition_cache
+from ..services.ai_service import AIService
+from ..services.record_writer import record_writer
+from ..services.single_flight import glm_single_flight
+from ..services.circuit_breaker import glm_breaker
+from ..services.admission import glm_admission
+from ..services.recognition_jobs import recognition_jobs
+
 router = APIRouter(prefix="/api/system", tags=["system"])
 
 
@@ -155,3 +167,93 @@ async def get_system_info():
         "hostname": socket.gethostname(),
         "port": 8000
     }
+
+
+@router.post("/knowledge/reload")
+def reload_knowledge_index(db: Session = Depends(get_db)):
+    """
+    重新加载食物知识索引
+
+    重新导入种子数据（init_extended_database.py）后调用，
+    使运行中的服务读取最新的份量数据
+    """
+    index = load_knowledge_index(db)
+    return {
+        "status": "reloaded",
+        "food_count": len(index)
+    }
+
+
+@router.get("/recognition-cache")
+async def get_recognition_cache_stats():
+    """
+    获取识别结果缓存统计
+
+    Returns:
+        命中/未命中次数、命中率、当前条目数等
+    """
+    return recognition_cache.stats()
+
+
+@router.get("/recognition-stages")
+async def get_recognition_stage_stats():
+    """
+    获取各识别前置阶段（完全相同缓存、近重复检测）的统计
+    """
+    return {
+        stage.name: stage.stats()
+        for stage in AIService.PRE_RECOGNITION_STAGES
+    }
+
+
+@router.get("/glm")
+async def get_glm_stats():
+    """
+    获取 GLM 调用保护层的统计（熔断器状态和状态变化记录、准入控制的并发上限和排队情况、
+    进行中的识别及被合并的重复请求数）
+    """
+    return {
+        "circuit_breaker": glm_breaker.stats(),
+        "admission": glm_admission.stats(),
+        "single_flight": glm_single_flight.stats()
+    }
+
+
+@router.post("/glm/breaker/reset")
+async def reset_glm_breaker():
+    """
+    手动关闭 GLM 熔断器（确认 GLM 已恢复后无需等待冷却）
+    """
+    glm_breaker.reset()
+    return {"state": glm_breaker.state}
+
+
+@router.get("/recognition-jobs")
+async def get_recognition_job_stats():
+    """
+    获取异步识别任务统计（排队和执行中的任务数、成功/失败数、任务存储情况）
+    """
+    return recognition_jobs.stats()
+
+
+@router.get("/record-writer")
+async def get_record_writer_stats():
+    """
+    获取饮食记录组提交统计（批次数、平均批次大小等）
+    """
+    return record_writer.stats()
+
+
+@router.get("/database")
+def get_database_settings():
+    """
+    获取数据库结构版本、连接池状态和实际生效的 SQLite 参数
+    """
+    with engine.connect() as conn:
+        schema_version = get_schema_version(conn)
+    return {
+        "dialect": engine.dialect.name,
+        "schema_version": schema_version,
+        "pool": engine.pool.status(),
+        "sqlite": get_sqlite_settings()
+    }
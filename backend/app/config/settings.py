@@ -0,0 +1,34 @@
+"""
+运行时配置 - 从环境变量读取，未设置时使用默认值
+"""
+import os
+
+
+def env_str(name: str, default: str = "") -> str:
+    """读取字符串配置"""
+    value = os.getenv(name)
+    return value.strip() if value is not None and value.strip() != "" else default
+
+
+def env_int(name: str, default: int) -> int:
+    """读取整数配置，格式错误时使用默认值"""
+    try:
+        return int(env_str(name, str(default)))
+    except ValueError:
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    """读取浮点数配置，格式错误时使用默认值"""
+    try:
+        return float(env_str(name, str(default)))
+    except ValueError:
+        return default
+
+
+def env_bool(name: str, default: bool = False) -> bool:
+    """读取布尔配置（1/true/yes/on 视为开启）"""
+    value = env_str(name, "")
+    if value == "":
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
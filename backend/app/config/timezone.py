@@ -0,0 +1,36 @@
+"""
+用户时区 - 记录以 UTC 存储，按用户所在时区划分「一天」
+USER_TIMEZONE 为 IANA 时区名（如 Asia/Shanghai），未设置时使用服务器本地时区
+"""
+import logging
+from datetime import date, datetime, timezone, tzinfo
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from .settings import env_str
+
+logger = logging.getLogger(__name__)
+
+
+def _load_user_timezone() -> tzinfo:
+    name = env_str("USER_TIMEZONE", "")
+    if name:
+        try:
+            return ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            logger.warning(f"无效的 USER_TIMEZONE: {name}，使用服务器本地时区")
+    # 服务器本地时区（固定偏移，不处理夏令时切换）
+    return datetime.now().astimezone().tzinfo
+
+
+USER_TIMEZONE = _load_user_timezone()
+
+
+def to_local_day(utc_time: datetime) -> date:
+    """UTC 时间（无时区信息）对应的用户本地日期"""
+    if utc_time.tzinfo is None:
+        utc_time = utc_time.replace(tzinfo=timezone.utc)
+    return utc_time.astimezone(USER_TIMEZONE).date()
+
+
+def local_today() -> date:
+    """用户本地的今天"""
+    return datetime.now(USER_TIMEZONE).date()
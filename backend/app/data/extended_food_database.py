@@ -51,13 +51,12 @@ EXTENDED_FOOD_DATABASE = {
         ]
     },
     "红烧肉": {
-        "category": "meat",
+        "category": "takeout",
         "aliases": ["东坡肉", "扣肉", "红烧五花肉"],
         "calories_per_100g": 320,
         "protein_per_100g": 15,
         "portions": [
-            {"name": "掌心大小（约100g）", "weight": 100},
-            {"name": "掌心大小×1.5（约150g）", "weight": 150},
+            {"name": "平时饭碗的一碗（约200g）", "weight": 200},
         ]
     },
     "排骨": {
@@ -540,7 +539,7 @@ EXTENDED_FOOD_DATABASE = {
         ]
     },
     "包子": {
-        "category": "staple",
+        "category": "breakfast",
         "aliases": ["肉包", "菜包", "豆沙包"],
         "calories_per_100g": 230,
         "protein_per_100g": 7,
@@ -570,7 +569,7 @@ EXTENDED_FOOD_DATABASE = {
         ]
     },
     "煎饼": {
-        "category": "staple",
+        "category": "breakfast",
         "aliases": ["煎饼果子", "鸡蛋饼"],
         "calories_per_100g": 250,
         "protein_per_100g": 8,
@@ -580,7 +579,7 @@ EXTENDED_FOOD_DATABASE = {
         ]
     },
     "油条": {
-        "category": "staple",
+        "category": "breakfast",
         "aliases": [],
         "calories_per_100g": 390,
         "protein_per_100g": 6,
@@ -590,7 +589,7 @@ EXTENDED_FOOD_DATABASE = {
         ]
     },
     "粥": {
-        "category": "staple",
+        "category": "breakfast",
         "aliases": ["白粥", "小米粥", "皮蛋瘦肉粥"],
         "calories_per_100g": 60,
         "protein_per_100g": 1.5,
@@ -620,7 +619,7 @@ EXTENDED_FOOD_DATABASE = {
         ]
     },
     "烧麦": {
-        "category": "staple",
+        "category": "breakfast",
         "aliases": ["烧卖"],
         "calories_per_100g": 230,
         "protein_per_100g": 8,
@@ -744,7 +743,7 @@ EXTENDED_FOOD_DATABASE = {
         ]
     },
     "豆浆": {
-        "category": "soy",
+        "category": "breakfast",
         "aliases": ["豆奶", "生磨豆浆"],
         "calories_per_100g": 35,
         "protein_per_100g": 3,
@@ -901,15 +900,6 @@ EXTENDED_FOOD_DATABASE = {
             {"name": "平时饭碗的一碗（约150g）", "weight": 150},
         ]
     },
-    "红烧肉": {
-        "category": "takeout",
-        "aliases": [],
-        "calories_per_100g": 320,
-        "protein_per_100g": 15,
-        "portions": [
-            {"name": "平时饭碗的一碗（约200g）", "weight": 200},
-        ]
-    },
     "水煮鱼": {
         "category": "takeout",
         "aliases": [],
@@ -947,66 +937,7 @@ EXTENDED_FOOD_DATABASE = {
         ]
     },
 
-    # ========== 早餐常见 (8种) ==========
-    "豆浆": {
-        "category": "breakfast",
-        "aliases": [],
-        "calories_per_100g": 35,
-        "protein_per_100g": 3,
-        "portions": [
-            {"name": "一杯（约250ml）", "weight": 250},
-        ]
-    },
-    "油条": {
-        "category": "breakfast",
-        "aliases": [],
-        "calories_per_100g": 390,
-        "protein_per_100g": 6,
-        "portions": [
-            {"name": "半根（约60g）", "weight": 60},
-            {"name": "一根（约120g）", "weight": 120},
-        ]
-    },
-    "包子": {
-        "category": "breakfast",
-        "aliases": ["肉包", "菜包"],
-        "calories_per_100g": 230,
-        "protein_per_100g": 7,
-        "portions": [
-            {"name": "一个（约80g）", "weight": 80},
-            {"name": "一个×1.5（约120g）", "weight": 120},
-        ]
-    },
-    "煎饼": {
-        "category": "breakfast",
-        "aliases": ["煎饼果子"],
-        "calories_per_100g": 250,
-        "protein_per_100g": 8,
-        "portions": [
-            {"name": "半张（约100g）", "weight": 100},
-            {"name": "一张（约200g）", "weight": 200},
-        ]
-    },
-    "烧麦": {
-        "category": "breakfast",
-        "aliases": [],
-        "calories_per_100g": 230,
-        "protein_per_100g": 8,
-        "portions": [
-            {"name": "3个（约75g）", "weight": 75},
-            {"name": "5个（约125g）", "weight": 125},
-        ]
-    },
-    "粥": {
-        "category": "breakfast",
-        "aliases": ["白粥", "小米粥", "皮蛋瘦肉粥"],
-        "calories_per_100g": 60,
-        "protein_per_100g": 1.5,
-        "portions": [
-            {"name": "一小碗（约150g）", "weight": 150},
-            {"name": "一小碗×1.5（约225g）", "weight": 225},
-        ]
-    },
+    # ========== 早餐常见（包子、油条、粥等见主食部分，分类同为 breakfast） ==========
     "玉米": {
         "category": "breakfast",
         "aliases": ["煮玉米", "烤玉米"],
@@ -1083,3 +1014,10 @@ FOOD_CATEGORIES = {
         "description": "早餐必备"
     },
 }
+
+
+# 识别名称重定向 - GLM 返回这些名称时记为指定的食物（优先于同名的知识库条目）
+RECOGNITION_NAME_OVERRIDES = {
+    "蛋炒饭": "炒饭",
+    "扬州炒饭": "炒饭",
+}
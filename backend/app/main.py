@@ -3,12 +3,23 @@
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .models import Base, engine
+from .models import Base, engine, DailyTotal, IdempotencyKey
+from .models.database import SessionLocal
+from .models.migrations import upgrade_schema
 from .api import meal, system
+from .services.knowledge_index import load_knowledge_index
+from .services.glm_client import GLMHttpClient
+from .services.image_preprocess import image_preprocessor
+from .services.record_writer import record_writer
+from .services.recognition_jobs import recognition_jobs
 import uvicorn
+import logging
 
-# 创建数据库表
+logger = logging.getLogger(__name__)
+
+# 创建数据库表，并升级旧数据库中已有的表
 Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
 
 app = FastAPI(title="智能食物记录 API", version="1.0.0")
 
@@ -22,8 +33,80 @@ app.add_middleware(
 )
 
 # 注册路由
-app.include_router(meal.meal_router)
-app.include_router(system.system_router)
+app.include_router(meal.router)
+app.include_router(system.router)
+
+
+@app.on_event("startup")
+def load_food_knowledge():
+    """启动时一次性加载食物知识索引"""
+    db = SessionLocal()
+    try:
+        load_knowledge_index(db)
+    finally:
+        db.close()
+
+
+@app.on_event("startup")
+def backfill_daily_totals():
+    """升级后首次启动时，从已有的饮食记录生成每日汇总"""
+    db = SessionLocal()
+    try:
+        if DailyTotal.needs_backfill(db):
+            days = DailyTotal.rebuild(db)
+            db.commit()
+            logger.info(f"每日汇总已重建: {days} 天")
+    finally:
+        db.close()
+
+
+@app.on_event("startup")
+def purge_idempotency_keys():
+    """启动时清理过期的幂等键（运行期间写入时也会定期清理）"""
+    db = SessionLocal()
+    try:
+        purged = IdempotencyKey.purge_expired(db)
+        db.commit()
+        if purged:
+            logger.info(f"已清理过期幂等键: {purged} 个")
+    finally:
+        db.close()
+
+
+@app.on_event("startup")
+async def start_glm_client():
+    """启动时创建共享的 GLM HTTP 连接池"""
+    await GLMHttpClient.startup()
+
+
+@app.on_event("startup")
+async def start_recognition_jobs():
+    """启动异步识别任务的工作协程（继续执行重启前未完成的任务）"""
+    await recognition_jobs.start(meal.run_recognition_job)
+
+
+@app.on_event("shutdown")
+async def stop_recognition_jobs():
+    """停止异步识别任务的工作协程"""
+    await recognition_jobs.shutdown()
+
+
+@app.on_event("shutdown")
+async def drain_record_writer():
+    """关闭前写入组提交中等待的记录"""
+    await record_writer.drain()
+
+
+@app.on_event("shutdown")
+async def stop_glm_client():
+    """关闭时释放 GLM HTTP 连接"""
+    await GLMHttpClient.shutdown()
+
+
+@app.on_event("shutdown")
+def stop_image_preprocessor():
+    """关闭时释放图片预处理线程池"""
+    image_preprocessor.shutdown()
 
 
 @app.get("/")
@@ -5,5 +5,7 @@ from .database import Base, engine, get_db
 from .visual_portion import VisualPortion
 from .meal_record import MealRecord
 from .daily_goal import DailyGoal
+from .daily_total import DailyTotal
+from .idempotency_key import IdempotencyKey
 
-__all__ = ["Base", "engine", "get_db", "VisualPortion", "MealRecord", "DailyGoal"]
+__all__ = ["Base", "engine", "get_db", "VisualPortion", "MealRecord", "DailyGoal", "DailyTotal", "IdempotencyKey"]
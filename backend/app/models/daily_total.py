@@ -0,0 +1,145 @@
+"""
+每日汇总模型 - meal_records 按天的增量汇总
+记录写入时在同一事务中累加，今日余额和进度统计只需读取 O(天数) 行
+"""
+from sqlalchemy import Column, Integer, Float, Date, DateTime, func, insert, select
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+from .database import Base
+from .meal_record import MealRecord
+from ..config.timezone import to_local_day
+
+
+class DailyTotal(Base):
+    """每日汇总 - 由 MealRecord 派生，可随时重建"""
+    __tablename__ = "daily_totals"
+
+    day = Column(Date, primary_key=True)
+    calories = Column(Float, nullable=False, default=0)
+    protein = Column(Float, nullable=False, default=0)
+    meals_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @staticmethod
+    def day_of(record: MealRecord) -> date:
+        """记录归属的用户本地日期"""
+        if record.local_day is not None:
+            return record.local_day
+        return to_local_day(record.record_date or datetime.utcnow())
+
+    @classmethod
+    def add_record(cls, db, record: MealRecord):
+        """将一条新记录累加到当日汇总（不提交，随记录在同一事务中提交）"""
+        cls.add_records(db, [record])
+
+    @classmethod
+    def add_records(cls, db, records: Iterable[MealRecord]):
+        """将一批新记录按日期合并后累加到汇总，每天只执行一条语句（不提交）"""
+        totals: Dict[date, List[float]] = {}
+        for record in records:
+            total = totals.setdefault(cls.day_of(record), [0.0, 0.0, 0])
+            total[0] += record.calories
+            total[1] += record.protein
+            total[2] += 1
+        for day, (calories, protein, meals_count) in totals.items():
+            cls.add_totals(db, day, calories, protein, meals_count)
+
+    @classmethod
+    def add_totals(cls, db, day: date, calories: float, protein: float, meals_count: int):
+        """
+        累加某一天的汇总（不提交）
+
+        使用 INSERT ... ON CONFLICT DO UPDATE，并发写入同一天时也不会丢失累加
+        """
+        values = {
+            "day": day,
+            "calories": calories,
+            "protein": protein,
+            "meals_count": meals_count,
+            "updated_at": datetime.utcnow(),
+        }
+        dialect = db.get_bind().dialect.name
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        elif dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        else:
+            upsert = None
+
+        if upsert is None:
+            total = db.get(cls, day)
+            if total is None:
+                db.add(cls(**values))
+            else:
+                total.calories += calories
+                total.protein += protein
+                total.meals_count += meals_count
+            return
+
+        stmt = upsert(cls).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[cls.day],
+            set_={
+                "calories": cls.calories + stmt.excluded.calories,
+                "protein": cls.protein + stmt.excluded.protein,
+                "meals_count": cls.meals_count + stmt.excluded.meals_count,
+                "updated_at": stmt.excluded.updated_at,
+            }
+        )
+        db.execute(stmt)
+
+    @classmethod
+    def get_day(cls, db, day: date) -> Optional["DailyTotal"]:
+        """获取某一天的汇总，当天没有记录时返回 None"""
+        return db.get(cls, day)
+
+    @classmethod
+    def get_range(cls, db, start: date, end: date) -> List["DailyTotal"]:
+        """获取日期范围内（含首尾）的汇总，按日期升序"""
+        return db.query(cls).filter(
+            cls.day >= start,
+            cls.day <= end
+        ).order_by(cls.day).all()
+
+    @classmethod
+    def rebuild(cls, db, start: Optional[date] = None, end: Optional[date] = None) -> int:
+        """
+        从 meal_records 重建汇总（不提交）
+
+        Args:
+            start, end: 只重建该日期范围（含首尾），均为空时全量重建
+
+        Returns:
+            重建的天数
+        """
+        day = MealRecord.local_day
+        total_filters, record_filters = [], [day.isnot(None)]
+        if start is not None:
+            total_filters.append(cls.day >= start)
+            record_filters.append(day >= start)
+        if end is not None:
+            total_filters.append(cls.day <= end)
+            record_filters.append(day <= end)
+
+        db.query(cls).filter(*total_filters).delete(synchronize_session=False)
+        result = db.execute(
+            insert(cls).from_select(
+                ["day", "calories", "protein", "meals_count", "updated_at"],
+                select(
+                    day,
+                    func.sum(MealRecord.calories),
+                    func.sum(MealRecord.protein),
+                    func.count(MealRecord.id),
+                    func.current_timestamp()
+                ).where(*record_filters).group_by(day)
+            )
+        )
+        return result.rowcount
+
+    @classmethod
+    def needs_backfill(cls, db) -> bool:
+        """汇总表为空但已有饮食记录（例如升级后首次启动）"""
+        return db.query(cls.day).first() is None and db.query(MealRecord.id).first() is not None
+
+    def __repr__(self):
+        return f"<DailyTotal({self.day}, {self.calories}kcal, {self.meals_count} meals)>"
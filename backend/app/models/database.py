@@ -1,15 +1,85 @@
 """
 数据库配置
 """
-from sqlalchemy import create_engine
+import functools
+import logging
+import anyio
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from ..config.settings import env_int, env_str
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./smart_food.db"
+logger = logging.getLogger(__name__)
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+SQLALCHEMY_DATABASE_URL = env_str("DATABASE_URL", "sqlite:///./smart_food.db")
+
+IS_SQLITE = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+
+# SQLite 调优参数，每个新连接建立时执行
+# - WAL: 读不阻塞写、写不阻塞读，用餐高峰的写入不再让查询卡在 "database is locked"
+# - synchronous=NORMAL: WAL 模式下仍保证数据库一致，只在断电时可能丢失最近的事务
+# - busy_timeout: 写锁被占用时等待而不是立即报错
+SQLITE_PRAGMAS = {
+    "journal_mode": env_str("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": env_str("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "cache_size": -env_int("SQLITE_CACHE_SIZE_KB", 64 * 1024),  # 负数表示以 KB 为单位
+    "mmap_size": env_int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024),
+    "busy_timeout": env_int("SQLITE_BUSY_TIMEOUT_MS", 5000),
+    "temp_store": "MEMORY",
+}
+
+
+def _engine_options() -> dict:
+    """数据库引擎与连接池配置"""
+    if not IS_SQLITE:
+        return {
+            "pool_size": env_int("DB_POOL_SIZE", 5),
+            "max_overflow": env_int("DB_MAX_OVERFLOW", 10),
+            "pool_timeout": env_int("DB_POOL_TIMEOUT", 30),
+            "pool_pre_ping": True,
+        }
+    options = {
+        "connect_args": {
+            "check_same_thread": False,
+            "timeout": SQLITE_PRAGMAS["busy_timeout"] / 1000,
+        }
+    }
+    if ":memory:" not in SQLALCHEMY_DATABASE_URL:
+        # 文件数据库：连接可跨线程复用，连接池大小覆盖线程池并发
+        options.update(
+            pool_size=env_int("DB_POOL_SIZE", 20),
+            max_overflow=env_int("DB_MAX_OVERFLOW", 20),
+            pool_timeout=env_int("DB_POOL_TIMEOUT", 30),
+        )
+    return options
+
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_engine_options())
+
+
+if IS_SQLITE:
+    @event.listens_for(engine, "connect")
+    def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+        """新连接建立时应用 SQLite 调优参数"""
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in SQLITE_PRAGMAS.items():
+                if name in ("journal_mode", "mmap_size") and ":memory:" in SQLALCHEMY_DATABASE_URL:
+                    continue  # 内存数据库不支持 WAL 和内存映射
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def get_sqlite_settings() -> dict:
+    """读取当前连接上实际生效的 SQLite 参数（用于诊断）"""
+    if not IS_SQLITE:
+        return {}
+    with engine.connect() as conn:
+        return {
+            name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+            for name in SQLITE_PRAGMAS
+        }
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -23,3 +93,13 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# SQLite 同一时间只有一个写事务能执行：限制同时执行写入的线程数，
+# 写入高峰时多余的请求在事件循环中排队，而不是占满线程池拖慢识别和查询请求
+DB_WRITE_LIMITER = anyio.CapacityLimiter(env_int("DB_WRITE_THREADS", 2))
+
+
+async def run_db_write(func, *args):
+    """在数据库写线程中执行同步的写操作"""
+    return await anyio.to_thread.run_sync(functools.partial(func, *args), limiter=DB_WRITE_LIMITER)
@@ -0,0 +1,94 @@
+"""
+幂等键模型 - 记录创建接口的 Idempotency-Key → 响应
+客户端超时重试时携带相同的键，直接返回第一次的结果，不会重复记录；
+键与请求体的哈希绑定，相同的键用于不同的请求时拒绝而不是返回第一次的结果
+"""
+import hashlib
+import json
+from sqlalchemy import Column, String, Text, DateTime
+from datetime import datetime, timedelta
+from typing import Optional
+from .database import Base
+from ..config.settings import env_int
+
+# 幂等键保留时长
+IDEMPOTENCY_TTL = timedelta(hours=env_int("IDEMPOTENCY_TTL_HOURS", 24))
+
+# 每保存多少个键顺带清理一次过期记录
+PURGE_EVERY = 200
+
+
+class IdempotencyKeyReused(Exception):
+    """相同的幂等键用于请求体不同的请求"""
+    pass
+
+
+class IdempotencyKey(Base):
+    """幂等键 - 同一接口下键唯一"""
+    __tablename__ = "idempotency_keys"
+
+    endpoint = Column(String(50), primary_key=True)
+    key = Column(String(200), primary_key=True)
+    response = Column(Text, nullable=False)  # 响应 JSON
+    request_hash = Column(String(64), nullable=True)  # 请求体哈希（升级前保存的键为空，不校验）
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    _saved_since_purge = 0
+
+    @staticmethod
+    def hash_request(payload: dict) -> str:
+        """请求体哈希（按键排序后的 JSON，字段顺序不影响结果）"""
+        data = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def lookup(cls, db, endpoint: str, key: str, request_hash: Optional[str] = None) -> Optional[dict]:
+        """
+        查找未过期的已保存响应
+
+        Raises:
+            IdempotencyKeyReused: 键已用于请求体不同的请求
+        """
+        row = db.get(cls, (endpoint, key))
+        if row is None or row.created_at < datetime.utcnow() - IDEMPOTENCY_TTL:
+            return None
+        if row.request_hash and request_hash and row.request_hash != request_hash:
+            raise IdempotencyKeyReused(f"幂等键 {key} 已用于不同的请求")
+        return json.loads(row.response)
+
+    @classmethod
+    def save(cls, db, endpoint: str, key: str, response: dict, request_hash: Optional[str] = None):
+        """
+        保存响应（不提交，与业务写入在同一事务中提交）
+
+        并发的相同键请求会在提交时因主键冲突失败，由调用方回滚后重新 lookup
+        """
+        now = datetime.utcnow()
+        # 同一个键的过期记录先删除，避免主键冲突
+        db.query(cls).filter(
+            cls.endpoint == endpoint,
+            cls.key == key,
+            cls.created_at < now - IDEMPOTENCY_TTL
+        ).delete(synchronize_session=False)
+        db.add(cls(
+            endpoint=endpoint,
+            key=key,
+            response=json.dumps(response, ensure_ascii=False, separators=(",", ":")),
+            request_hash=request_hash,
+            created_at=now
+        ))
+
+        cls._saved_since_purge += 1
+        if cls._saved_since_purge >= PURGE_EVERY:
+            cls._saved_since_purge = 0
+            cls.purge_expired(db)
+
+    @classmethod
+    def purge_expired(cls, db) -> int:
+        """删除过期的幂等键（不提交）"""
+        return db.query(cls).filter(
+            cls.created_at < datetime.utcnow() - IDEMPOTENCY_TTL
+        ).delete(synchronize_session=False)
+
+    def __repr__(self):
+        return f"<IdempotencyKey({self.endpoint}, {self.key})>"
@@ -1,15 +1,21 @@
 """
 饮食记录模型 - 唯一数据源
 """
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Index, event
 from sqlalchemy.orm import relationship
 from datetime import datetime
+from typing import Optional
 from .database import Base
+from ..config.timezone import to_local_day
 
 
 class MealRecord(Base):
     """饮食记录 - 唯一数据源"""
     __tablename__ = "meal_records"
+    __table_args__ = (
+        # 覆盖索引：按天汇总热量/蛋白质/条数只读索引，不回表
+        Index("ix_meal_records_day_nutrition", "local_day", "calories", "protein"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     image_url = Column(String(500), nullable=False)
@@ -18,10 +24,43 @@ class MealRecord(Base):
     calories = Column(Float, nullable=False)  # 从 VisualPortion 计算
     protein = Column(Float, nullable=False)   # 从 VisualPortion 计算
     record_date = Column(DateTime, default=datetime.utcnow, index=True)
+    # 记录所属的用户本地日期（按 USER_TIMEZONE 由 record_date 换算），按天统计直接走索引
+    local_day = Column(Date)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # 关系
     visual_portion = relationship("VisualPortion", back_populates="meal_records")
 
+    @classmethod
+    def from_portion(cls, portion, image_url: str, food_name: Optional[str] = None,
+                     now: Optional[datetime] = None) -> "MealRecord":
+        """
+        根据份量选项创建记录（营养数据从 VisualPortion 计算）
+
+        Args:
+            food_name: 记录的食物名称，为空时使用份量对应的食物名称
+            now: 记录时间（UTC），批量写入时共用同一时间
+        """
+        now = now or datetime.utcnow()
+        return cls(
+            image_url=image_url,
+            food_name=food_name or portion.food_name,
+            visual_portion_id=portion.id,
+            calories=portion.get_calories(),
+            protein=portion.get_protein(),
+            record_date=now,
+            local_day=to_local_day(now),
+            created_at=now
+        )
+
     def __repr__(self):
         return f"<MealRecord({self.food_name}, {self.calories}kcal, {self.record_date})>"
+
+
+@event.listens_for(MealRecord, "before_insert")
+def _fill_local_day(mapper, connection, record):
+    """写入前补齐 local_day"""
+    if record.record_date is None:
+        record.record_date = datetime.utcnow()
+    if record.local_day is None:
+        record.local_day = to_local_day(record.record_date)
@@ -0,0 +1,207 @@
+"""
+数据库结构升级
+Base.metadata.create_all 只会创建缺失的表，不会修改已有表；
+旧版本的 smart_food.db 通过这里按版本号依次执行的迁移补充新增的列和索引并回填数据
+
+新增迁移：编写 migrate(conn) 函数（必须幂等，新建的数据库上也会执行一次），
+追加到 MIGRATIONS 末尾并使用递增的版本号
+"""
+import logging
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+from sqlalchemy import (
+    Column, DateTime, Integer, String, Table, bindparam, func, insert, inspect, select, update
+)
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from .database import Base
+from .meal_record import MealRecord
+from .visual_portion import VisualPortion
+from .daily_total import DailyTotal
+from ..config.timezone import to_local_day
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH_SIZE = 1000
+
+# 已执行的迁移
+schema_migrations = Table(
+    "schema_migrations",
+    Base.metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(100), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def backfill_local_day(conn: Connection, only_missing: bool = True) -> int:
+    """
+    按当前用户时区计算 meal_records.local_day
+
+    Args:
+        only_missing: 只回填为空的记录；为 False 时全部重新计算（修改 USER_TIMEZONE 之后）
+
+    Returns:
+        更新的记录数
+    """
+    table = MealRecord.__table__
+    stmt = update(table).where(table.c.id == bindparam("record_id")).values(local_day=bindparam("day"))
+    updated = 0
+    last_id = 0
+    while True:
+        query = select(table.c.id, table.c.record_date).where(table.c.id > last_id)
+        if only_missing:
+            query = query.where(table.c.local_day.is_(None))
+        rows = conn.execute(query.order_by(table.c.id).limit(BACKFILL_BATCH_SIZE)).all()
+        if not rows:
+            return updated
+        conn.execute(stmt, [
+            {"record_id": row.id, "day": to_local_day(row.record_date)}
+            for row in rows
+            if row.record_date is not None
+        ])
+        updated += len(rows)
+        last_id = rows[-1].id
+
+
+def add_meal_record_local_day(conn: Connection):
+    """meal_records 增加 local_day 列，回填已有记录并按本地日期重建每日汇总"""
+    columns = {column["name"] for column in inspect(conn).get_columns("meal_records")}
+    if "local_day" not in columns:
+        conn.exec_driver_sql("ALTER TABLE meal_records ADD COLUMN local_day DATE")
+
+    backfilled = backfill_local_day(conn)
+    if backfilled:
+        # 汇总此前按 UTC 日期划分，按本地日期重新汇总
+        days = DailyTotal.rebuild(Session(bind=conn))
+        logger.info(f"已回填 {backfilled} 条记录的 local_day，重建每日汇总 {days} 天")
+
+
+def add_meal_record_day_covering_index(conn: Connection):
+    """(local_day, calories, protein) 覆盖索引，取代单列的 local_day 索引"""
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_meal_records_day_nutrition "
+        "ON meal_records (local_day, calories, protein)"
+    )
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_meal_records_local_day")
+
+
+def dedupe_visual_portions(conn: Connection):
+    """
+    合并重复的 (食物, 份量) 行并建立唯一索引
+
+    每组重复保留 ID 最小的一行，引用其他行的饮食记录改为引用保留的行
+    """
+    duplicates = conn.exec_driver_sql(
+        "SELECT COUNT(*) FROM visual_portions WHERE id NOT IN "
+        "(SELECT MIN(id) FROM visual_portions GROUP BY food_name, portion_name)"
+    ).scalar()
+    if duplicates:
+        conn.exec_driver_sql(
+            "UPDATE meal_records SET visual_portion_id = ("
+            "  SELECT MIN(kept.id) FROM visual_portions AS dup"
+            "  JOIN visual_portions AS kept"
+            "    ON kept.food_name = dup.food_name AND kept.portion_name = dup.portion_name"
+            "  WHERE dup.id = meal_records.visual_portion_id"
+            ") WHERE visual_portion_id IN ("
+            "  SELECT id FROM visual_portions WHERE id NOT IN"
+            "  (SELECT MIN(id) FROM visual_portions GROUP BY food_name, portion_name)"
+            ")"
+        )
+        conn.exec_driver_sql(
+            "DELETE FROM visual_portions WHERE id NOT IN "
+            "(SELECT MIN(id) FROM visual_portions GROUP BY food_name, portion_name)"
+        )
+        logger.info(f"已合并 {duplicates} 条重复的份量记录")
+
+    conn.exec_driver_sql(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_visual_portions_food_portion "
+        "ON visual_portions (food_name, portion_name)"
+    )
+    # 唯一索引以 food_name 开头，单列索引不再需要
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_visual_portions_food_name")
+
+
+def add_visual_portion_display_rank(conn: Connection):
+    """visual_portions 增加 display_rank 列并按当前排序规则计算"""
+    columns = {column["name"] for column in inspect(conn).get_columns("visual_portions")}
+    if "display_rank" not in columns:
+        conn.exec_driver_sql(
+            "ALTER TABLE visual_portions ADD COLUMN display_rank INTEGER NOT NULL DEFAULT 0"
+        )
+    refresh_display_ranks(conn)
+
+
+def refresh_display_ranks(conn: Connection) -> int:
+    """
+    按当前的食物分类和份量排序规则重新计算 display_rank
+
+    Returns:
+        更新的份量数
+    """
+    from ..services.portion_service import PortionService
+
+    table = VisualPortion.__table__
+    changed = [
+        {"portion_id": row.id, "rank": rank}
+        for row in conn.execute(select(
+            table.c.id, table.c.food_name, table.c.portion_name, table.c.display_rank
+        ))
+        for rank in [PortionService.get_display_rank(row.food_name, row.portion_name)]
+        if rank != row.display_rank
+    ]
+    if changed:
+        conn.execute(
+            update(table).where(table.c.id == bindparam("portion_id")).values(display_rank=bindparam("rank")),
+            changed
+        )
+    return len(changed)
+
+
+def add_idempotency_key_request_hash(conn: Connection):
+    """idempotency_keys 增加 request_hash 列（已保存的键为空，不做校验）"""
+    columns = {column["name"] for column in inspect(conn).get_columns("idempotency_keys")}
+    if "request_hash" not in columns:
+        conn.exec_driver_sql("ALTER TABLE idempotency_keys ADD COLUMN request_hash VARCHAR(64)")
+
+
+# (版本号, 名称, 迁移函数)，按版本号顺序执行
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "meal_records_local_day", add_meal_record_local_day),
+    (2, "meal_records_day_covering_index", add_meal_record_day_covering_index),
+    (3, "visual_portions_unique_food_portion", dedupe_visual_portions),
+    (4, "visual_portions_display_rank", add_visual_portion_display_rank),
+    # 食物分类改为来自食物知识目录，按新分类重新计算
+    (5, "visual_portions_display_rank_catalog_categories", refresh_display_ranks),
+    (6, "idempotency_keys_request_hash", add_idempotency_key_request_hash),
+]
+
+
+def get_schema_version(conn: Connection) -> Optional[int]:
+    """当前数据库已执行到的迁移版本，未执行过任何迁移时返回 None"""
+    return conn.execute(select(func.max(schema_migrations.c.version))).scalar()
+
+
+def upgrade_schema(engine: Engine) -> List[int]:
+    """
+    启动时执行尚未执行的迁移，每个迁移在独立事务中完成
+
+    Returns:
+        本次执行的迁移版本号
+    """
+    schema_migrations.create(engine, checkfirst=True)
+    with engine.connect() as conn:
+        applied = set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+    executed = []
+    for version, name, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.execute(insert(schema_migrations).values(
+                version=version, name=name, applied_at=datetime.utcnow()
+            ))
+        logger.info(f"数据库迁移完成: {version} {name}")
+        executed.append(version)
+    return executed
@@ -1,7 +1,7 @@
 """
 视觉份量知识库模型 - 每条记录 = 某种食物 + 某种视觉份量的完整营养定义
 """
-from sqlalchemy import Column, Integer, String, Float
+from sqlalchemy import Column, Integer, String, Float, Index
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -9,13 +9,19 @@ from .database import Base
 class VisualPortion(Base):
     """视觉份量知识库"""
     __tablename__ = "visual_portions"
+    __table_args__ = (
+        # 自然键：同一食物的份量名称唯一；按食物查询份量时走该索引的范围扫描
+        Index("ux_visual_portions_food_portion", "food_name", "portion_name", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    food_name = Column(String(100), nullable=False, index=True)
+    food_name = Column(String(100), nullable=False)
     portion_name = Column(String(100), nullable=False)
     weight_grams = Column(Float, nullable=False)
     calories_per_100g = Column(Float, nullable=False)
     protein_per_100g = Column(Float, nullable=False)
+    # 同一食物内的展示顺序（导入时由 PortionService.get_display_rank 计算），按 (display_rank, id) 排列
+    display_rank = Column(Integer, nullable=False, default=0, server_default="0")
 
     # 关系
     meal_records = relationship("MealRecord", back_populates="visual_portion")
@@ -0,0 +1,263 @@
+"""
+GLM 调用准入控制 - 令牌桶限速 + AIMD 自适应并发上限 + 有界等待队列
+高峰期直接把请求全部发给 GLM 只会换来大量 429，然后降级成随机的模拟结果；
+准入控制按配额匀速放行，收到 429/5xx 时并发上限减半、成功时缓慢增加，
+放不下的请求在有界队列中排队，排队超时或队列已满时才降级
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+from ..config.settings import env_bool, env_float, env_int
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """请求未获准入（队列已满或排队超时），调用方应降级"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class Outcome:
+    """一次调用的结果（决定并发上限如何调整）"""
+    SUCCESS = "success"     # 成功：加性增加
+    OVERLOAD = "overload"   # 429/5xx：乘性减少
+    IGNORE = "ignore"       # 其他错误或取消：不调整
+
+
+class TokenBucket:
+    """令牌桶：每秒补充 rate 个令牌，最多积攒 burst 个"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self) -> float:
+        """距离下一个可用令牌的秒数，0 表示现在就有"""
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        self._refill(now)
+        return 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+
+    def take(self) -> bool:
+        """取一个令牌，没有可用令牌时返回 False"""
+        if self.wait_time() > 0:
+            return False
+        self._tokens -= 1
+        return True
+
+    def pause(self, seconds: float):
+        """暂停发放令牌（服务端通过 Retry-After 要求等待时）"""
+        now = time.monotonic()
+        self._paused_until = max(self._paused_until, now + seconds)
+        self._tokens = 0.0
+        self._updated = self._paused_until
+
+    @property
+    def tokens(self) -> float:
+        now = time.monotonic()
+        if now >= self._paused_until:
+            self._refill(now)
+        return self._tokens
+
+
+class Permit:
+    """一次准入，调用结束后必须 release"""
+
+    __slots__ = ("controller", "admitted_at", "queued_for", "_released")
+
+    def __init__(self, controller: "AdmissionController", queued_for: float = 0.0):
+        self.controller = controller
+        self.admitted_at = time.monotonic()
+        self.queued_for = queued_for
+        self._released = False
+
+    def release(self, outcome: str = Outcome.IGNORE):
+        if not self._released:
+            self._released = True
+            self.controller._release(self, outcome)
+
+
+class AdmissionController:
+    """
+    GLM 调用的准入控制
+
+    - 同时进行的调用数不超过 limit，limit 在 [min_limit, max_limit] 之间按 AIMD 调整：
+      成功时 limit += increase / limit（每轮约增加 increase，并发用到一半以上时才增加），
+      429/5xx 时 limit *= decrease_factor；
+      减少之前就已发出的调用再报 429 不会重复减少
+    - 每次放行消耗令牌桶中的一个令牌（按配额匀速）
+    - 放不下的请求按到达顺序排队，队列最多 max_queue 个，最长等待 queue_timeout 秒
+    """
+
+    def __init__(self, name: str, enabled: bool = True, rate: float = 2.0, burst: int = 10,
+                 initial_limit: int = 5, min_limit: int = 1, max_limit: int = 20,
+                 increase: float = 1.0, decrease_factor: float = 0.5,
+                 max_queue: int = 50, queue_timeout: float = 3.0):
+        self.name = name
+        self.enabled = enabled
+        self.bucket = TokenBucket(rate, burst)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._decreased_at = 0.0
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        self._stats = {"admitted": 0, "queued": 0, "queue_full": 0, "queue_timeouts": 0,
+                       "overloads": 0, "decreases": 0}
+
+    async def acquire(self, timeout: Optional[float] = None) -> Permit:
+        """
+        等待准入
+
+        Args:
+            timeout: 最长排队时间（秒），不超过 queue_timeout
+
+        Raises:
+            AdmissionRejected: 队列已满或排队超时
+        """
+        if not self.enabled:
+            return Permit(self)
+
+        if not self._waiters and self._try_admit():
+            self._stats["admitted"] += 1
+            return Permit(self)
+
+        if len(self._waiters) >= self.max_queue:
+            self._stats["queue_full"] += 1
+            raise AdmissionRejected(f"{self.name} 等待队列已满（{self.max_queue}）")
+
+        timeout = self.queue_timeout if timeout is None else min(timeout, self.queue_timeout)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._stats["queued"] += 1
+        self._schedule_dispatch()
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter, max(timeout, 0.0))
+        except asyncio.TimeoutError:
+            if not (waiter.done() and not waiter.cancelled()):
+                self._stats["queue_timeouts"] += 1
+                raise AdmissionRejected(f"{self.name} 排队超时（{timeout:.1f}s）")
+        except asyncio.CancelledError:
+            # 已经分到名额后才被取消，归还名额
+            if waiter.done() and not waiter.cancelled():
+                self._release_slot()
+            raise
+        finally:
+            if not waiter.done():
+                waiter.cancel()
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+
+        self._stats["admitted"] += 1
+        return Permit(self, queued_for=time.monotonic() - started)
+
+    def backoff(self, seconds: float):
+        """服务端要求等待（Retry-After）时暂停放行"""
+        if self.enabled and seconds > 0:
+            self.bucket.pause(seconds)
+            logger.warning(f"{self.name} 准入控制: 按 Retry-After 暂停 {seconds:.1f}s")
+
+    def _try_admit(self) -> bool:
+        """有空闲并发名额且取得令牌时占用一个名额"""
+        if self.in_flight >= int(self.limit):
+            return False
+        if not self.bucket.take():
+            self._schedule_dispatch()
+            return False
+        self.in_flight += 1
+        return True
+
+    def _release(self, permit: Permit, outcome: str):
+        if not self.enabled:
+            return
+        if outcome == Outcome.SUCCESS:
+            # 并发没用到一半时说明上限不是瓶颈，不再提高
+            if self.in_flight * 2 >= self.limit:
+                self.limit = min(self.max_limit, self.limit + self.increase / self.limit)
+        elif outcome == Outcome.OVERLOAD:
+            self._stats["overloads"] += 1
+            # 同一轮过载中已发出的调用只减少一次
+            if permit.admitted_at >= self._decreased_at:
+                previous = self.limit
+                self.limit = max(float(self.min_limit), self.limit * self.decrease_factor)
+                self._decreased_at = time.monotonic()
+                # 已在下限时不再计数和记录日志
+                if self.limit < previous:
+                    self._stats["decreases"] += 1
+                    logger.warning(f"{self.name} 准入控制: 并发上限 {previous:.1f} -> {self.limit:.1f}")
+        self._release_slot()
+
+    def _release_slot(self):
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        """按到达顺序放行排队的请求"""
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+        while self._waiters:
+            waiter = self._waiters[0]
+            if waiter.done():
+                self._waiters.popleft()
+                continue
+            if not self._try_admit():
+                return
+            self._waiters.popleft()
+            waiter.set_result(None)
+
+    def _schedule_dispatch(self):
+        """令牌不足时，在下一个令牌可用时再尝试放行"""
+        if self._wakeup is not None or not self._waiters:
+            return
+        self._wakeup = asyncio.get_running_loop().call_later(self.bucket.wait_time(), self._dispatch)
+
+    def stats(self) -> Dict:
+        return {
+            **self._stats,
+            "enabled": self.enabled,
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "tokens": round(self.bucket.tokens, 2),
+            "rate_per_second": self.bucket.rate,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+        }
+
+
+# GLM 准入控制（按 GLM 配额配置）
+glm_admission = AdmissionController(
+    name="GLM",
+    enabled=env_bool("GLM_ADMISSION_ENABLED", True),
+    rate=env_float("GLM_QUOTA_RPM", 120) / 60,
+    burst=env_int("GLM_QUOTA_BURST", 10),
+    initial_limit=env_int("GLM_CONCURRENCY_INITIAL", 5),
+    min_limit=env_int("GLM_CONCURRENCY_MIN", 1),
+    max_limit=env_int("GLM_CONCURRENCY_MAX", 20),
+    decrease_factor=env_float("GLM_CONCURRENCY_DECREASE", 0.5),
+    max_queue=env_int("GLM_QUEUE_SIZE", 50),
+    queue_timeout=env_float("GLM_QUEUE_TIMEOUT", 3.0),
+)
@@ -3,21 +3,65 @@ AI 识别服务 - 集成智谱AI GLM-4.6V-Flash 图像识别
 支持真实AI识别和模拟降级
 支持单食物和多食物识别
 """
+import asyncio
+import logging
 import os
 import json
+import time
 import random
 import httpx
 from typing import Dict, List, Optional, Tuple
 from sqlalchemy.orm import Session
 from ..models.visual_portion import VisualPortion
+from .knowledge_index import get_knowledge_index
+from .food_catalog import food_catalog
+from .food_name_matcher import FoodNameMatcher
+from .glm_client import GLMHttpClient
+from .recognition_cache import recognition_cache
+from .recognition_stages import RecognitionRequest, RecognitionStage, ExactCacheStage
+from .perceptual_hash import PerceptualHashStage
+from .image_preprocess import image_preprocessor
+from .single_flight import glm_single_flight
+from .circuit_breaker import glm_breaker
+from .admission import AdmissionRejected, Outcome, glm_admission
+from .deadline import DEFAULT_TIMEOUT_MS, Deadline
+from ..config.settings import env_float, env_int
 from pydantic import BaseModel
 
+logger = logging.getLogger(__name__)
+
 
 class GLMError(Exception):
     """GLM API 调用错误"""
     pass
 
 
+class GLMDeadlineExceeded(GLMError):
+    """GLM 调用在请求截止时间前没有返回，已被中止"""
+    pass
+
+
+class GLMRateLimited(GLMError):
+    """GLM API 返回 429（请求频率超限）"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after  # 服务端要求等待的秒数（Retry-After）
+
+
+class GLMServerError(GLMError):
+    """GLM API 返回 5xx"""
+    pass
+
+
+def _parse_retry_after(response: httpx.Response) -> Optional[float]:
+    """解析 Retry-After 响应头（只支持秒数格式）"""
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
+
+
 class FoodRecognition(BaseModel):
     """食物识别结果"""
     food_name: str
@@ -34,9 +78,23 @@ class AIService:
     """AI 食物识别服务"""
 
     # GLM API 配置
-    GLM_API_URL = "https://open.bigmodel.cn/api/paas/v4/chat/completions"
+    # 可通过 GLM_API_URL 指向本地桩服务进行测试
+    GLM_API_URL = os.getenv("GLM_API_URL", "https://open.bigmodel.cn/api/paas/v4/chat/completions")
     GLM_MODEL = "glm-4.6v-flash"  # 免费视觉模型
 
+    # 被限流（429）后重新排队重试的次数（在请求截止时间内）
+    RATE_LIMIT_RETRIES = env_int("GLM_RATE_LIMIT_RETRIES", 1)
+
+    # 识别前置阶段（调用GLM之前依次尝试复用已有结果）
+    PRE_RECOGNITION_STAGES: List[RecognitionStage] = [
+        ExactCacheStage(recognition_cache),
+        PerceptualHashStage(
+            max_distance=env_int("PHASH_MAX_DISTANCE", 6),
+            max_entries=env_int("PHASH_MAX_ENTRIES", 1024),
+            ttl_seconds=env_float("PHASH_TTL", 600.0),
+        ),
+    ]
+
     # 模拟AI识别结果 - 降级使用
     MOCK_RECOGNITION_RESULTS = [
         {"name": "鸡胸肉"},
@@ -51,121 +109,6 @@ class AIService:
         {"name": "全麦面包"},
     ]
 
-    # 食物名称映射 - 将GLM识别结果映射到知识库标准名称（扩展版 - 覆盖100+食物）
-    FOOD_NAME_MAPPING = {
-        # ========== 肉类/禽类/鱼类 ==========
-        "鸡胸肉": "鸡胸肉", "鸡肉": "鸡胸肉", "白切鸡": "鸡胸肉", "宫保鸡丁": "鸡胸肉",
-        "口水鸡": "鸡胸肉", "辣子鸡": "鸡胸肉", "鸡柳": "鸡胸肉", "鸡排": "鸡胸肉",
-        "鸡翅": "鸡翅", "鸡腿": "鸡腿",
-        "牛肉": "牛肉", "牛排": "牛排", "红烧牛肉": "牛肉", "肥牛": "牛肉", "瘦牛肉": "牛肉",
-        "猪肉": "猪肉", "五花肉": "五花肉", "梅花肉": "猪肉", "里脊肉": "猪肉",
-        "红烧肉": "红烧肉", "排骨": "排骨", "猪排": "排骨", "糖醋排骨": "排骨",
-        "鱼": "鱼", "清蒸鱼": "鱼", "红烧鱼": "鱼", "鲈鱼": "鱼", "草鱼": "鱼", "鲫鱼": "鱼",
-        "虾": "虾", "白灼虾": "虾", "油焖大虾": "虾", "虾仁": "虾", "基围虾": "虾",
-        "螃蟹": "螃蟹", "大闸蟹": "螃蟹", "梭子蟹": "螃蟹", "毛蟹": "螃蟹",
-        "鸭肉": "鸭肉", "烤鸭": "鸭肉", "盐水鸭": "鸭肉", "酱鸭": "鸭肉",
-        "羊肉": "羊肉", "羊肉串": "羊肉", "羊排": "羊肉", "红烧羊肉": "羊肉",
-        "培根": "培根", "烟肉": "培根", "熏肉": "培根", "咸肉": "培根",
-        "火腿": "火腿", "火腿肠": "火腿", "午餐肉": "火腿",
-        "香肠": "香肠", "腊肠": "香肠", "广式腊肠": "香肠", "红肠": "香肠",
-        "肉丸": "肉丸", "牛肉丸": "肉丸", "鱼丸": "肉丸", "虾丸": "肉丸",
-        "火锅丸子": "火锅丸子", "撒尿牛丸": "火锅丸子", "贡丸": "火锅丸子", "鱼豆腐": "火锅丸子",
-
-        # ========== 蔬菜类 ==========
-        "生菜沙拉": "生菜沙拉", "沙拉": "生菜沙拉", "蔬菜沙拉": "生菜沙拉",
-        "青菜": "青菜", "小白菜": "青菜", "油菜": "青菜", "绿叶菜": "青菜",
-        "菠菜": "菠菜", "凉拌菠菜": "菠菜", "清炒菠菜": "菠菜",
-        "西兰花": "西兰花", "西蓝花": "西兰花", "花椰菜": "西兰花",
-        "白菜": "白菜", "大白菜": "白菜", "娃娃菜": "白菜", "圆白菜": "白菜",
-        "胡萝卜": "胡萝卜", "红萝卜": "胡萝卜", "炒胡萝卜": "胡萝卜",
-        "番茄": "番茄", "西红柿": "番茄", "番茄炒蛋": "番茄",
-        "黄瓜": "黄瓜", "凉拌黄瓜": "黄瓜", "拍黄瓜": "黄瓜",
-        "土豆": "土豆", "马铃薯": "土豆", "土豆丝": "土豆", "炸土豆": "土豆", "烤土豆": "土豆",
-        "茄子": "茄子", "烤茄子": "茄子", "鱼香茄子": "茄子", "地三鲜": "茄子",
-        "豆角": "豆角", "四季豆": "豆角", "长豆角": "豆角", "干煸豆角": "豆角",
-        "莲藕": "莲藕", "藕片": "莲藕", "糖醋藕": "莲藕",
-        "菌菇": "菌菇", "香菇": "菌菇", "平菇": "菌菇", "金针菇": "菌菇", "蘑菇": "菌菇",
-        "海带": "海带", "凉拌海带": "海带", "海带丝": "海带",
-        "豆芽": "豆芽", "绿豆芽": "豆芽", "黄豆芽": "豆芽",
-        "冬瓜": "冬瓜", "冬瓜汤": "冬瓜",
-        "南瓜": "南瓜", "蒸南瓜": "南瓜", "南瓜汤": "南瓜",
-
-        # ========== 水果类 ==========
-        "苹果": "苹果", "红富士": "苹果", "青苹果": "苹果",
-        "香蕉": "香蕉",
-        "橙子": "橙子", "橘子": "橙子", "砂糖橘": "橙子",
-        "葡萄": "葡萄", "提子": "葡萄", "巨峰葡萄": "葡萄",
-        "西瓜": "西瓜",
-        "梨": "梨", "香梨": "梨", "雪梨": "梨",
-        "桃子": "桃子", "水蜜桃": "桃子", "油桃": "桃子",
-        "猕猴桃": "猕猴桃", "奇异果": "猕猴桃",
-        "芒果": "芒果",
-        "草莓": "草莓",
-        "蓝莓": "蓝莓",
-        "樱桃": "樱桃",
-
-        # ========== 主食类 ==========
-        "米饭": "米饭", "白米饭": "米饭", "蒸饭": "米饭", "粳米": "米饭",
-        "面条": "面条", "拉面": "面条", "汤面": "面条", "炒面": "面条", "干面": "面条",
-        "意大利面": "意大利面", "意面": "意大利面", "pasta": "意大利面", "肉酱面": "意大利面",
-        "全麦面包": "全麦面包", "全麦吐司": "全麦面包", "黑麦面包": "全麦面包",
-        "白面包": "白面包", "吐司": "白面包", "切片面包": "白面包", "三明治面包": "白面包",
-        "馒头": "馒头", "蒸馒头": "馒头", "白馒头": "馒头", "花卷": "馒头",
-        "包子": "包子", "肉包": "包子", "菜包": "包子", "豆沙包": "包子",
-        "饺子": "饺子", "水饺": "饺子", "煎饺": "饺子", "蒸饺": "饺子",
-        "馄饨": "馄饨", "云吞": "馄饨", "抄手": "馄饨",
-        "煎饼": "煎饼", "煎饼果子": "煎饼", "鸡蛋饼": "煎饼",
-        "油条": "油条",
-        "粥": "粥", "白粥": "粥", "小米粥": "粥", "皮蛋瘦肉粥": "粥",
-        "年糕": "年糕", "炒年糕": "年糕", "糖年糕": "年糕",
-        "粽子": "粽子", "肉粽": "粽子", "蛋黄粽": "粽子", "豆沙粽": "粽子",
-        "烧麦": "烧麦", "烧卖": "烧麦",
-        "炒饭": "炒饭", "蛋炒饭": "炒饭", "扬州炒饭": "炒饭", "海鲜炒饭": "炒饭",
-        "炒面": "炒面", "蛋炒面": "炒面", "肉丝炒面": "炒面",
-
-        # ========== 蛋类 ==========
-        "鸡蛋": "鸡蛋", "水煮蛋": "鸡蛋", "煎蛋": "鸡蛋", "炒蛋": "鸡蛋",
-        "西红柿炒鸡蛋": "鸡蛋", "鸡蛋羹": "鸡蛋",
-        "鸭蛋": "鸭蛋", "咸鸭蛋": "鸭蛋", "皮蛋": "鸭蛋",
-        "鹌鹑蛋": "鹌鹑蛋", "卤蛋": "鹌鹑蛋", "虎皮蛋": "鹌鹑蛋",
-
-        # ========== 乳制品类 ==========
-        "牛奶": "牛奶", "纯牛奶": "牛奶", "鲜奶": "牛奶",
-        "酸奶": "酸奶", "酸牛奶": "酸奶", "发酵乳": "酸奶",
-        "奶酪": "奶酪", "芝士": "奶酪", "起司": "奶酪", "奶油芝士": "奶酪",
-        "奶粉": "奶粉", "牛奶粉": "奶粉",
-        "黄油": "黄油", "奶油": "黄油",
-
-        # ========== 豆制品类 ==========
-        "豆腐": "豆腐", "嫩豆腐": "豆腐", "老豆腐": "豆腐", "北豆腐": "豆腐",
-        "豆浆": "豆浆", "豆奶": "豆浆", "生磨豆浆": "豆浆",
-        "豆皮": "豆皮", "腐竹": "豆皮", "油皮": "豆皮",
-        "腐竹": "腐竹", "干腐竹": "腐竹",
-
-        # ========== 坚果零食类 ==========
-        "花生": "花生", "炒花生": "花生", "煮花生": "花生",
-        "核桃": "核桃", "胡桃": "核桃",
-        "杏仁": "杏仁", "巴旦木": "杏仁",
-        "瓜子": "瓜子", "葵花籽": "瓜子", "西瓜子": "瓜子",
-        "薯片": "薯片", "potato chips": "薯片",
-        "薯条": "薯条", "french fries": "薯条",
-        "爆米花": "爆米花",
-        "巧克力": "巧克力", "黑巧克力": "巧克力", "牛奶巧克力": "巧克力",
-
-        # ========== 外卖常见菜品 ==========
-        "宫保鸡丁": "宫保鸡丁", "花生鸡丁": "宫保鸡丁",
-        "鱼香肉丝": "鱼香肉丝",
-        "麻婆豆腐": "麻婆豆腐",
-        "回锅肉": "回锅肉",
-        "糖醋排骨": "糖醋排骨",
-        "水煮鱼": "水煮鱼",
-        "清炒时蔬": "清炒时蔬", "时蔬": "清炒时蔬",
-
-        # ========== 早餐常见 ==========
-        "玉米": "玉米", "煮玉米": "玉米", "烤玉米": "玉米",
-        "红薯": "红薯", "番薯": "红薯", "烤红薯": "红薯",
-    }
-
     @classmethod
     def get_api_key(cls) -> Optional[str]:
         """获取GLM API密钥"""
@@ -186,31 +129,30 @@ class AIService:
         # 去除空格和特殊字符
         name = raw_name.strip().replace("，", "").replace("。", "")
 
-        # 尝试精确匹配
-        if name in cls.FOOD_NAME_MAPPING:
-            return cls.FOOD_NAME_MAPPING[name]
-
-        # 尝试模糊匹配（包含关系）
-        for key, value in cls.FOOD_NAME_MAPPING.items():
-            if key in name or name in key:
-                return value
+        # 精确匹配 -> 包含的最长别名 -> 包含该名称的最短别名
+        matched = food_name_matcher.match(name)
+        if matched is not None:
+            return matched
 
         # 无法映射，返回原始名称（可能导致404）
         return name
 
     @classmethod
-    async def analyze_image_with_glm(cls, image_base64: str, multi_food: bool = False) -> List[str]:
+    async def analyze_image_with_glm(cls, image_base64: str, multi_food: bool = False,
+                                     timeout: Optional[float] = None) -> List[str]:
         """
         使用GLM API分析食物图片
 
         Args:
             image_base64: base64编码的图片数据（不含data:image前缀）
             multi_food: 是否支持多食物识别
+            timeout: 整个请求（含排队、上传和读取响应）的最长时间（秒），None 时只受 httpx 超时限制
 
         Returns:
             识别出的食物名称列表
 
         Raises:
+            GLMDeadlineExceeded: 超过 timeout 时抛出
             GLMError: API调用失败时抛出
         """
         api_key = cls.get_api_key()
@@ -281,48 +223,51 @@ class AIService:
         }
 
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    cls.GLM_API_URL,
-                    headers=headers,
-                    json=payload
-                )
-
-                # 处理响应
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get("choices"):
-                        content = data["choices"][0]["message"]["content"]
-                        # 清理响应内容
-                        content = content.strip().strip("。""，""、"".")
-
-                        if multi_food:
-                            # 多食物识别：解析逗号分隔的食物列表
-                            food_names = [name.strip() for name in content.split(",")]
-                            # 标准化每个食物名称
-                            normalized_names = [cls.normalize_food_name(name) for name in food_names if name.strip()]
-                            return normalized_names if normalized_names else [cls.normalize_food_name(content)]
-                        else:
-                            # 单食物识别：返回单个食物名称
-                            food_name = content
-                            return [food_name]
+            client = GLMHttpClient.get_client()
+            # httpx 的超时按单次读写计算，总时长由 wait_for 限制；超时会取消请求并释放连接
+            response = await asyncio.wait_for(client.post(
+                cls.GLM_API_URL,
+                headers=headers,
+                json=payload
+            ), timeout)
+
+            # 处理响应
+            if response.status_code == 200:
+                data = response.json()
+                if data.get("choices"):
+                    content = data["choices"][0]["message"]["content"]
+                    # 清理响应内容
+                    content = content.strip().strip("。""，""、"".")
+
+                    if multi_food:
+                        # 多食物识别：解析逗号分隔的食物列表
+                        food_names = [name.strip() for name in content.split(",")]
+                        # 标准化每个食物名称
+                        normalized_names = [cls.normalize_food_name(name) for name in food_names if name.strip()]
+                        return normalized_names if normalized_names else [cls.normalize_food_name(content)]
                     else:
-                        raise GLMError("GLM API 返回格式异常")
-                elif response.status_code == 401:
-                    raise GLMError("GLM API密钥无效")
-                elif response.status_code == 429:
-                    raise GLMError("GLM API 请求频率超限")
-                elif response.status_code >= 500:
-                    raise GLMError(f"GLM API 服务错误: {response.status_code}")
+                        # 单食物识别：返回单个食物名称
+                        food_name = content
+                        return [food_name]
                 else:
-                    error_detail = response.text
-                    try:
-                        error_json = response.json()
-                        error_detail = error_json.get("error", {}).get("message", error_detail)
-                    except:
-                        pass
-                    raise GLMError(f"GLM API 调用失败: {response.status_code} - {error_detail}")
-
+                    raise GLMError("GLM API 返回格式异常")
+            elif response.status_code == 401:
+                raise GLMError("GLM API密钥无效")
+            elif response.status_code == 429:
+                raise GLMRateLimited("GLM API 请求频率超限", retry_after=_parse_retry_after(response))
+            elif response.status_code >= 500:
+                raise GLMServerError(f"GLM API 服务错误: {response.status_code}")
+            else:
+                error_detail = response.text
+                try:
+                    error_json = response.json()
+                    error_detail = error_json.get("error", {}).get("message", error_detail)
+                except:
+                    pass
+                raise GLMError(f"GLM API 调用失败: {response.status_code} - {error_detail}")
+
+        except asyncio.TimeoutError:
+            raise GLMDeadlineExceeded(f"GLM API 请求超过截止时间（{timeout:.1f}s）")
         except httpx.TimeoutException:
             raise GLMError("GLM API 请求超时")
         except httpx.NetworkError as e:
@@ -350,36 +295,77 @@ class AIService:
         return [r["name"] for r in results]
 
     @classmethod
-    async def analyze_image(cls, image_base64: str) -> Tuple[str, bool]:
+    async def analyze_image(cls, image_base64: str,
+                            deadline: Optional[Deadline] = None) -> Tuple[str, bool]:
         """
         分析食物图片，返回识别结果（单食物）
 
         Args:
             image_base64: base64编码的图片数据
+            deadline: 请求截止时间
 
         Returns:
             (食物名称, 是否使用真实AI识别)
         """
-        food_names, ai_used = await cls.analyze_image_multi(image_base64, multi_food=False)
+        food_names, ai_used = await cls.analyze_image_multi(image_base64, multi_food=False, deadline=deadline)
         return food_names[0] if food_names else cls.mock_analyze_image(image_base64), ai_used
 
     @classmethod
-    async def analyze_image_multi(cls, image_base64: str, multi_food: bool = True) -> Tuple[List[str], bool]:
+    def register_stage(cls, stage: RecognitionStage):
+        """注册识别前置阶段（按注册顺序执行）"""
+        cls.PRE_RECOGNITION_STAGES.append(stage)
+
+    @classmethod
+    async def run_pre_recognition_stages(cls, request: RecognitionRequest) -> Optional[List[str]]:
+        """依次执行前置阶段，返回第一个命中的识别结果"""
+        for stage in cls.PRE_RECOGNITION_STAGES:
+            food_names = await stage.lookup(request)
+            if food_names is not None:
+                return food_names
+        return None
+
+    @classmethod
+    async def analyze_image_multi(cls, image_base64: str, multi_food: bool = True,
+                                  deadline: Optional[Deadline] = None) -> Tuple[List[str], bool]:
         """
         分析食物图片，返回识别结果（支持多食物）
 
         Args:
             image_base64: base64编码的图片数据
             multi_food: 是否支持多食物识别
+            deadline: 请求截止时间，GLM 在预算内没有返回时降级到模拟识别
 
         Returns:
             (食物名称列表, 是否使用真实AI识别)
         """
         if cls.is_glm_enabled():
+            # 前置阶段（完全相同/近重复图片）命中时直接返回，不再调用GLM
+            request = RecognitionRequest(image_base64, multi_food, cls.GLM_MODEL, deadline)
+            cached_names = await cls.run_pre_recognition_stages(request)
+            if cached_names is not None:
+                return cached_names, True
+
             try:
-                raw_names = await cls.analyze_image_with_glm(image_base64, multi_food=multi_food)
-                normalized_names = [cls.normalize_food_name(name) for name in raw_names]
-                return normalized_names, True
+                if deadline is not None and deadline.budget() <= 0:
+                    raise GLMError("请求预算已用完，跳过调用")
+                # 熔断打开时不调用GLM，立即降级
+                if not glm_breaker.allow_request():
+                    raise GLMError("GLM 熔断中，跳过调用")
+                # 相同图片、相同模式的并发请求共享同一次GLM调用
+                flight = glm_single_flight.do(request.key, lambda: cls.recognize_with_glm(request))
+                if deadline is None:
+                    normalized_names = await flight
+                else:
+                    # GLM调用本身按发起者的预算超时（计入熔断器）；这里兜底共享他人调用的等待者，
+                    # 不等待超过本请求的截止时间，多给半个预留时间避免抢在调用自身超时之前。
+                    # 所有等待者都离开后 single-flight 取消GLM调用
+                    try:
+                        normalized_names = await asyncio.wait_for(
+                            flight, deadline.remaining() - deadline.reserve / 2
+                        )
+                    except asyncio.TimeoutError:
+                        raise GLMError("等待GLM识别超过截止时间")
+                return list(normalized_names), True
             except GLMError as e:
                 # GLM调用失败，降级到模拟识别
                 print(f"GLM识别失败，降级到模拟识别: {str(e)}")
@@ -391,6 +377,93 @@ class AIService:
             count = 2 if multi_food else 1
             return cls.mock_analyze_multi_image(image_base64, count), False
 
+    @classmethod
+    async def recognize_with_glm(cls, request: RecognitionRequest) -> List[str]:
+        """
+        调用GLM识别并标准化食物名称，成功后写入各前置阶段
+        被限流（429）时在请求截止时间内重新排队重试，最多 RATE_LIMIT_RETRIES 次（需开启准入控制）
+
+        Raises:
+            GLMError: API调用失败时抛出
+        """
+        # 缩小、去除EXIF并重新压缩后再上传
+        prepared = await image_preprocessor.prepare(request)
+        for attempt in range(cls.RATE_LIMIT_RETRIES + 1):
+            try:
+                raw_names = await cls.call_glm_admitted(request, prepared.image_url)
+                break
+            except GLMRateLimited:
+                # 没有准入控制时立即重试只会再次被限流
+                if attempt == cls.RATE_LIMIT_RETRIES or not glm_admission.enabled:
+                    raise
+                logger.warning(f"GLM 请求频率超限，重新排队重试（第 {attempt + 1} 次）")
+        normalized_names = [cls.normalize_food_name(name) for name in raw_names]
+        for stage in cls.PRE_RECOGNITION_STAGES:
+            await stage.remember(request, normalized_names)
+        return normalized_names
+
+    @classmethod
+    async def call_glm_admitted(cls, request: RecognitionRequest, image_url: str) -> List[str]:
+        """
+        经准入控制（限速、并发上限、排队）调用一次GLM，GLM调用不超过请求截止时间的预算
+
+        - 429/5xx 使准入控制降低并发上限，成功时逐步提高
+        - 调用结果（失败、超时、耗时）计入熔断器；429 已由准入控制处理，不计入熔断器
+
+        Raises:
+            GLMError: 未获准入或API调用失败时抛出
+        """
+        timeout = request.deadline.budget() if request.deadline is not None else None
+        if timeout is not None and timeout <= 0:
+            glm_breaker.record_abandoned()
+            raise GLMError("请求预算已用完，跳过调用")
+
+        permit = None
+        outcome = Outcome.IGNORE
+        started = time.monotonic()
+        try:
+            permit = await glm_admission.acquire(timeout)
+            if timeout is not None:
+                timeout = request.deadline.budget()  # 扣除排队时间
+            started = time.monotonic()
+            raw_names = await cls.analyze_image_with_glm(image_url, multi_food=request.multi_food, timeout=timeout)
+            outcome = Outcome.SUCCESS
+        except AdmissionRejected as e:
+            glm_breaker.record_abandoned()
+            raise GLMError(f"GLM 准入被拒绝: {e.reason}")
+        except GLMRateLimited as e:
+            outcome = Outcome.OVERLOAD
+            if e.retry_after:
+                glm_admission.backoff(e.retry_after)
+            glm_breaker.record_abandoned()
+            raise
+        except GLMDeadlineExceeded:
+            # 截止时间由客户端决定：客户端给的时间不少于服务端默认值、或GLM预算不小于慢调用阈值时，
+            # 超时才说明GLM慢；否则只是这个客户端给的时间太短，不能因此让所有请求熔断
+            if timeout is not None and (request.deadline.timeout * 1000 >= DEFAULT_TIMEOUT_MS
+                                        or timeout >= glm_breaker.slow_call_seconds):
+                glm_breaker.record_timeout(time.monotonic() - started)
+            else:
+                glm_breaker.record_abandoned()
+            raise
+        except GLMError as e:
+            if isinstance(e, GLMServerError):
+                outcome = Outcome.OVERLOAD
+            glm_breaker.record_failure(str(e))
+            raise
+        except asyncio.CancelledError:
+            glm_breaker.record_abandoned()
+            raise
+        except Exception as e:
+            # 未包装成 GLMError 的异常同样计入熔断器，否则半开状态的探测名额会一直被占用
+            glm_breaker.record_failure(f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            if permit is not None:
+                permit.release(outcome)
+        glm_breaker.record_success(time.monotonic() - started)
+        return raw_names
+
     @classmethod
     def get_portion_options_for_food(cls, db: Session, food_name: str) -> List[Dict]:
         """
@@ -406,7 +479,7 @@ class AIService:
         """
         portions = db.query(VisualPortion).filter(
             VisualPortion.food_name == food_name
-        ).all()
+        ).order_by(VisualPortion.display_rank, VisualPortion.id).all()
 
         if not portions:
             return []
@@ -429,8 +502,11 @@ class AIService:
         获取知识库中所有可用的食物名称
         用于调试和验证
         """
-        foods = db.query(VisualPortion.food_name).distinct().all()
-        return [f[0] for f in foods]
+        return get_knowledge_index(db).food_names()
+
+
+# 编译后的名称匹配器（导入时构建一次）
+food_name_matcher = FoodNameMatcher.from_catalog(food_catalog)
 
 
 # 便捷函数
@@ -0,0 +1,170 @@
+"""
+熔断器 - GLM 持续失败或响应过慢时直接走降级路径
+GLM 异常期间每个识别请求都要等到 httpx 超时（最长 30 秒）才降级，
+熔断打开后请求立即降级，冷却后放行一个探测请求确认是否恢复
+"""
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+from ..config.settings import env_bool, env_float, env_int
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState:
+    """熔断器状态"""
+    CLOSED = "closed"         # 正常放行
+    OPEN = "open"             # 熔断中，全部拒绝
+    HALF_OPEN = "half_open"   # 冷却结束，只放行一个探测请求
+
+
+class CircuitBreaker:
+    """
+    按最近调用的失败率（超过 slow_call_seconds 的慢调用也算失败）熔断
+
+    - closed: 最近 window 次调用中至少 min_calls 次且失败率达到 failure_rate 时打开
+    - open: open_seconds 后进入 half_open
+    - half_open: 放行一个探测请求，成功则关闭，失败则重新打开；
+      探测请求超过 probe_timeout 仍未返回结果时允许新的探测
+
+    slow_call_seconds 必须小于识别请求默认截止时间留给 GLM 的预算（默认 4 秒），
+    否则调用在变慢之前就被截止时间中止，慢调用永远不会被记录
+    """
+
+    def __init__(self, name: str, enabled: bool = True, window: int = 20, min_calls: int = 5,
+                 failure_rate: float = 0.5, slow_call_seconds: float = 3.0,
+                 open_seconds: float = 30.0, probe_timeout: float = 60.0):
+        self.name = name
+        self.enabled = enabled
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.probe_timeout = probe_timeout
+
+        self.state = CircuitState.CLOSED
+        self._outcomes: Deque[bool] = deque(maxlen=window)  # True = 失败或慢调用
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+        self._transitions: Deque[Dict] = deque(maxlen=20)
+        self._stats = {"successes": 0, "failures": 0, "slow_calls": 0, "rejected": 0, "probes": 0}
+
+    def allow_request(self) -> bool:
+        """是否放行本次调用（拒绝时调用方应立即降级）"""
+        if not self.enabled:
+            return True
+
+        now = time.monotonic()
+        if self.state == CircuitState.OPEN and now - self._opened_at >= self.open_seconds:
+            self._transition(CircuitState.HALF_OPEN, "冷却结束")
+
+        if self.state == CircuitState.CLOSED:
+            return True
+        if self.state == CircuitState.HALF_OPEN and (
+                self._probe_started is None or now - self._probe_started >= self.probe_timeout):
+            self._probe_started = now
+            self._stats["probes"] += 1
+            return True
+
+        self._stats["rejected"] += 1
+        return False
+
+    def record_success(self, latency: float):
+        """记录一次成功的调用（耗时超过 slow_call_seconds 时按失败计）"""
+        if latency >= self.slow_call_seconds:
+            self._stats["slow_calls"] += 1
+            self._record(True, f"慢调用 {latency:.1f}s")
+        else:
+            self._stats["successes"] += 1
+            self._record(False, "探测成功")
+
+    def record_failure(self, reason: str = ""):
+        """记录一次失败的调用"""
+        self._stats["failures"] += 1
+        self._record(True, f"探测失败: {reason}" if reason else "探测失败")
+
+    def record_timeout(self, latency: float):
+        """记录一次在请求截止时间前没有返回、被中止的调用（按慢调用计）"""
+        self._stats["slow_calls"] += 1
+        self._record(True, f"探测超时 {latency:.1f}s")
+
+    def record_abandoned(self):
+        """调用被取消、没有结果（不计入统计，释放探测名额）"""
+        if self.state == CircuitState.HALF_OPEN:
+            self._probe_started = None
+
+    def _record(self, failed: bool, probe_reason: str):
+        if not self.enabled:
+            return
+        if self.state == CircuitState.HALF_OPEN:
+            if failed:
+                self._open(probe_reason)
+            else:
+                self._outcomes.clear()
+                self._transition(CircuitState.CLOSED, probe_reason)
+            return
+        if self.state == CircuitState.OPEN:
+            return  # 打开前已发出的调用，结果不影响状态
+
+        self._outcomes.append(failed)
+        if len(self._outcomes) >= self.min_calls:
+            rate = sum(self._outcomes) / len(self._outcomes)
+            if rate >= self.failure_rate:
+                self._open(f"最近 {len(self._outcomes)} 次调用失败率 {rate:.0%}")
+
+    def _open(self, reason: str):
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self._transition(CircuitState.OPEN, reason)
+
+    def _transition(self, state: str, reason: str):
+        previous, self.state = self.state, state
+        self._probe_started = None
+        self._transitions.append({
+            "from": previous,
+            "to": state,
+            "reason": reason,
+            "at": time.time(),
+        })
+        log = logger.warning if state == CircuitState.OPEN else logger.info
+        log(f"{self.name} 熔断器: {previous} -> {state}（{reason}）")
+
+    def reset(self):
+        """手动关闭熔断器"""
+        self._outcomes.clear()
+        if self.state != CircuitState.CLOSED:
+            self._transition(CircuitState.CLOSED, "手动重置")
+
+    def stats(self) -> Dict:
+        failures = sum(self._outcomes)
+        retry_in: Optional[float] = None
+        if self.state == CircuitState.OPEN:
+            retry_in = round(max(0.0, self.open_seconds - (time.monotonic() - self._opened_at)), 1)
+        transitions: List[Dict] = list(self._transitions)
+        return {
+            **self._stats,
+            "enabled": self.enabled,
+            "state": self.state,
+            "window_calls": len(self._outcomes),
+            "window_failure_rate": round(failures / len(self._outcomes), 4) if self._outcomes else 0.0,
+            "retry_in_seconds": retry_in,
+            "failure_rate_threshold": self.failure_rate,
+            "slow_call_seconds": self.slow_call_seconds,
+            "open_seconds": self.open_seconds,
+            "transitions": transitions,
+        }
+
+
+# GLM 熔断器
+glm_breaker = CircuitBreaker(
+    name="GLM",
+    enabled=env_bool("GLM_BREAKER_ENABLED", True),
+    window=env_int("GLM_BREAKER_WINDOW", 20),
+    min_calls=env_int("GLM_BREAKER_MIN_CALLS", 5),
+    failure_rate=env_float("GLM_BREAKER_FAILURE_RATE", 0.5),
+    slow_call_seconds=env_float("GLM_BREAKER_SLOW_CALL_SECONDS", 3.0),
+    open_seconds=env_float("GLM_BREAKER_OPEN_SECONDS", 30.0),
+    probe_timeout=env_float("GLM_BREAKER_PROBE_TIMEOUT", 60.0),
+)
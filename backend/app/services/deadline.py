@@ -0,0 +1,60 @@
+"""
+请求截止时间 - 识别请求从进入到返回的总时间预算
+前端 5 秒后就放弃 /api/analyze 请求，后端却要等到 httpx 超时（最长 30 秒）才降级；
+截止时间来自请求头 X-Request-Timeout-Ms（没有时使用服务端默认值），
+GLM 调用只能使用扣除预留时间后的预算，预留部分用于降级和数据库查询
+"""
+import time
+from typing import Optional
+from ..config.settings import env_int
+
+# 请求头
+DEADLINE_HEADER = "X-Request-Timeout-Ms"
+
+# 默认预算略小于前端 5 秒超时，保证响应在前端放弃之前返回
+DEFAULT_TIMEOUT_MS = env_int("ANALYZE_DEADLINE_MS", 4500)
+# 客户端可以请求的预算范围（比默认值短、且 GLM 预算小于熔断器慢调用阈值时，超时不计入熔断器）
+MIN_TIMEOUT_MS = env_int("ANALYZE_DEADLINE_MIN_MS", 1000)
+MAX_TIMEOUT_MS = env_int("ANALYZE_DEADLINE_MAX_MS", 30000)
+# 为降级和数据库查询预留的时间
+RESERVE_MS = env_int("ANALYZE_DEADLINE_RESERVE_MS", 500)
+
+
+class Deadline:
+    """一次请求的截止时间（基于单调时钟）"""
+
+    __slots__ = ("timeout", "expires_at", "reserve")
+
+    def __init__(self, timeout: float, reserve: float = RESERVE_MS / 1000):
+        self.timeout = timeout
+        self.expires_at = time.monotonic() + timeout
+        self.reserve = reserve
+
+    @classmethod
+    def from_header(cls, value: Optional[str]) -> "Deadline":
+        """
+        根据 X-Request-Timeout-Ms 请求头创建截止时间
+
+        请求头缺失或格式错误时使用 ANALYZE_DEADLINE_MS，
+        超出 [ANALYZE_DEADLINE_MIN_MS, ANALYZE_DEADLINE_MAX_MS] 时取边界值
+        """
+        timeout_ms = DEFAULT_TIMEOUT_MS
+        if value:
+            try:
+                timeout_ms = int(value)
+            except ValueError:
+                pass
+        timeout_ms = min(max(timeout_ms, MIN_TIMEOUT_MS), MAX_TIMEOUT_MS)
+        return cls(timeout_ms / 1000)
+
+    def remaining(self) -> float:
+        """剩余时间（秒），已超时时为 0"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def budget(self) -> float:
+        """扣除预留时间后还能用于 GLM 调用的时间（秒）"""
+        return max(0.0, self.remaining() - self.reserve)
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
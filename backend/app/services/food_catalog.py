@@ -0,0 +1,149 @@
+"""
+食物知识目录 - 编译后的只读食物知识
+EXTENDED_FOOD_DATABASE（分类、别名、营养数据、份量）和识别名称重定向表在导入时编译一次，
+分类、别名、营养数据、份量和名称映射都从这里查询，每次查找只需一次字典访问
+"""
+from types import MappingProxyType
+from typing import Dict, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+from ..data.extended_food_database import (
+    EXTENDED_FOOD_DATABASE, FOOD_CATEGORIES, RECOGNITION_NAME_OVERRIDES
+)
+
+
+class CategorySpec(NamedTuple):
+    """食物分类"""
+    key: str
+    name: str
+    icon: str
+    description: str
+
+
+class PortionSpec(NamedTuple):
+    """份量定义"""
+    name: str
+    weight_grams: float
+
+
+class FoodEntry(NamedTuple):
+    """一种食物的全部知识"""
+    name: str
+    category: str
+    aliases: Tuple[str, ...]
+    calories_per_100g: float
+    protein_per_100g: float
+    portions: Tuple[PortionSpec, ...]
+
+
+class FoodCatalog:
+    """
+    不可变的食物知识目录
+
+    - foods: 食物名称 -> FoodEntry（保持知识库中的顺序）
+    - categories: 分类键 -> CategorySpec
+    - by_category: 分类键 -> 该分类下的食物
+    - name_table: 识别名称/别名 -> 标准名称（按匹配优先顺序排列）
+    """
+
+    __slots__ = ("_foods", "_categories", "_by_category", "_name_table")
+
+    def __init__(self, foods: List[FoodEntry], categories: List[CategorySpec],
+                 name_overrides: Mapping[str, str]):
+        self._foods: Mapping[str, FoodEntry] = MappingProxyType({entry.name: entry for entry in foods})
+        self._categories: Mapping[str, CategorySpec] = MappingProxyType({c.key: c for c in categories})
+
+        by_category: Dict[str, List[FoodEntry]] = {key: [] for key in self._categories}
+        for entry in self._foods.values():
+            if entry.category not in by_category:
+                raise ValueError(f"食物「{entry.name}」的分类 {entry.category} 不存在")
+            by_category[entry.category].append(entry)
+        self._by_category = MappingProxyType({key: tuple(entries) for key, entries in by_category.items()})
+
+        for alias, food_name in name_overrides.items():
+            if food_name not in self._foods:
+                raise ValueError(f"名称重定向「{alias}」指向不存在的食物「{food_name}」")
+        self._name_table = MappingProxyType(self._build_name_table(name_overrides))
+
+    def _build_name_table(self, name_overrides: Mapping[str, str]) -> Dict[str, str]:
+        """
+        合并名称重定向、标准名称和别名
+
+        优先级：名称重定向 > 标准名称 > 别名（多个食物使用同一别名时取先出现的）；
+        重定向排在最前面，保证匹配长度相同时优先使用
+        """
+        mapping: Dict[str, str] = {}
+        for entry in self._foods.values():
+            for alias in entry.aliases:
+                mapping.setdefault(alias, entry.name)
+        for name in self._foods:
+            mapping[name] = name
+        mapping.update(name_overrides)
+
+        ordered = {alias: mapping[alias] for alias in name_overrides}
+        for alias, food_name in mapping.items():
+            ordered.setdefault(alias, food_name)
+        return ordered
+
+    @classmethod
+    def compile(cls, database: Mapping[str, dict], categories: Mapping[str, dict],
+                name_overrides: Mapping[str, str]) -> "FoodCatalog":
+        """从 EXTENDED_FOOD_DATABASE 格式的知识库编译目录"""
+        return cls(
+            foods=[
+                FoodEntry(
+                    name=food_name,
+                    category=data["category"],
+                    aliases=tuple(alias.strip() for alias in data.get("aliases", []) if alias.strip()),
+                    calories_per_100g=data["calories_per_100g"],
+                    protein_per_100g=data["protein_per_100g"],
+                    portions=tuple(PortionSpec(p["name"], p["weight"]) for p in data["portions"]),
+                )
+                for food_name, data in database.items()
+            ],
+            categories=[
+                CategorySpec(key=key, name=info["name"], icon=info["icon"], description=info["description"])
+                for key, info in categories.items()
+            ],
+            name_overrides=name_overrides,
+        )
+
+    def __len__(self) -> int:
+        return len(self._foods)
+
+    def __contains__(self, food_name: str) -> bool:
+        return food_name in self._foods
+
+    def __iter__(self) -> Iterator[FoodEntry]:
+        return iter(self._foods.values())
+
+    def get(self, food_name: str) -> Optional[FoodEntry]:
+        return self._foods.get(food_name)
+
+    def category_of(self, food_name: str) -> Optional[str]:
+        """食物所属分类，不在知识库中时返回 None"""
+        entry = self._foods.get(food_name)
+        return entry.category if entry else None
+
+    def aliases_of(self, food_name: str) -> Tuple[str, ...]:
+        entry = self._foods.get(food_name)
+        return entry.aliases if entry else ()
+
+    def portions_of(self, food_name: str) -> Tuple[PortionSpec, ...]:
+        entry = self._foods.get(food_name)
+        return entry.portions if entry else ()
+
+    @property
+    def categories(self) -> Mapping[str, CategorySpec]:
+        return self._categories
+
+    def foods_in(self, category: str) -> Tuple[FoodEntry, ...]:
+        """该分类下的食物（知识库顺序）"""
+        return self._by_category.get(category, ())
+
+    @property
+    def name_table(self) -> Mapping[str, str]:
+        """识别名称/别名 -> 标准名称，供名称匹配器编译使用"""
+        return self._name_table
+
+
+# 全局食物知识目录（导入时编译一次）
+food_catalog = FoodCatalog.compile(EXTENDED_FOOD_DATABASE, FOOD_CATEGORIES, RECOGNITION_NAME_OVERRIDES)
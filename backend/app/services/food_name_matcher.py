@@ -0,0 +1,117 @@
+"""
+食物名称匹配器 - 将 GLM 返回的菜名映射到知识库标准名称
+基于 Aho-Corasick 多模式匹配，构建一次，匹配耗时与映射表大小无关
+"""
+from typing import Dict, List, Mapping, Optional, Tuple
+from .food_catalog import FoodCatalog
+
+
+class FoodNameMatcher:
+    """
+    编译后的别名匹配器
+
+    匹配优先级：
+    1. 精确匹配
+    2. 名称中包含的最长别名（等长时取位置最靠前的）
+    3. 包含该名称的最短别名（等长时取映射表中先出现的）
+    """
+
+    def __init__(self, mapping: Mapping[str, str]):
+        """
+        Args:
+            mapping: 别名 -> 标准名称（按优先顺序排列）
+        """
+        self._exact: Dict[str, str] = dict(mapping)
+        self._order: Dict[str, int] = {key: i for i, key in enumerate(self._exact)}
+
+        # Aho-Corasick 自动机
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._longest: List[Optional[str]] = [None]  # 在该状态结束的最长别名
+        for key in self._exact:
+            self._add_pattern(key)
+        self._build_failure_links()
+
+        # 子串 -> 包含它的最短别名（用于名称比别名更短的情况）
+        self._containing: Dict[str, str] = {}
+        for key in self._exact:
+            for start in range(len(key)):
+                for end in range(start + 1, len(key) + 1):
+                    sub = key[start:end]
+                    current = self._containing.get(sub)
+                    if current is None or self._rank(key) < self._rank(current):
+                        self._containing[sub] = key
+
+    def _rank(self, key: str) -> Tuple[int, int]:
+        return len(key), self._order[key]
+
+    def _add_pattern(self, pattern: str):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._longest.append(None)
+            state = next_state
+        self._longest[state] = pattern
+
+    def _build_failure_links(self):
+        """广度优先构建失配指针，并沿失配链继承最长输出"""
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                if self._longest[next_state] is None:
+                    self._longest[next_state] = self._longest[self._fail[next_state]]
+
+    def find_longest(self, text: str) -> Optional[str]:
+        """找出文本中包含的最长别名（线性时间）"""
+        best: Optional[str] = None
+        state = 0
+        for char in text:
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            found = self._longest[state]
+            # 只有更长时才替换，等长时保留位置更靠前的匹配
+            if found is not None and (best is None or len(found) > len(best)):
+                best = found
+        return best
+
+    def match(self, name: str) -> Optional[str]:
+        """
+        将名称映射到标准名称
+
+        Returns:
+            标准名称；无法匹配时返回 None
+        """
+        if not name:
+            return None
+
+        if name in self._exact:
+            return self._exact[name]
+
+        key = self.find_longest(name)
+        if key is None:
+            key = self._containing.get(name)
+        return self._exact[key] if key is not None else None
+
+    @classmethod
+    def from_catalog(cls, catalog: FoodCatalog) -> "FoodNameMatcher":
+        """
+        从食物知识目录的名称表构建匹配器
+
+        优先级：名称重定向 > 知识库标准名称 > 知识库别名
+        """
+        return cls(catalog.name_table)
@@ -0,0 +1,169 @@
+"""
+食物搜索索引 - 支持名称、别名和拼音首字母的子串搜索
+模块导入时一次性构建，搜索时只需一次字典查找，与食物数量无关
+"""
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+try:
+    from pypinyin import lazy_pinyin, Style  # 可选依赖，覆盖更多汉字
+except ImportError:  # 未安装时使用内置的 GB2312 首字母表
+    lazy_pinyin = None
+    Style = None
+
+from .food_catalog import FoodCatalog, food_catalog
+
+
+# GB2312 一级汉字按拼音排序，每个声母区间的起始编码
+_GB2312_INITIALS: Tuple[Tuple[int, str], ...] = (
+    (0xB0A1, "a"), (0xB0C5, "b"), (0xB2C1, "c"), (0xB4EE, "d"),
+    (0xB6EA, "e"), (0xB7A2, "f"), (0xB8C1, "g"), (0xB9FE, "h"),
+    (0xBBF7, "j"), (0xBFA6, "k"), (0xC0AC, "l"), (0xC2E8, "m"),
+    (0xC4C3, "n"), (0xC5B6, "o"), (0xC5BE, "p"), (0xC6DA, "q"),
+    (0xC8BB, "r"), (0xC8F6, "s"), (0xCBFA, "t"), (0xCDDA, "w"),
+    (0xCEF4, "x"), (0xD1B9, "y"), (0xD4D1, "z"),
+)
+_GB2312_LEVEL1_END = 0xD7F9
+
+# 知识库中用到的二级汉字（按部首排序，需单独补充）
+_EXTRA_INITIALS: Dict[str, str] = {
+    "橘": "j", "焖": "m", "煸": "b", "猕": "m", "粽": "z", "莓": "m", "螃": "p",
+    "饨": "t", "馄": "h", "鲈": "l", "鲫": "j", "鹌": "a", "鹑": "c",
+}
+
+
+def _char_initial(char: str) -> Optional[str]:
+    """获取单个字符的拼音首字母（ASCII 字母和数字原样返回）"""
+    if char.isascii():
+        return char.lower() if char.isalnum() else None
+    if char in _EXTRA_INITIALS:
+        return _EXTRA_INITIALS[char]
+
+    try:
+        encoded = char.encode("gb2312")
+    except UnicodeEncodeError:
+        return None
+    if len(encoded) != 2:
+        return None
+
+    code = (encoded[0] << 8) | encoded[1]
+    if code < _GB2312_INITIALS[0][0] or code > _GB2312_LEVEL1_END:
+        return None  # 二级汉字按部首排序，无法推算首字母
+
+    initial = None
+    for start, letter in _GB2312_INITIALS:
+        if code < start:
+            break
+        initial = letter
+    return initial
+
+
+def pinyin_initials(text: str) -> str:
+    """
+    获取文本的拼音首字母，如 "鸡胸肉" -> "jxr"
+    含有无法识别的字符时返回空字符串，避免生成错误的首字母
+    """
+    if lazy_pinyin is not None:
+        return "".join(
+            p[0].lower() for p in lazy_pinyin(text, style=Style.FIRST_LETTER) if p and p[0].isalnum()
+        )
+    initials = [_char_initial(c) for c in text if not c.isspace()]
+    if None in initials:
+        return ""
+    return "".join(initials)
+
+
+class SearchHit(NamedTuple):
+    """搜索结果"""
+    food_name: str
+    score: int     # 匹配得分，越高越相关
+    matched: str   # 命中的名称/别名/拼音首字母
+
+
+# 匹配得分：(完全匹配, 前缀匹配, 子串匹配)
+NAME_SCORES = (100, 80, 60)
+ALIAS_SCORES = (90, 70, 50)
+PINYIN_SCORES = (75, 65, 40)
+
+
+class FoodSearchIndex:
+    """
+    子串倒排索引
+
+    预先枚举每个名称、别名和拼音首字母的全部子串，
+    每个子串对应一个按得分排好序的结果列表，查询时直接截取前 k 个
+    """
+
+    def __init__(self, foods: Mapping[str, Iterable[str]]):
+        """
+        Args:
+            foods: 食物标准名称 -> 别名列表（按展示顺序）
+        """
+        best: Dict[str, Dict[str, Tuple[int, int, int, str]]] = {}
+
+        for order, (food_name, aliases) in enumerate(foods.items()):
+            keys = [(food_name.strip().lower(), NAME_SCORES)]
+            keys += [(alias.strip().lower(), ALIAS_SCORES) for alias in aliases if alias.strip()]
+            keys.append((pinyin_initials(food_name), PINYIN_SCORES))
+
+            for key, scores in keys:
+                if not key:
+                    continue
+                for gram, score in self._substrings(key, scores):
+                    # 排序键：得分降序、命中词长度升序、目录顺序升序
+                    candidate = (-score, len(key), order, key)
+                    current = best.setdefault(gram, {}).get(food_name)
+                    if current is None or candidate < current:
+                        best[gram][food_name] = candidate
+
+        self._postings: Dict[str, Tuple[SearchHit, ...]] = {
+            gram: tuple(
+                SearchHit(food_name=food_name, score=-c[0], matched=c[3])
+                for food_name, c in sorted(hits.items(), key=lambda item: item[1])
+            )
+            for gram, hits in best.items()
+        }
+
+    @staticmethod
+    def _substrings(key: str, scores: Tuple[int, int, int]):
+        """枚举关键词的所有子串及对应得分"""
+        exact, prefix, substring = scores
+        length = len(key)
+        for start in range(length):
+            for end in range(start + 1, length + 1):
+                if start == 0:
+                    score = exact if end == length else prefix
+                else:
+                    score = substring
+                yield key[start:end], score
+
+    @classmethod
+    def from_catalog(cls, catalog: FoodCatalog) -> "FoodSearchIndex":
+        """从食物知识目录构建索引"""
+        return cls({entry.name: entry.aliases for entry in catalog})
+
+    def search(self, query: str, limit: int = 20) -> List[SearchHit]:
+        """
+        搜索食物
+
+        Args:
+            query: 搜索词（名称、别名或拼音首字母的任意子串）
+            limit: 最多返回的结果数量
+
+        Returns:
+            按相关度排序的搜索结果
+        """
+        key = query.strip().lower()
+        if not key:
+            return []
+        return list(self._postings.get(key, ())[:limit])
+
+
+# 全局搜索索引（导入时构建一次）
+food_search_index = FoodSearchIndex.from_catalog(food_catalog)
+
+
+def search_foods(query: str, limit: int = 20) -> List[SearchHit]:
+    """
+    便捷函数：搜索食物
+    """
+    return food_search_index.search(query, limit)
@@ -0,0 +1,73 @@
+"""
+GLM HTTP 客户端 - 应用生命周期内共享的连接池
+避免每次识别都重新进行 TCP + TLS 握手
+"""
+import logging
+from typing import Optional
+import httpx
+from ..config.settings import env_bool, env_float, env_int
+
+logger = logging.getLogger(__name__)
+
+
+class GLMHttpClient:
+    """
+    共享的 httpx.AsyncClient
+
+    由 app/main.py 的 startup/shutdown 钩子管理；
+    未启动时（如独立脚本）首次使用会自动创建
+    """
+
+    _client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def http2_available(cls) -> bool:
+        """HTTP/2 需要安装 h2 包（pip install httpx[http2]）"""
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    @classmethod
+    def build_client(cls) -> httpx.AsyncClient:
+        """根据环境变量创建客户端"""
+        limits = httpx.Limits(
+            max_connections=env_int("GLM_HTTP_MAX_CONNECTIONS", 20),
+            max_keepalive_connections=env_int("GLM_HTTP_MAX_KEEPALIVE", 10),
+            keepalive_expiry=env_float("GLM_HTTP_KEEPALIVE_EXPIRY", 60.0),
+        )
+        timeout = httpx.Timeout(
+            connect=env_float("GLM_CONNECT_TIMEOUT", 5.0),
+            read=env_float("GLM_READ_TIMEOUT", 30.0),
+            write=env_float("GLM_WRITE_TIMEOUT", 10.0),
+            pool=env_float("GLM_POOL_TIMEOUT", 5.0),
+        )
+
+        http2 = env_bool("GLM_HTTP2", False)
+        if http2 and not cls.http2_available():
+            logger.warning("GLM_HTTP2 已开启但未安装 h2，回退到 HTTP/1.1")
+            http2 = False
+
+        return httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2)
+
+    @classmethod
+    def get_client(cls) -> httpx.AsyncClient:
+        """获取共享客户端"""
+        if cls._client is None or cls._client.is_closed:
+            cls._client = cls.build_client()
+        return cls._client
+
+    @classmethod
+    async def startup(cls):
+        """应用启动时创建连接池"""
+        client = cls.get_client()
+        logger.info(f"GLM HTTP 客户端已创建 (timeout={client.timeout})")
+
+    @classmethod
+    async def shutdown(cls):
+        """应用关闭时释放连接"""
+        if cls._client is not None:
+            await cls._client.aclose()
+            cls._client = None
+            logger.info("GLM HTTP 客户端已关闭")
@@ -0,0 +1,121 @@
+"""
+图片预处理 - 上传 GLM 之前缩小尺寸、去除 EXIF 并重新压缩
+手机原图动辄数 MB，缩到 1024px 左右足够识别，同时大幅减少上传时间和流量
+图片处理在独立线程池中执行，不阻塞事件循环
+"""
+import asyncio
+import base64
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
+
+try:
+    from PIL import Image, ImageOps  # 可选依赖，未安装时原样上传
+except ImportError:
+    Image = None
+    ImageOps = None
+
+from ..config.settings import env_bool, env_int
+from .recognition_stages import RecognitionRequest
+
+logger = logging.getLogger(__name__)
+
+
+class PreparedImage(NamedTuple):
+    """预处理结果"""
+    image_url: str        # 发送给 GLM 的图片（data URL）
+    original_bytes: int   # 原图字节数
+    prepared_bytes: int   # 处理后字节数
+    processed: bool       # 是否经过重新编码
+
+
+def preprocess_image(image_bytes: bytes, max_edge: int = 1024, quality: int = 80) -> Optional[bytes]:
+    """
+    缩小并重新编码图片（同步，在线程池中调用）
+
+    - 按 EXIF 方向旋转后丢弃全部元数据
+    - 长边缩小到 max_edge 以内
+    - 以 JPEG 格式、指定质量重新编码
+
+    Returns:
+        JPEG 字节；Pillow 未安装或无法解码时返回 None
+    """
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            img.draft("RGB", (max_edge, max_edge))  # JPEG 解码时直接降采样
+            img = ImageOps.exif_transpose(img)
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+            output = io.BytesIO()
+            img.save(output, format="JPEG", quality=quality, optimize=True)  # 不写入 EXIF
+            return output.getvalue()
+    except Exception as e:
+        logger.warning(f"图片预处理失败，使用原图: {e}")
+        return None
+
+
+class ImagePreprocessor:
+    """GLM 上传前的图片预处理阶段"""
+
+    def __init__(self, enabled: bool = True, max_edge: int = 1024, quality: int = 80, workers: int = 2):
+        self.enabled = enabled
+        self.max_edge = max_edge
+        self.quality = quality
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="image-preprocess")
+        return self._executor
+
+    async def prepare(self, request: RecognitionRequest) -> PreparedImage:
+        """
+        预处理识别请求中的图片
+
+        处理失败或结果反而更大时，原样上传
+        """
+        original = request.image_bytes
+        passthrough = PreparedImage(
+            image_url=request.image_base64,
+            original_bytes=len(original),
+            prepared_bytes=len(original),
+            processed=False
+        )
+        if not self.enabled or Image is None:
+            return passthrough
+
+        loop = asyncio.get_running_loop()
+        prepared = await loop.run_in_executor(
+            self._get_executor(), preprocess_image, original, self.max_edge, self.quality
+        )
+        if prepared is None or len(prepared) >= len(original):
+            return passthrough
+
+        logger.info(f"图片预处理: {len(original) / 1024:.0f}KB -> {len(prepared) / 1024:.0f}KB")
+        return PreparedImage(
+            image_url="data:image/jpeg;base64," + base64.b64encode(prepared).decode("ascii"),
+            original_bytes=len(original),
+            prepared_bytes=len(prepared),
+            processed=True
+        )
+
+    def shutdown(self):
+        """释放线程池（应用关闭时调用）"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+# 全局图片预处理器
+image_preprocessor = ImagePreprocessor(
+    enabled=env_bool("GLM_IMAGE_PREPROCESS", True),
+    max_edge=env_int("GLM_IMAGE_MAX_EDGE", 1024),
+    quality=env_int("GLM_IMAGE_QUALITY", 80),
+    workers=env_int("IMAGE_PREPROCESS_WORKERS", 2),
+)
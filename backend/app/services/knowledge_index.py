@@ -0,0 +1,132 @@
+"""
+食物知识索引 - 进程级只读缓存
+visual_portions 表在 init_extended_database.py 导入后即为静态数据，
+服务启动时一次性加载到内存，热路径不再逐请求查询数据库
+"""
+import logging
+import threading
+from operator import attrgetter
+from types import MappingProxyType
+from typing import Dict, List, Mapping, NamedTuple, Optional, Tuple
+from sqlalchemy.orm import Session
+from ..models.visual_portion import VisualPortion
+from .portion_service import PortionService
+
+logger = logging.getLogger(__name__)
+
+
+class PortionEntry(NamedTuple):
+    """单个份量选项（热量和蛋白质已预先计算）"""
+    id: int
+    food_name: str
+    portion_name: str
+    weight_grams: float
+    calories: float
+    protein: float
+    category: str
+
+    def to_option(self) -> Dict:
+        """转换为 API 使用的份量选项字典"""
+        return {
+            "id": self.id,
+            "food_name": self.food_name,
+            "portion_name": self.portion_name,
+            "weight_grams": self.weight_grams,
+            "calories": self.calories,
+            "protein": self.protein,
+            "category": self.category
+        }
+
+
+class KnowledgeIndex:
+    """
+    不可变的食物知识索引
+
+    - portions: 食物名称 -> 按PRD推荐顺序（display_rank, id）排列的份量选项
+    - first_portions: 食物名称 -> ID最小的份量选项
+    """
+
+    def __init__(self, portions: Mapping[str, Tuple[PortionEntry, ...]]):
+        self._portions = MappingProxyType(dict(portions))
+        self._first_portions = MappingProxyType({
+            food_name: min(entries, key=attrgetter("id"))
+            for food_name, entries in portions.items()
+        })
+
+    @classmethod
+    def build(cls, db: Session) -> "KnowledgeIndex":
+        """从 visual_portions 表构建索引（单次查询，数据库按展示顺序返回）"""
+        rows = db.query(VisualPortion).order_by(
+            VisualPortion.food_name, VisualPortion.display_rank, VisualPortion.id
+        ).all()
+
+        grouped: Dict[str, List[PortionEntry]] = {}
+        for p in rows:
+            grouped.setdefault(p.food_name, []).append(PortionEntry(
+                id=p.id,
+                food_name=p.food_name,
+                portion_name=p.portion_name,
+                weight_grams=p.weight_grams,
+                calories=p.get_calories(),
+                protein=p.get_protein(),
+                category=PortionService.get_food_category(p.food_name)
+            ))
+
+        return cls({name: tuple(entries) for name, entries in grouped.items()})
+
+    def __len__(self) -> int:
+        return len(self._portions)
+
+    def has_food(self, food_name: str) -> bool:
+        return food_name in self._portions
+
+    def food_names(self) -> List[str]:
+        """知识库中所有食物名称"""
+        return list(self._portions.keys())
+
+    def portion_count(self, food_name: str) -> int:
+        """该食物的份量选项数量"""
+        return len(self._portions.get(food_name, ()))
+
+    def get_portion_options(self, food_name: str) -> List[Dict]:
+        """获取按PRD顺序排列的份量选项（返回副本，调用方可自由修改）"""
+        return [entry.to_option() for entry in self._portions.get(food_name, ())]
+
+    def first_portion(self, food_name: str) -> Optional[PortionEntry]:
+        """获取该食物ID最小的份量选项（用于智能建议）"""
+        return self._first_portions.get(food_name)
+
+
+_index: Optional[KnowledgeIndex] = None
+_index_lock = threading.Lock()
+
+
+def load_knowledge_index(db: Session) -> KnowledgeIndex:
+    """重新从数据库加载知识索引并替换当前索引"""
+    global _index
+    with _index_lock:
+        index = KnowledgeIndex.build(db)
+        _index = index
+    logger.info(f"食物知识索引已加载: {len(index)} 种食物")
+    return index
+
+
+def get_knowledge_index(db: Session) -> KnowledgeIndex:
+    """
+    获取当前知识索引
+
+    索引未加载（或知识库为空）时使用传入的会话构建，
+    正常情况下不访问数据库
+    """
+    index = _index
+    if index is not None and len(index) > 0:
+        return index
+    return load_knowledge_index(db)
+
+
+def invalidate_knowledge_index():
+    """使当前索引失效，下次访问时重新从数据库加载（重新导入种子数据后调用）"""
+    global _index
+    with _index_lock:
+        _index = None
+    logger.info("食物知识索引已失效")
@@ -0,0 +1,175 @@
+"""
+食物知识库加载器 - 把种子数据同步到 visual_portions 表
+先一次性读出现有份量，与种子数据比对差异，再按 (food_name, portion_name) 唯一索引
+用 executemany 批量 upsert 新增和变化的份量（不支持 ON CONFLICT 的数据库分别批量插入和更新），
+全部在一个事务中完成；
+已有份量保留原 ID，历史 MealRecord.visual_portion_id 引用不受影响
+"""
+import logging
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.orm import Session
+from ..models.visual_portion import VisualPortion
+from ..models.meal_record import MealRecord
+from .food_catalog import FoodCatalog, food_catalog
+from .knowledge_index import invalidate_knowledge_index
+from .portion_service import PortionService
+
+logger = logging.getLogger(__name__)
+
+
+class PortionSeed(NamedTuple):
+    """一条份量种子数据"""
+    food_name: str
+    portion_name: str
+    weight_grams: float
+    calories_per_100g: float
+    protein_per_100g: float
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return self.food_name, self.portion_name
+
+
+def seeds_from_catalog(catalog: FoodCatalog) -> List[PortionSeed]:
+    """从食物知识目录生成种子数据"""
+    return [
+        PortionSeed(
+            food_name=entry.name,
+            portion_name=portion.name,
+            weight_grams=portion.weight_grams,
+            calories_per_100g=entry.calories_per_100g,
+            protein_per_100g=entry.protein_per_100g,
+        )
+        for entry in catalog
+        for portion in entry.portions
+    ]
+
+
+def load_portions(db: Session, seeds: Iterable[PortionSeed], prune: bool = False) -> Dict[str, int]:
+    """
+    把种子数据同步到 visual_portions（在一个事务中完成并提交）
+
+    Args:
+        seeds: 种子数据，(食物名称, 份量名称) 重复时以最后一条为准
+        prune: 删除种子数据中不存在的份量；已被饮食记录引用的份量保留
+
+    Returns:
+        各类变更的数量: inserted / updated / unchanged / deleted / retained
+    """
+    table = VisualPortion.__table__
+    desired: Dict[Tuple[str, str], PortionSeed] = {seed.key: seed for seed in seeds}
+    stats = {"inserted": 0, "updated": 0, "unchanged": 0, "deleted": 0, "retained": 0}
+
+    try:
+        # 现有份量：(食物, 份量) → 行
+        existing: Dict[Tuple[str, str], Tuple] = {
+            (row.food_name, row.portion_name): row
+            for row in db.execute(select(
+                table.c.id, table.c.food_name, table.c.portion_name, table.c.weight_grams,
+                table.c.calories_per_100g, table.c.protein_per_100g, table.c.display_rank
+            ))
+        }
+
+        to_write: List[Dict] = []
+        for key, seed in desired.items():
+            # 展示顺序在导入时计算，读取份量时不再排序
+            display_rank = PortionService.get_display_rank(seed.food_name, seed.portion_name)
+            row = existing.get(key)
+            if row is None:
+                stats["inserted"] += 1
+            elif (row.weight_grams, row.calories_per_100g, row.protein_per_100g, row.display_rank) != (
+                    seed.weight_grams, seed.calories_per_100g, seed.protein_per_100g, display_rank):
+                stats["updated"] += 1
+            else:
+                stats["unchanged"] += 1
+                continue
+            to_write.append(dict(seed._asdict(), display_rank=display_rank))
+
+        if to_write:
+            _upsert_portions(db, to_write, existing)
+
+        if prune:
+            stale_ids = [row.id for key, row in existing.items() if key not in desired]
+            if stale_ids:
+                referenced = _referenced_portion_ids(db, stale_ids)
+                removable = [{"portion_id": pid} for pid in stale_ids if pid not in referenced]
+                if removable:
+                    db.execute(delete(table).where(table.c.id == bindparam("portion_id")), removable)
+                stats["deleted"] = len(removable)
+                stats["retained"] = len(referenced)
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    invalidate_knowledge_index()
+    logger.info(f"知识库同步完成: {stats}")
+    return stats
+
+
+def _upsert_portions(db: Session, rows: List[Dict], existing: Dict[Tuple[str, str], Tuple]):
+    """
+    按 (food_name, portion_name) 唯一索引插入或更新份量（executemany）
+    冲突时只更新营养数据和展示顺序，保留原 ID
+    """
+    table = VisualPortion.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as upsert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as upsert
+    else:
+        upsert = None
+
+    if upsert is None:
+        # 其他数据库：按事务开始时读出的现有份量分成插入和更新两批
+        inserts = [row for row in rows if (row["food_name"], row["portion_name"]) not in existing]
+        updates = [
+            {
+                "portion_id": existing[key].id,
+                "weight_grams": row["weight_grams"],
+                "calories_per_100g": row["calories_per_100g"],
+                "protein_per_100g": row["protein_per_100g"],
+                "display_rank": row["display_rank"],
+            }
+            for row in rows
+            if (key := (row["food_name"], row["portion_name"])) in existing
+        ]
+        if inserts:
+            db.execute(insert(table), inserts)
+        if updates:
+            db.execute(update(table).where(table.c.id == bindparam("portion_id")), updates)
+        return
+
+    stmt = upsert(table)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.food_name, table.c.portion_name],
+        set_={
+            "weight_grams": stmt.excluded.weight_grams,
+            "calories_per_100g": stmt.excluded.calories_per_100g,
+            "protein_per_100g": stmt.excluded.protein_per_100g,
+            "display_rank": stmt.excluded.display_rank,
+        }
+    ), rows)
+
+
+def _referenced_portion_ids(db: Session, portion_ids: List[int]) -> set:
+    """被饮食记录引用的份量 ID"""
+    referenced = set()
+    # 分批查询，避免超过 SQLite 变量数量上限
+    for start in range(0, len(portion_ids), 500):
+        chunk = portion_ids[start:start + 500]
+        referenced.update(db.execute(
+            select(MealRecord.visual_portion_id).where(
+                MealRecord.visual_portion_id.in_(chunk)
+            ).distinct()
+        ).scalars())
+    return referenced
+
+
+def sync_food_catalog(db: Session, catalog: FoodCatalog = food_catalog,
+                      prune: bool = True) -> Dict[str, int]:
+    """把食物知识目录同步到数据库"""
+    return load_portions(db, seeds_from_catalog(catalog), prune=prune)
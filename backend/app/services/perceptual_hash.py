@@ -0,0 +1,204 @@
+"""
+感知哈希近重复检测 - 同一盘菜连拍的几张照片复用同一次识别结果
+差值哈希（dHash）+ BK 树，按汉明距离查找最近的历史识别
+"""
+import asyncio
+import io
+import logging
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+try:
+    from PIL import Image  # 可选依赖，未安装时该阶段自动停用
+except ImportError:
+    Image = None
+
+from .recognition_stages import RecognitionRequest, RecognitionStage
+
+logger = logging.getLogger(__name__)
+
+# 哈希中置位数少于该值（或多于 64 - 该值）时视为缺少结构信息
+MIN_INFORMATIVE_BITS = 8
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """两个哈希之间的汉明距离"""
+    return bin(a ^ b).count("1")
+
+
+def difference_hash(image_bytes: bytes, hash_size: int = 8) -> Optional[int]:
+    """
+    计算图片的差值哈希（dHash）
+
+    缩小为 (hash_size + 1) x hash_size 的灰度图，
+    比较每行相邻像素的明暗得到 hash_size² 位哈希
+
+    Returns:
+        哈希值；Pillow 未安装或图片无法解码时返回 None
+    """
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            img.draft("L", (hash_size * 16, hash_size * 16))  # JPEG 解码时直接降采样
+            small = img.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+            pixels = list(small.getdata())
+    except Exception:
+        return None
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+class BKTree:
+    """按汉明距离组织的 BK 树，支持阈值内最近邻查找"""
+
+    def __init__(self):
+        # 节点: [哈希, 负载, {距离: 子节点}]
+        self._root: Optional[list] = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, value: int, payload):
+        node = [value, payload, {}]
+        self._size += 1
+        if self._root is None:
+            self._root = node
+            return
+        current = self._root
+        while True:
+            distance = hamming_distance(value, current[0])
+            child = current[2].get(distance)
+            if child is None:
+                current[2][distance] = node
+                return
+            current = child
+
+    def find_nearest(self, value: int, max_distance: int, accept=None) -> Optional[Tuple[int, object]]:
+        """
+        查找距离不超过 max_distance 的最近节点
+
+        Args:
+            accept: 可选过滤函数，返回 False 的负载会被跳过
+        """
+        if self._root is None:
+            return None
+        best: Optional[Tuple[int, object]] = None
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(value, node[0])
+            if distance <= max_distance and (best is None or distance < best[0]):
+                if accept is None or accept(node[1]):
+                    best = (distance, node[1])
+            # 三角不等式剪枝：只有 |d - k| <= max_distance 的子树可能命中
+            for child_distance, child in node[2].items():
+                if abs(child_distance - distance) <= max_distance:
+                    stack.append(child)
+        return best
+
+
+class PerceptualHashStage(RecognitionStage):
+    """
+    近重复图片检测阶段
+
+    历史记录有上限，超出后丢弃最早的记录并重建 BK 树
+    """
+
+    name = "perceptual_hash"
+
+    def __init__(self, max_distance: int = 6, max_entries: int = 1024, ttl_seconds: float = 600.0):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._history: Deque[Tuple[int, float, str, Tuple[str, ...]]] = deque()
+        self._tree = BKTree()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "skipped": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return Image is not None
+
+    async def _hash(self, request: RecognitionRequest) -> Optional[int]:
+        if "perceptual_hash" not in request.extras:
+            request.extras["perceptual_hash"] = await asyncio.to_thread(difference_hash, request.image_bytes)
+        return request.extras["perceptual_hash"]
+
+    @staticmethod
+    def _is_informative(value: Optional[int]) -> bool:
+        """
+        纯色、噪点等缺少结构的图片哈希几乎全 0 或全 1，彼此距离都很近，
+        不参与近重复匹配，避免误判
+        """
+        if value is None:
+            return False
+        bits = bin(value).count("1")
+        return MIN_INFORMATIVE_BITS <= bits <= 64 - MIN_INFORMATIVE_BITS
+
+    async def lookup(self, request: RecognitionRequest) -> Optional[List[str]]:
+        if not self.enabled:
+            return None
+        value = await self._hash(request)
+        if not self._is_informative(value):
+            self._stats["skipped"] += 1
+            return None
+
+        namespace = f"{request.model}:{request.mode}"
+        oldest_allowed = time.time() - self.ttl_seconds
+        with self._lock:
+            found = self._tree.find_nearest(
+                value,
+                self.max_distance,
+                accept=lambda entry: entry[2] == namespace and entry[1] >= oldest_allowed
+            )
+            if found is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+
+        distance, entry = found
+        logger.info(f"近重复图片命中 (汉明距离 {distance})，复用识别结果: {list(entry[3])}")
+        return list(entry[3])
+
+    async def remember(self, request: RecognitionRequest, food_names: List[str]):
+        if not self.enabled:
+            return
+        value = await self._hash(request)
+        if not self._is_informative(value):
+            return
+
+        entry = (value, time.time(), f"{request.model}:{request.mode}", tuple(food_names))
+        with self._lock:
+            self._history.append(entry)
+            self._tree.add(value, entry)
+            # 超出上限 25% 时丢弃最早的记录并重建，分摊重建开销
+            if len(self._history) > self.max_entries * 1.25:
+                while len(self._history) > self.max_entries:
+                    self._history.popleft()
+                self._rebuild()
+
+    def _rebuild(self):
+        tree = BKTree()
+        for entry in self._history:
+            tree.add(entry[0], entry)
+        self._tree = tree
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "enabled": self.enabled,
+                "size": len(self._history),
+                "max_entries": self.max_entries,
+                "max_distance": self.max_distance,
+                "ttl_seconds": self.ttl_seconds,
+            }
@@ -4,7 +4,7 @@
 """
 from typing import List, Dict
 from sqlalchemy.orm import Session
-from ..models.visual_portion import VisualPortion
+from .food_catalog import food_catalog
 
 
 class FoodCategory:
@@ -15,58 +15,17 @@ class FoodCategory:
     STAPLE = "staple"       # 主食
     DAIRY = "dairy"         # 乳制品
     EGG = "egg"             # 蛋类
-    OTHER = "other"         # 其他
+    SOY = "soy"             # 豆制品
+    SNACK = "snack"         # 坚果零食
+    TAKEOUT = "takeout"     # 外卖菜品
+    BREAKFAST = "breakfast" # 早餐
+    OTHER = "other"         # 其他（不在知识库中的食物）
 
 
 class PortionService:
     """视觉份量服务"""
 
-    # 食物名称到类别的映射
-    FOOD_CATEGORY_MAP = {
-        # 肉类/禽类/鱼类
-        "鸡胸肉": FoodCategory.MEAT,
-        "牛肉": FoodCategory.MEAT,
-        "牛排": FoodCategory.MEAT,
-        "红烧肉": FoodCategory.MEAT,
-        "猪肉": FoodCategory.MEAT,
-        "排骨": FoodCategory.MEAT,
-        "五花肉": FoodCategory.MEAT,
-        "鱼": FoodCategory.MEAT,
-        "虾": FoodCategory.MEAT,
-
-        # 水果
-        "苹果": FoodCategory.FRUIT,
-        "香蕉": FoodCategory.FRUIT,
-        "橙子": FoodCategory.FRUIT,
-        "葡萄": FoodCategory.FRUIT,
-
-        # 蔬菜
-        "生菜沙拉": FoodCategory.VEGETABLE,
-        "青菜": FoodCategory.VEGETABLE,
-        "菠菜": FoodCategory.VEGETABLE,
-        "西兰花": FoodCategory.VEGETABLE,
-        "白菜": FoodCategory.VEGETABLE,
-
-        # 主食
-        "米饭": FoodCategory.STAPLE,
-        "面条": FoodCategory.STAPLE,
-        "意大利面": FoodCategory.STAPLE,
-        "全麦面包": FoodCategory.STAPLE,
-
-        # 乳制品
-        "牛奶": FoodCategory.DAIRY,
-        "酸奶": FoodCategory.DAIRY,
-        "奶酪": FoodCategory.DAIRY,
-
-        # 蛋类
-        "鸡蛋": FoodCategory.EGG,
-
-        # 豆制品
-        "豆腐": FoodCategory.OTHER,
-        "豆浆": FoodCategory.OTHER,
-    }
-
-    # 各类别推荐的份量描述模式
+    # 各类别推荐的份量描述模式（未列出的类别使用 OTHER）
     PORTION_PATTERNS = {
         FoodCategory.MEAT: [
             "掌心大小（薄切",
@@ -80,7 +39,7 @@ class PortionService:
             "拳头大小×1.5",
         ],
         FoodCategory.VEGETABLE: [
-            "一手抓起",
+            "一手抓",
             "双手一捧",
             "双手一捧×1.5",
         ],
@@ -108,15 +67,35 @@ class PortionService:
     @classmethod
     def get_food_category(cls, food_name: str) -> str:
         """
-        获取食物类别
+        获取食物类别（来自食物知识目录）
 
         Args:
             food_name: 食物名称
 
         Returns:
-            食物类别 (FoodCategory常量)
+            食物类别 (FoodCategory常量)，不在知识库中时为 OTHER
+        """
+        return food_catalog.category_of(food_name) or FoodCategory.OTHER
+
+    @classmethod
+    def get_portion_rank(cls, category: str, portion_name: str) -> int:
+        """
+        获取份量描述在该类别中的推荐顺序
+        未匹配任何模式的份量排在最后
         """
-        return cls.FOOD_CATEGORY_MAP.get(food_name, FoodCategory.OTHER)
+        pattern_priority = cls.PORTION_PATTERNS.get(category, cls.PORTION_PATTERNS[FoodCategory.OTHER])
+        for i, pattern in enumerate(pattern_priority):
+            if pattern in portion_name:
+                return i
+        return len(pattern_priority)
+
+    @classmethod
+    def get_display_rank(cls, food_name: str, portion_name: str) -> int:
+        """
+        份量选项在该食物中的展示顺序（越小越靠前，同级按 ID 排列）
+        导入知识库时计算并存入 visual_portions.display_rank，读取时无需再排序
+        """
+        return cls.get_portion_rank(cls.get_food_category(food_name), portion_name)
 
     @classmethod
     def get_portion_options_for_food(cls, db: Session, food_name: str) -> List[Dict]:
@@ -124,50 +103,18 @@ class PortionService:
         获取指定食物的视觉份量选项
         按照PRD要求的顺序返回份量选项
 
+        数据来自进程级知识索引（按预先计算的 display_rank 加载、热量预计算），不再逐请求查询数据库
+
         Args:
-            db: 数据库会话
+            db: 数据库会话（仅在索引尚未加载时使用）
             food_name: 食物名称
 
         Returns:
             份量选项列表，按推荐顺序排列
         """
-        # 获取食物类别
-        category = cls.get_food_category(food_name)
+        from .knowledge_index import get_knowledge_index
 
-        # 查询该食物的所有份量选项
-        portions = db.query(VisualPortion).filter(
-            VisualPortion.food_name == food_name
-        ).all()
-
-        if not portions:
-            return []
-
-        # 根据类别排序份量选项
-        pattern_priority = cls.PORTION_PATTERNS.get(category, [])
-
-        def sort_key(portion):
-            """排序函数：根据份量描述模式匹配优先级"""
-            portion_name = portion.portion_name
-            for i, pattern in enumerate(pattern_priority):
-                if pattern in portion_name:
-                    return i
-            return len(pattern_priority)  # 未匹配的模式排在最后
-
-        sorted_portions = sorted(portions, key=sort_key)
-
-        # 构建响应
-        return [
-            {
-                "id": p.id,
-                "food_name": p.food_name,
-                "portion_name": p.portion_name,
-                "weight_grams": p.weight_grams,
-                "calories": p.get_calories(),
-                "protein": p.get_protein(),
-                "category": category
-            }
-            for p in sorted_portions
-        ]
+        return get_knowledge_index(db).get_portion_options(food_name)
 
     @classmethod
     def get_portion_description_guide(cls, food_name: str) -> str:
@@ -188,7 +135,7 @@ class PortionService:
             FoodCategory.OTHER: "份量参照：按正常食量估算",
         }
 
-        return guides.get(category, "份量参照：按实际情况估算")
+        return guides.get(category, guides[FoodCategory.OTHER])
 
 
 # 便捷函数
@@ -0,0 +1,189 @@
+"""
+识别结果缓存 - 以图片内容哈希为键，重复提交同一张图片时跳过 GLM 调用
+内存 LRU + TTL，可选 SQLite 磁盘层（服务重启后仍然有效）；
+磁盘层的读写在线程中执行，不阻塞事件循环
+"""
+import asyncio
+import base64
+import binascii
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from ..config.settings import env_float, env_int, env_str
+
+logger = logging.getLogger(__name__)
+
+
+def decode_image_base64(image_base64: str) -> bytes:
+    """
+    解码 base64 图片（兼容 data:image/...;base64, 前缀）
+    解码失败时返回原始字符串的字节，保证仍可计算哈希
+    """
+    data = image_base64.strip()
+    if data.startswith("data:") and "," in data:
+        data = data.split(",", 1)[1]
+    try:
+        return base64.b64decode(data, validate=False)
+    except (binascii.Error, ValueError):
+        return image_base64.encode("utf-8")
+
+
+def image_digest(image_bytes: bytes) -> str:
+    """图片内容的 SHA-256 摘要"""
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+class RecognitionCache:
+    """
+    识别结果缓存
+
+    键 = 模型名称 + 识别模式 + 图片摘要，值 = 标准化后的食物名称列表
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 86400.0, db_path: str = ""):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self._entries: "OrderedDict[str, Tuple[float, Tuple[str, ...]]]" = OrderedDict()
+        self._lock = threading.Lock()        # 保护内存层和统计
+        self._disk_lock = threading.Lock()   # 串行化 SQLite 连接的使用
+        self._stats = {"hits": 0, "misses": 0, "memory_hits": 0, "disk_hits": 0, "evictions": 0}
+        self._conn: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._open_disk_tier()
+
+    @staticmethod
+    def make_key(digest: str, multi_food: bool, model: str) -> str:
+        """构建缓存键"""
+        mode = "multi" if multi_food else "single"
+        return f"{model}:{mode}:{digest}"
+
+    def _open_disk_tier(self):
+        try:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS recognition_cache ("
+                "key TEXT PRIMARY KEY, foods TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"识别缓存磁盘层不可用，仅使用内存缓存: {e}")
+            self._conn = None
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return now - created_at > self.ttl_seconds
+
+    async def get(self, key: str) -> Optional[List[str]]:
+        """查询缓存，未命中或已过期时返回 None（内存未命中时在线程中查询磁盘层）"""
+        now = time.time()
+        foods = self._memory_get(key, now)
+        if foods is not None:
+            return list(foods)
+
+        if self._conn is not None:
+            foods = await asyncio.to_thread(self._disk_get, key, now)
+        with self._lock:
+            if foods is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            self._stats["disk_hits"] += 1
+        return list(foods)
+
+    def _memory_get(self, key: str, now: float) -> Optional[Tuple[str, ...]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created_at, foods = entry
+            if self._expired(created_at, now):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            self._stats["memory_hits"] += 1
+            return foods
+
+    async def put(self, key: str, foods: List[str]):
+        """写入缓存（磁盘层在线程中写入）"""
+        now = time.time()
+        foods = tuple(foods)
+        with self._lock:
+            self._remember(key, now, foods)
+        if self._conn is not None:
+            await asyncio.to_thread(self._disk_put, key, foods, now)
+
+    def _disk_put(self, key: str, foods: Tuple[str, ...], now: float):
+        with self._disk_lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO recognition_cache (key, foods, created_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(list(foods), ensure_ascii=False), now)
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"识别缓存写入磁盘失败: {e}")
+
+    def _remember(self, key: str, created_at: float, foods: Tuple[str, ...]):
+        self._entries[key] = (created_at, foods)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[str, ...]]:
+        """查询磁盘层（在线程中执行），命中时提升到内存层"""
+        with self._disk_lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT foods, created_at FROM recognition_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                if self._expired(row[1], now):
+                    self._conn.execute("DELETE FROM recognition_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                    return None
+                foods = tuple(json.loads(row[0]))
+            except (sqlite3.Error, ValueError) as e:
+                logger.warning(f"识别缓存读取磁盘失败: {e}")
+                return None
+
+        with self._lock:
+            self._remember(key, row[1], foods)
+        return foods
+
+    def clear(self):
+        """清空缓存（内存和磁盘）"""
+        with self._lock:
+            self._entries.clear()
+        if self._conn is not None:
+            with self._disk_lock:
+                self._conn.execute("DELETE FROM recognition_cache")
+                self._conn.commit()
+
+    def stats(self) -> Dict:
+        """命中统计"""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "disk_enabled": self._conn is not None,
+            }
+
+
+# 全局识别缓存
+recognition_cache = RecognitionCache(
+    max_entries=env_int("RECOGNITION_CACHE_SIZE", 512),
+    ttl_seconds=env_float("RECOGNITION_CACHE_TTL", 86400.0),
+    db_path=env_str("RECOGNITION_CACHE_DB", ""),
+)
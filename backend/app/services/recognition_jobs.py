@@ -0,0 +1,417 @@
+"""
+异步识别任务 - 提交后立即返回任务 ID，由后台工作协程完成识别
+/api/analyze-multi 在整个 GLM 往返期间占用 HTTP 连接，移动网络下容易中断；
+任务模式下客户端轮询任务状态或订阅 SSE 事件获取识别结果和份量选项。
+任务状态保存在有界的内存存储中，可选 SQLite 持久化（服务重启后未完成的任务继续执行）
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional
+from ..config.settings import env_float, env_int, env_str
+from .deadline import Deadline
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus:
+    """任务状态"""
+    QUEUED = "queued"         # 排队中
+    RUNNING = "running"       # 识别中
+    SUCCEEDED = "succeeded"   # 已完成，result 为识别结果
+    FAILED = "failed"         # 失败，error 为错误信息
+
+    FINISHED = (SUCCEEDED, FAILED)
+
+
+class JobQueueFull(Exception):
+    """任务队列已满"""
+    pass
+
+
+class JobFailed(Exception):
+    """任务执行失败（detail 返回给客户端）"""
+
+    def __init__(self, detail: Dict):
+        super().__init__(detail.get("message", ""))
+        self.detail = detail
+
+
+class RecognitionJob:
+    """一个识别任务"""
+
+    __slots__ = ("id", "multi_food", "status", "image_base64", "result", "error",
+                 "created_at", "updated_at", "version")
+
+    def __init__(self, job_id: str, multi_food: bool, image_base64: Optional[str],
+                 status: str = JobStatus.QUEUED, result: Optional[Dict] = None,
+                 error: Optional[Dict] = None, created_at: Optional[float] = None,
+                 updated_at: Optional[float] = None):
+        now = time.time()
+        self.id = job_id
+        self.multi_food = multi_food
+        self.status = status
+        self.image_base64 = image_base64  # 任务完成后释放
+        self.result = result
+        self.error = error
+        self.created_at = created_at or now
+        self.updated_at = updated_at or now
+        self.version = 0  # 每次状态变化加一，SSE 据此判断是否需要推送
+
+    @property
+    def finished(self) -> bool:
+        return self.status in JobStatus.FINISHED
+
+    def to_dict(self) -> Dict:
+        """返回给客户端的任务状态（不含图片）"""
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "multi_food": self.multi_food,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
+class RecognitionJobStore:
+    """
+    任务存储
+
+    内存中最多保留 max_entries 个任务（超出时先淘汰最早的已完成任务），
+    已完成的任务保留 ttl_seconds；配置 db_path 时同时写入 SQLite，
+    磁盘读写在线程池中执行，不阻塞事件循环
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 3600.0, db_path: str = ""):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self._jobs: "OrderedDict[str, RecognitionJob]" = OrderedDict()
+        self._stats = {"evictions": 0, "disk_hits": 0}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disk_lock = threading.Lock()   # 串行化 SQLite 连接的使用
+        if db_path:
+            self._open_disk_tier()
+
+    def _open_disk_tier(self):
+        try:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS recognition_jobs ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, multi_food INTEGER NOT NULL, "
+                "image TEXT, result TEXT, error TEXT, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"识别任务持久化不可用，仅保存在内存中: {e}")
+            self._conn = None
+
+    def _expired(self, job: RecognitionJob, now: float) -> bool:
+        return job.finished and now - job.updated_at > self.ttl_seconds
+
+    async def add(self, job: RecognitionJob):
+        """写入新提交的任务（图片只在这里写入一次）"""
+        self._remember(job)
+        if self._conn is not None:
+            row = (job.id, job.status, int(job.multi_food), job.image_base64,
+                   _dumps(job.result), _dumps(job.error), job.created_at, job.updated_at)
+            await asyncio.to_thread(self._disk_add, row)
+
+    async def save(self, job: RecognitionJob):
+        """写入任务状态变化（不重写图片，任务完成时删除磁盘中的图片）"""
+        self._remember(job)
+        if self._conn is not None:
+            await asyncio.to_thread(
+                self._disk_save, job.id, job.status, _dumps(job.result), _dumps(job.error),
+                job.updated_at, job.finished
+            )
+
+    def _disk_add(self, row: tuple):
+        with self._disk_lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO recognition_jobs "
+                    "(id, status, multi_food, image, result, error, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"识别任务写入磁盘失败: {e}")
+
+    def _disk_save(self, job_id: str, status: str, result: Optional[str], error: Optional[str],
+                   updated_at: float, finished: bool):
+        with self._disk_lock:
+            try:
+                if finished:
+                    self._conn.execute(
+                        "UPDATE recognition_jobs SET status = ?, result = ?, error = ?, "
+                        "updated_at = ?, image = NULL WHERE id = ?",
+                        (status, result, error, updated_at, job_id)
+                    )
+                    self._conn.execute(
+                        "DELETE FROM recognition_jobs WHERE status IN (?, ?) AND updated_at < ?",
+                        (*JobStatus.FINISHED, time.time() - self.ttl_seconds)
+                    )
+                else:
+                    self._conn.execute(
+                        "UPDATE recognition_jobs SET status = ?, result = ?, error = ?, "
+                        "updated_at = ? WHERE id = ?",
+                        (status, result, error, updated_at, job_id)
+                    )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"识别任务写入磁盘失败: {e}")
+
+    def _remember(self, job: RecognitionJob):
+        self._jobs[job.id] = job
+        while len(self._jobs) > self.max_entries:
+            # 优先淘汰最早的已完成任务
+            oldest = next((key for key, cached in self._jobs.items() if cached.finished), None)
+            self._jobs.pop(oldest if oldest is not None else next(iter(self._jobs)))
+            self._stats["evictions"] += 1
+
+    async def get(self, job_id: str) -> Optional[RecognitionJob]:
+        """查询任务，不存在或已过期时返回 None"""
+        now = time.time()
+        job = self._jobs.get(job_id)
+        if job is not None:
+            if not self._expired(job, now):
+                return job
+            del self._jobs[job_id]
+            return None
+
+        if self._conn is None:
+            return None
+        job = await asyncio.to_thread(self._disk_get, job_id)
+        if job is None or self._expired(job, now):
+            return None
+        self._stats["disk_hits"] += 1
+        self._remember(job)
+        return job
+
+    def _disk_get(self, job_id: str) -> Optional[RecognitionJob]:
+        with self._disk_lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT id, status, multi_food, image, result, error, created_at, updated_at "
+                    "FROM recognition_jobs WHERE id = ?", (job_id,)
+                ).fetchone()
+                return _job_from_row(row) if row is not None else None
+            except (sqlite3.Error, ValueError) as e:
+                logger.warning(f"识别任务读取磁盘失败: {e}")
+                return None
+
+    async def unfinished(self) -> List[RecognitionJob]:
+        """磁盘中未完成的任务（服务重启前排队或执行中的任务），按提交顺序"""
+        if self._conn is None:
+            return []
+        return await asyncio.to_thread(self._disk_unfinished)
+
+    def _disk_unfinished(self) -> List[RecognitionJob]:
+        with self._disk_lock:
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, status, multi_food, image, result, error, created_at, updated_at "
+                    "FROM recognition_jobs WHERE status NOT IN (?, ?) ORDER BY created_at",
+                    JobStatus.FINISHED
+                ).fetchall()
+            except sqlite3.Error as e:
+                logger.warning(f"识别任务读取磁盘失败: {e}")
+                return []
+        return [_job_from_row(row) for row in rows]
+
+    def stats(self) -> Dict:
+        return {
+            **self._stats,
+            "size": len(self._jobs),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "disk_enabled": self._conn is not None,
+        }
+
+
+def _dumps(value: Optional[Dict]) -> Optional[str]:
+    return json.dumps(value, ensure_ascii=False) if value is not None else None
+
+
+def _job_from_row(row) -> RecognitionJob:
+    job_id, status, multi_food, image, result, error, created_at, updated_at = row
+    return RecognitionJob(
+        job_id, bool(multi_food), image, status=status,
+        result=json.loads(result) if result else None,
+        error=json.loads(error) if error else None,
+        created_at=created_at, updated_at=updated_at,
+    )
+
+
+# 任务执行函数：识别图片并返回与同步识别接口相同格式的结果，失败时抛出 JobFailed
+JobRunner = Callable[[RecognitionJob, Deadline], Awaitable[Dict]]
+
+
+class RecognitionJobManager:
+    """
+    识别任务队列和工作协程
+
+    由 app/main.py 的 startup/shutdown 钩子启动和停止；
+    提交的任务进入有界队列，workers 个工作协程按提交顺序执行，每个任务的识别不超过 job_timeout
+    """
+
+    def __init__(self, store: RecognitionJobStore, workers: int = 4, max_queue: int = 100,
+                 job_timeout: float = 30.0):
+        self.store = store
+        self.workers = workers
+        self.max_queue = max_queue
+        self.job_timeout = job_timeout
+        self._runner: Optional[JobRunner] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._active: Dict[str, RecognitionJob] = {}  # 未完成的任务，不受内存存储淘汰影响
+        self._changed: Dict[str, asyncio.Event] = {}
+        self._submitting = 0  # 正在写入磁盘、尚未入队的任务
+        self._stats = {"submitted": 0, "succeeded": 0, "failed": 0, "rejected": 0, "recovered": 0}
+
+    async def start(self, runner: JobRunner):
+        """启动工作协程，并继续执行重启前未完成的任务"""
+        self._runner = runner
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+        for job in await self.store.unfinished():
+            if job.image_base64 is None:
+                await self._finish(job, JobStatus.FAILED, error={"message": "任务数据丢失，请重新提交", "code": "JOB_LOST"})
+                continue
+            job.status = JobStatus.QUEUED
+            await self.store.save(job)
+            self._enqueue(job)
+            self._stats["recovered"] += 1
+        if self._stats["recovered"]:
+            logger.info(f"继续执行重启前未完成的识别任务: {self._stats['recovered']} 个")
+
+    async def shutdown(self):
+        """停止工作协程；执行中的任务恢复为排队状态，持久化时下次启动继续执行"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, image_base64: str, multi_food: bool) -> RecognitionJob:
+        """
+        提交识别任务
+
+        Raises:
+            JobQueueFull: 排队的任务已达上限
+        """
+        if self._queue is None:
+            raise RuntimeError("识别任务队列未启动")
+        if self._queue.qsize() + self._submitting >= self.max_queue:
+            self._stats["rejected"] += 1
+            raise JobQueueFull(f"识别任务队列已满（{self.max_queue}）")
+
+        job = RecognitionJob(uuid.uuid4().hex, multi_food, image_base64)
+        # 写入磁盘后再入队，保证工作协程更新状态时磁盘中已有这条任务
+        self._submitting += 1
+        try:
+            await self.store.add(job)
+        finally:
+            self._submitting -= 1
+        self._enqueue(job)
+        self._stats["submitted"] += 1
+        return job
+
+    def _enqueue(self, job: RecognitionJob):
+        self._active[job.id] = job
+        self._queue.put_nowait(job)
+
+    async def get(self, job_id: str) -> Optional[RecognitionJob]:
+        return self._active.get(job_id) or await self.store.get(job_id)
+
+    async def wait_for_change(self, job_id: str, version: int, timeout: float) -> bool:
+        """
+        等待任务状态变化
+
+        Returns:
+            任务版本已不是 version 时返回 True，timeout 内没有变化时返回 False
+        """
+        job = await self.get(job_id)
+        if job is None or job.version != version:
+            return True
+        event = self._changed.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _update(self, job: RecognitionJob, status: str):
+        job.status = status
+        job.updated_at = time.time()
+        job.version += 1
+        await self.store.save(job)
+        event = self._changed.pop(job.id, None)
+        if event is not None:
+            event.set()
+
+    async def _finish(self, job: RecognitionJob, status: str, result: Optional[Dict] = None,
+                error: Optional[Dict] = None):
+        job.result = result
+        job.error = error
+        job.image_base64 = None
+        self._active.pop(job.id, None)
+        await self._update(job, status)
+        self._stats[status] += 1
+
+    async def _work(self):
+        while True:
+            job: RecognitionJob = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: RecognitionJob):
+        await self._update(job, JobStatus.RUNNING)
+        try:
+            result = await self._runner(job, Deadline(self.job_timeout))
+        except JobFailed as e:
+            await self._finish(job, JobStatus.FAILED, error=e.detail)
+        except asyncio.CancelledError:
+            # 服务关闭，保留图片，下次启动时重新执行
+            await self._update(job, JobStatus.QUEUED)
+            raise
+        except Exception as e:
+            logger.error(f"识别任务 {job.id} 执行异常: {e}")
+            await self._finish(job, JobStatus.FAILED, error={"message": "识别失败，请重试", "code": "JOB_ERROR"})
+        else:
+            await self._finish(job, JobStatus.SUCCEEDED, result=result)
+
+    def stats(self) -> Dict:
+        return {
+            **self._stats,
+            "workers": len(self._tasks),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "active": len(self._active),
+            "max_queue": self.max_queue,
+            "job_timeout": self.job_timeout,
+            "store": self.store.stats(),
+        }
+
+
+# 全局识别任务管理器
+recognition_jobs = RecognitionJobManager(
+    store=RecognitionJobStore(
+        max_entries=env_int("RECOGNITION_JOB_STORE_SIZE", 1000),
+        ttl_seconds=env_float("RECOGNITION_JOB_TTL", 3600.0),
+        db_path=env_str("RECOGNITION_JOB_DB", ""),
+    ),
+    workers=env_int("RECOGNITION_JOB_WORKERS", 4),
+    max_queue=env_int("RECOGNITION_JOB_QUEUE_SIZE", 100),
+    job_timeout=env_float("RECOGNITION_JOB_TIMEOUT", 30.0),
+)
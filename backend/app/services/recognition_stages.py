@@ -0,0 +1,79 @@
+"""
+识别前置阶段 - 在调用 GLM 之前依次尝试复用已有的识别结果
+每个阶段可以命中（直接返回结果）或放行，GLM 识别成功后各阶段记录结果
+"""
+from typing import Dict, List, Optional
+from .deadline import Deadline
+from .recognition_cache import RecognitionCache, decode_image_base64, image_digest
+
+
+class RecognitionRequest:
+    """
+    一次识别请求的上下文
+    图片只解码一次，各阶段共享解码结果和摘要；deadline 为请求的截止时间（不参与缓存键）
+    """
+
+    def __init__(self, image_base64: str, multi_food: bool, model: str,
+                 deadline: Optional[Deadline] = None):
+        self.image_base64 = image_base64
+        self.multi_food = multi_food
+        self.model = model
+        self.deadline = deadline
+        self._image_bytes: Optional[bytes] = None
+        self._digest: Optional[str] = None
+        self.extras: Dict[str, object] = {}  # 各阶段的中间结果（如感知哈希）
+
+    @property
+    def image_bytes(self) -> bytes:
+        if self._image_bytes is None:
+            self._image_bytes = decode_image_base64(self.image_base64)
+        return self._image_bytes
+
+    @property
+    def digest(self) -> str:
+        if self._digest is None:
+            self._digest = image_digest(self.image_bytes)
+        return self._digest
+
+    @property
+    def mode(self) -> str:
+        return "multi" if self.multi_food else "single"
+
+    @property
+    def key(self) -> str:
+        """模型 + 识别模式 + 图片摘要，相同的键识别结果相同"""
+        return RecognitionCache.make_key(self.digest, self.multi_food, self.model)
+
+
+class RecognitionStage:
+    """识别前置阶段基类"""
+
+    name = "stage"
+
+    async def lookup(self, request: RecognitionRequest) -> Optional[List[str]]:
+        """查找可复用的识别结果，未命中返回 None"""
+        return None
+
+    async def remember(self, request: RecognitionRequest, food_names: List[str]):
+        """记录 GLM 识别结果"""
+
+    def stats(self) -> Dict:
+        return {}
+
+
+class ExactCacheStage(RecognitionStage):
+    """完全相同的图片（内容哈希一致）直接复用缓存结果"""
+
+    name = "exact_cache"
+
+    def __init__(self, cache: RecognitionCache):
+        self.cache = cache
+
+    async def lookup(self, request: RecognitionRequest) -> Optional[List[str]]:
+        return await self.cache.get(request.key)
+
+    async def remember(self, request: RecognitionRequest, food_names: List[str]):
+        await self.cache.put(request.key, food_names)
+
+    def stats(self) -> Dict:
+        return self.cache.stats()
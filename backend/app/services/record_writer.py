@@ -0,0 +1,145 @@
+"""
+饮食记录组提交 - 把短时间窗口内到达的记录写入合并为一个事务
+用餐高峰时每条记录单独提交都要一次 fsync；合并后一次提交落盘多条记录，
+每个请求仍然在自己的记录提交之后才返回，持久性不变
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Set
+from ..config.settings import env_bool, env_float, env_int
+from ..models.database import SessionLocal, run_db_write
+from ..models.meal_record import MealRecord
+from ..models.visual_portion import VisualPortion
+from ..models.daily_total import DailyTotal
+
+logger = logging.getLogger(__name__)
+
+
+class PendingRecord(NamedTuple):
+    """等待组提交的记录"""
+    visual_portion_id: int
+    image_url: str
+    food_name: Optional[str]
+    future: asyncio.Future
+
+
+class GroupCommitWriter:
+    """
+    组提交写入器
+
+    第一条记录到达后等待 window_ms，期间到达的记录一起写入；
+    攒满 max_batch 条时立即写入
+    """
+
+    def __init__(self, enabled: bool = False, window_ms: float = 5.0, max_batch: int = 64):
+        self.enabled = enabled
+        self.window_ms = window_ms
+        self.max_batch = max_batch
+        self._pending: List[PendingRecord] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushing: Set[asyncio.Task] = set()
+        self._stats = {"records": 0, "batches": 0, "largest_batch": 0, "failed_batches": 0}
+
+    async def submit(self, visual_portion_id: int, image_url: str,
+                     food_name: Optional[str] = None) -> Optional[MealRecord]:
+        """
+        提交一条记录，所在批次提交成功后返回
+
+        Returns:
+            已提交的记录（含 ID）；份量选项不存在时返回 None
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(PendingRecord(visual_portion_id, image_url, food_name, future))
+        if len(self._pending) >= self.max_batch:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_ms / 1000, self._start_flush)
+        return await future
+
+    def _start_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._flush(batch))
+            self._flushing.add(task)
+            task.add_done_callback(self._flushing.discard)
+
+    async def _flush(self, batch: List[PendingRecord]):
+        try:
+            results = await run_db_write(self._write_batch, batch)
+        except Exception as e:
+            self._stats["failed_batches"] += 1
+            logger.error(f"组提交失败（{len(batch)} 条记录）: {e}")
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+
+        self._stats["batches"] += 1
+        self._stats["records"] += len(batch)
+        self._stats["largest_batch"] = max(self._stats["largest_batch"], len(batch))
+        for item, record in zip(batch, results):
+            if not item.future.done():
+                item.future.set_result(record)
+
+    @staticmethod
+    def _write_batch(batch: List[PendingRecord]) -> List[Optional[MealRecord]]:
+        """在数据库写线程中写入一批记录：一次查询份量、一次提交"""
+        # 提交后不过期属性，返回的记录无需再 refresh 读回
+        db = SessionLocal(expire_on_commit=False)
+        try:
+            portion_ids = {item.visual_portion_id for item in batch}
+            portions: Dict[int, VisualPortion] = {
+                portion.id: portion
+                for portion in db.query(VisualPortion).filter(VisualPortion.id.in_(portion_ids))
+            }
+
+            now = datetime.utcnow()
+            results: List[Optional[MealRecord]] = []
+            for item in batch:
+                portion = portions.get(item.visual_portion_id)
+                results.append(
+                    MealRecord.from_portion(portion, item.image_url, item.food_name, now)
+                    if portion else None
+                )
+
+            records = [record for record in results if record is not None]
+            if records:
+                db.add_all(records)
+                DailyTotal.add_records(db, records)
+                db.commit()
+            return results
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def drain(self):
+        """写入所有等待中的记录（应用关闭时调用）"""
+        self._start_flush()
+        if self._flushing:
+            await asyncio.gather(*self._flushing, return_exceptions=True)
+
+    def stats(self) -> Dict:
+        batches = self._stats["batches"]
+        return {
+            **self._stats,
+            "enabled": self.enabled,
+            "window_ms": self.window_ms,
+            "max_batch": self.max_batch,
+            "pending": len(self._pending),
+            "average_batch": round(self._stats["records"] / batches, 2) if batches else 0.0,
+        }
+
+
+# 全局记录写入器（RECORD_GROUP_COMMIT=true 时启用）
+record_writer = GroupCommitWriter(
+    enabled=env_bool("RECORD_GROUP_COMMIT", False),
+    window_ms=env_float("RECORD_GROUP_COMMIT_WINDOW_MS", 5.0),
+    max_batch=env_int("RECORD_GROUP_COMMIT_MAX_BATCH", 64),
+)
@@ -0,0 +1,84 @@
+"""
+单飞（single-flight）合并 - 同一时刻的相同请求只执行一次
+前端重复提交同一张图片、或多人同时上传同一张照片时，
+相同（图片摘要 + 识别模式）的识别共享一次进行中的 GLM 调用，所有等待者拿到同一个结果或异常
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+from ..config.settings import env_bool
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """一次进行中的调用"""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    按键合并并发调用
+
+    第一个调用者启动调用（不增加额外等待），之后到达的相同键调用者等待同一个结果；
+    调用结束后立即移除，之后的请求重新调用（结果复用由识别缓存负责）。
+    单个等待者取消不影响其他等待者，所有等待者都取消后才取消调用本身
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._flights: Dict[str, _Flight] = {}
+        self._stats = {"calls": 0, "shared": 0, "errors": 0, "abandoned": 0}
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        执行 func()，相同 key 的并发调用共享同一次执行
+
+        Returns:
+            func() 的结果（所有等待者拿到同一个对象，调用方不应修改）
+        """
+        if not self.enabled:
+            return await func()
+
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.get_running_loop().create_task(func()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda task: self._finish(key, flight))
+            self._stats["calls"] += 1
+        else:
+            self._stats["shared"] += 1
+            logger.info(f"合并进行中的相同请求: {key}（等待者 {flight.waiters + 1} 个）")
+
+        flight.waiters += 1
+        try:
+            # shield：单个等待者被取消时不取消共享的调用
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+                self._stats["abandoned"] += 1
+
+    def _finish(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.task.cancelled() and flight.task.exception() is not None:
+            self._stats["errors"] += 1
+
+    def stats(self) -> Dict:
+        return {
+            **self._stats,
+            "enabled": self.enabled,
+            "in_flight": len(self._flights),
+            "waiting": sum(flight.waiters for flight in self._flights.values()),
+        }
+
+
+# 全局 GLM 识别合并器（GLM_SINGLE_FLIGHT=false 时关闭）
+glm_single_flight = SingleFlight(enabled=env_bool("GLM_SINGLE_FLIGHT", True))
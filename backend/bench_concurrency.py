@@ -0,0 +1,140 @@
+# 并发压测脚本
+# 验证 /api/analyze 不会因为 /api/records 写入而被串行阻塞
+#
+# 用法：
+#   1. 启动后端服务: uvicorn app.main:app
+#   2. python bench_concurrency.py [识别并发数] [写入并发数]
+#
+# 对比「识别 + 等量空请求（/health）」与「识别 + 写入」两组请求的延迟分布：
+# 对照组抵消了单纯的 CPU / 连接数开销，如果数据库访问阻塞了事件循环，
+# 第二组的识别延迟会明显高于对照组
+
+import sys
+import time
+import asyncio
+import statistics
+import httpx
+from typing import List
+
+# API配置
+API_BASE_URL = "http://localhost:8000/api"
+HEALTH_URL = "http://localhost:8000/health"
+TEST_IMAGE_BASE64 = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=="
+
+# 识别延迟比对照组上升超过该倍数视为被写入阻塞
+SLOWDOWN_THRESHOLD = 2.0
+
+
+class Colors:
+    """终端颜色"""
+    GREEN = "\033[92m"
+    RED = "\033[91m"
+    YELLOW = "\033[93m"
+    BLUE = "\033[94m"
+    RESET = "\033[0m"
+    BOLD = "\033[1m"
+
+
+def print_header(title: str):
+    """打印标题"""
+    print(f"\n{Colors.BLUE}{Colors.BOLD}{'='*60}{Colors.RESET}")
+    print(f"{Colors.BLUE}{Colors.BOLD}{title}{Colors.RESET}")
+    print(f"{Colors.BLUE}{Colors.BOLD}{'='*60}{Colors.RESET}\n")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """计算百分位数"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def print_latency(label: str, latencies: List[float]):
+    """打印延迟分布（毫秒）"""
+    print(f"  {label}: 请求数 {len(latencies)}, "
+          f"p50 {percentile(latencies, 50):.1f}ms, "
+          f"p95 {percentile(latencies, 95):.1f}ms, "
+          f"max {max(latencies):.1f}ms, "
+          f"平均 {statistics.mean(latencies):.1f}ms")
+
+
+async def timed_request(client: httpx.AsyncClient, method: str, url: str, **kwargs) -> float:
+    """发送请求并返回耗时（毫秒）"""
+    start = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    elapsed = (time.perf_counter() - start) * 1000
+    if response.status_code >= 500:
+        raise RuntimeError(f"{url} 返回 {response.status_code}")
+    return elapsed
+
+
+async def run_analyze(client: httpx.AsyncClient, count: int) -> List[float]:
+    """并发发送识别请求"""
+    return await asyncio.gather(*[
+        timed_request(client, "POST", f"{API_BASE_URL}/analyze", json={"image_base64": TEST_IMAGE_BASE64})
+        for _ in range(count)
+    ])
+
+
+async def run_noop(client: httpx.AsyncClient, count: int) -> List[float]:
+    """并发发送空请求（对照组）"""
+    return await asyncio.gather(*[
+        timed_request(client, "GET", HEALTH_URL)
+        for _ in range(count)
+    ])
+
+
+async def run_writes(client: httpx.AsyncClient, count: int, portion_id: int) -> List[float]:
+    """并发写入饮食记录"""
+    return await asyncio.gather(*[
+        timed_request(client, "POST", f"{API_BASE_URL}/records", json={
+            "image_url": "",
+            "food_name": "米饭",
+            "visual_portion_id": portion_id
+        })
+        for _ in range(count)
+    ])
+
+
+async def main(analyze_count: int, write_count: int) -> int:
+    print_header("并发压测：识别请求 vs 记录写入")
+
+    async with httpx.AsyncClient(timeout=60.0, limits=httpx.Limits(max_connections=200)) as client:
+        response = await client.get(f"{API_BASE_URL}/portions/米饭")
+        if response.status_code != 200:
+            print(f"{Colors.RED}✗{Colors.RESET} 无法获取份量选项，请先初始化知识库")
+            return 1
+        portion_id = response.json()["portion_options"][0]["id"]
+
+        # 预热连接
+        await run_analyze(client, 2)
+
+        print(f"{Colors.BOLD}第1组：识别（{analyze_count} 并发）+ 空请求（{write_count} 并发）{Colors.RESET}")
+        baseline, noop = await asyncio.gather(
+            run_analyze(client, analyze_count),
+            run_noop(client, write_count)
+        )
+        print_latency("识别", baseline)
+        print_latency("空请求", noop)
+
+        print(f"\n{Colors.BOLD}第2组：识别（{analyze_count} 并发）+ 写入（{write_count} 并发）{Colors.RESET}")
+        mixed_analyze, writes = await asyncio.gather(
+            run_analyze(client, analyze_count),
+            run_writes(client, write_count, portion_id)
+        )
+        print_latency("识别", mixed_analyze)
+        print_latency("写入", writes)
+
+    slowdown = percentile(mixed_analyze, 95) / max(percentile(baseline, 95), 0.001)
+    print(f"\n识别 p95 相对对照组: {slowdown:.2f} 倍")
+    if slowdown > SLOWDOWN_THRESHOLD:
+        print(f"{Colors.RED}✗{Colors.RESET} 识别请求被写入明显拖慢，事件循环可能被同步数据库调用阻塞")
+        return 1
+    print(f"{Colors.GREEN}✓{Colors.RESET} 识别请求未被写入串行阻塞")
+    return 0
+
+
+if __name__ == "__main__":
+    analyze_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    write_count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    sys.exit(asyncio.run(main(analyze_count, write_count)))
@@ -9,7 +9,8 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.models.database import Base, engine
-from app.models import visual_portion, meal_record, daily_goal  # noqa: F401
+from app.models.migrations import upgrade_schema
+from app.models import visual_portion, meal_record, daily_goal, daily_total, idempotency_key  # noqa: F401
 
 
 class Colors:
@@ -65,8 +66,9 @@ def main():
 
     print_header("Step 3: Creating Tables")
     try:
-        # Create all tables
+        # Create all tables, then upgrade existing ones (new columns and indexes)
         Base.metadata.create_all(bind=engine)
+        upgrade_schema(engine)
         print_success("All database tables created successfully")
     except Exception as e:
         print_error(f"Failed to create database tables: {str(e)}")
@@ -10,10 +10,12 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from sqlalchemy.orm import Session
 from app.models.database import Base, engine, get_db
+from app.models.migrations import upgrade_schema
 from app.models.visual_portion import VisualPortion
 from app.models.meal_record import MealRecord
 from app.models.daily_goal import DailyGoal
-from app.data.extended_food_database import EXTENDED_FOOD_DATABASE, FOOD_CATEGORIES
+from app.services.food_catalog import food_catalog
+from app.services.knowledge_loader import sync_food_catalog
 
 
 class Colors:
@@ -55,8 +57,9 @@ def create_tables():
             visual_portion, meal_record, daily_goal
         )
 
-        # 创建所有表
+        # 创建所有表，并升级旧数据库中已有的表（唯一索引、display_rank 列等）
         Base.metadata.create_all(bind=engine)
+        upgrade_schema(engine)
         print_success("数据库表创建成功")
         return True
     except Exception as e:
@@ -66,77 +69,48 @@ def create_tables():
         return False
 
 
-def clear_existing_data(db: Session) -> int:
-    """清除现有的食物数据"""
-    try:
-        count = db.query(VisualPortion).count()
-        if count > 0:
-            db.query(VisualPortion).delete()
-            db.commit()
-            print_info(f"已清除 {count} 条现有记录")
-        return count
-    except Exception as e:
-        db.rollback()
-        print_error(f"清除现有数据失败: {str(e)}")
-        return 0
-
-
 def import_food_database(db: Session) -> dict:
-    """导入食物数据到数据库"""
+    """
+    同步食物数据到数据库
+
+    与现有数据比对后批量插入/更新，已有份量保留原 ID（历史饮食记录的引用保持有效）；
+    目录中已移除的份量会被删除，仍被饮食记录引用的除外
+    """
     stats = {
-        "total_foods": len(EXTENDED_FOOD_DATABASE),
+        "total_foods": len(food_catalog),
         "imported_foods": 0,
         "imported_portions": 0,
+        "retained_portions": 0,
         "skipped_foods": 0,
         "category_stats": {},
         "errors": []
     }
 
-    print_header("开始导入食物数据")
-
-    for food_name, food_data in EXTENDED_FOOD_DATABASE.items():
-        category = food_data["category"]
-        calories_per_100g = food_data["calories_per_100g"]
-        protein_per_100g = food_data["protein_per_100g"]
-        portions = food_data["portions"]
-
-        # 统计分类
-        if category not in stats["category_stats"]:
-            stats["category_stats"][category] = {"foods": 0, "portions": 0}
-        stats["category_stats"][category]["foods"] += 1
-
-        try:
-            # 为每个份量选项创建记录
-            for i, portion in enumerate(portions):
-                visual_portion = VisualPortion(
-                    food_name=food_name,
-                    portion_name=portion["name"],
-                    weight_grams=portion["weight"],
-                    calories_per_100g=calories_per_100g,
-                    protein_per_100g=protein_per_100g
-                )
-                db.add(visual_portion)
-                stats["imported_portions"] += 1
-                stats["category_stats"][category]["portions"] += 1
-
-            stats["imported_foods"] += 1
-            print_success(f"{food_name} ({category}) - {len(portions)}个份量选项")
-
-        except Exception as e:
-            db.rollback()
-            error_msg = f"{food_name}: {str(e)}"
-            stats["errors"].append(error_msg)
-            print_error(error_msg)
-            stats["skipped_foods"] += 1
-
-    # 提交所有更改
+    print_header("开始同步食物数据")
+
     try:
-        db.commit()
-        print_success("\n所有数据导入成功")
+        changes = sync_food_catalog(db, food_catalog, prune=True)
     except Exception as e:
-        db.rollback()
-        print_error(f"\n提交数据失败: {str(e)}")
-        stats["errors"].append(f"Commit failed: {str(e)}")
+        print_error(f"同步数据失败: {str(e)}")
+        stats["errors"].append(f"Sync failed: {str(e)}")
+        stats["skipped_foods"] = len(food_catalog)
+        return stats
+
+    for entry in food_catalog:
+        portion_count = len({portion.name for portion in entry.portions})
+        category_stats = stats["category_stats"].setdefault(entry.category, {"foods": 0, "portions": 0})
+        category_stats["foods"] += 1
+        category_stats["portions"] += portion_count
+        stats["imported_foods"] += 1
+        stats["imported_portions"] += portion_count
+
+    stats["retained_portions"] = changes["retained"]
+    print_success(
+        f"新增 {changes['inserted']} 条，更新 {changes['updated']} 条，"
+        f"未变 {changes['unchanged']} 条，删除 {changes['deleted']} 条"
+    )
+    if changes["retained"]:
+        print_info(f"{changes['retained']} 条已移除的份量仍被饮食记录引用，予以保留")
 
     return stats
 
@@ -147,7 +121,7 @@ def verify_imported_data(db: Session, stats: dict) -> bool:
 
     # 验证总记录数
     total_portions = db.query(VisualPortion).count()
-    expected_portions = stats["imported_portions"]
+    expected_portions = stats["imported_portions"] + stats["retained_portions"]
 
     if total_portions != expected_portions:
         print_error(f"份量记录数不匹配: 预期 {expected_portions}, 实际 {total_portions}")
@@ -159,6 +133,8 @@ def verify_imported_data(db: Session, stats: dict) -> bool:
     from sqlalchemy import func
     unique_foods = db.query(
         func.count(func.distinct(VisualPortion.food_name))
+    ).filter(
+        VisualPortion.food_name.in_([entry.name for entry in food_catalog])
     ).scalar()
 
     if unique_foods != stats["imported_foods"]:
@@ -181,7 +157,8 @@ def verify_imported_data(db: Session, stats: dict) -> bool:
         "一杯": ["乳制品", "豆浆"]
     }
 
-    for food_name, food_data in EXTENDED_FOOD_DATABASE.items():
+    for entry in food_catalog:
+        food_name = entry.name
         portions = db.query(VisualPortion).filter(
             VisualPortion.food_name == food_name
         ).all()
@@ -193,7 +170,7 @@ def verify_imported_data(db: Session, stats: dict) -> bool:
         # 检查份量描述符合PRD
         for p in portions:
             portion_name = p.portion_name
-            food_category = food_data["category"]
+            food_category = entry.category
 
             # 验证份量描述包含PRD关键词
             has_prd_keyword = False
@@ -219,10 +196,10 @@ def print_statistics(stats: dict):
     print(f"跳过食物: {Colors.YELLOW if stats['skipped_foods'] > 0 else ''}{stats['skipped_foods']}{Colors.RESET}")
 
     print(f"\n{Colors.BOLD}分类统计:{Colors.RESET}")
-    for category_key, category_info in FOOD_CATEGORIES.items():
+    for category_key, category_info in food_catalog.categories.items():
         if category_key in stats["category_stats"]:
             cat_stats = stats["category_stats"][category_key]
-            print(f"  {category_info['icon']} {category_info['name']}: "
+            print(f"  {category_info.icon} {category_info.name}: "
                   f"{Colors.GREEN}{cat_stats['foods']}种{Colors.RESET}, "
                   f"{cat_stats['portions']}个份量选项")
 
@@ -251,10 +228,6 @@ def main():
             print_error("数据库表创建失败，终止初始化")
             return 1
 
-        # Step 2: 清除现有数据（可选，根据需要注释掉）
-        print_header("清除现有数据")
-        clear_existing_data(db)
-
         # 导入食物数据
         stats = import_food_database(db)
 
@@ -275,6 +248,7 @@ def main():
             print(f"\n{Colors.BOLD}下一步:{Colors.RESET}")
             print(f"  1. 配置 .env 文件中的 GLM_API_KEY")
             print(f"  2. 启动后端服务: uvicorn app.main:app --reload")
+            print("     （服务已在运行时，调用 POST /api/system/knowledge/reload 刷新知识索引）")
             print(f"  3. 启动前端服务: cd frontend && npm run dev")
 
     except Exception as e:
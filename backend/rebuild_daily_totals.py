@@ -0,0 +1,53 @@
+"""
+每日汇总重建脚本
+从 meal_records 全量重新计算 daily_totals
+用于批量导入/修改历史记录之后，或怀疑汇总与记录不一致时
+
+用法：
+    python rebuild_daily_totals.py                  # 按已有的 local_day 重建汇总
+    python rebuild_daily_totals.py --recompute-days # 修改 USER_TIMEZONE 后，先重新计算每条记录的 local_day
+"""
+import sys
+import os
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.database import Base, engine, SessionLocal
+from app.models.daily_total import DailyTotal
+from app.models.migrations import backfill_local_day, upgrade_schema
+from app.config.timezone import USER_TIMEZONE
+
+
+class Colors:
+    """终端颜色"""
+    GREEN = "\033[92m"
+    RED = "\033[91m"
+    RESET = "\033[0m"
+    BOLD = "\033[1m"
+
+
+def main() -> int:
+    Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+
+    db = SessionLocal()
+    try:
+        if "--recompute-days" in sys.argv[1:]:
+            updated = backfill_local_day(db.connection(), only_missing=False)
+            print(f"{Colors.GREEN}✓{Colors.RESET} 已按时区 {USER_TIMEZONE} 重新计算 {updated} 条记录的日期")
+        days = DailyTotal.rebuild(db)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"{Colors.RED}✗{Colors.RESET} 重建失败: {e}")
+        return 1
+    finally:
+        db.close()
+
+    print(f"{Colors.GREEN}✓{Colors.RESET} 每日汇总已重建: {Colors.BOLD}{days}{Colors.RESET} 天")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
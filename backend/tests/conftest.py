@@ -0,0 +1,68 @@
+"""
+单元测试公共配置
+在 backend 目录下运行: python -m pytest tests
+"""
+import asyncio
+import inspect
+import os
+import sys
+import tempfile
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 导入 app.main 时会在默认数据库上建表，测试不使用开发数据库
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'smart_food.db')}"
+
+from app.models import Base  # noqa: E402
+from app.services.admission import AdmissionController  # noqa: E402
+from app.services.circuit_breaker import CircuitBreaker  # noqa: E402
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    """async def 测试函数在新的事件循环中运行（不依赖 pytest-asyncio）"""
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+    arguments = {name: pyfuncitem.funcargs[name] for name in pyfuncitem._fixtureinfo.argnames}
+    asyncio.run(pyfuncitem.obj(**arguments))
+    return True
+
+
+def _factory(cls, **defaults):
+    """返回按 defaults 创建 cls 的函数，调用时传入的参数覆盖默认值"""
+    def make(**overrides):
+        return cls(**{**defaults, **overrides})
+    return make
+
+
+@pytest.fixture
+def make_breaker():
+    return _factory(CircuitBreaker, name="test", window=10, min_calls=4, failure_rate=0.5,
+                    slow_call_seconds=5.0, open_seconds=30.0, probe_timeout=60.0)
+
+
+@pytest.fixture
+def make_controller():
+    # 令牌充足，只测试并发上限和排队
+    return _factory(AdmissionController, name="test", rate=1000.0, burst=1000, initial_limit=2,
+                    min_limit=1, max_limit=10, max_queue=10, queue_timeout=1.0)
+
+
+@pytest.fixture
+def db_engine(tmp_path):
+    """临时 SQLite 数据库（空库，不建表）"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}",
+                           connect_args={"check_same_thread": False})
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(db_engine):
+    """已建好所有表的数据库会话"""
+    Base.metadata.create_all(bind=db_engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=db_engine)()
+    yield session
+    session.close()
@@ -0,0 +1,162 @@
+"""GLM 准入控制测试"""
+import asyncio
+import time
+import pytest
+from app.services.admission import AdmissionRejected, Outcome
+
+
+async def test_success_increases_limit_additively(make_controller):
+    controller = make_controller(initial_limit=2)
+    first = await controller.acquire()
+    second = await controller.acquire()
+
+    first.release(Outcome.SUCCESS)       # 并发 2/2，增加 1/2
+    assert controller.limit == pytest.approx(2.5)
+    second.release(Outcome.SUCCESS)      # 并发 1/2.5，没用到一半以上，不增加
+    assert controller.limit == pytest.approx(2.5)
+
+
+async def test_limit_does_not_exceed_max(make_controller):
+    controller = make_controller(initial_limit=3, max_limit=3)
+    permits = [await controller.acquire() for _ in range(3)]
+    permits[0].release(Outcome.SUCCESS)
+    assert controller.limit == 3
+
+
+async def test_overload_decreases_limit_once_per_round(make_controller):
+    controller = make_controller(initial_limit=8)
+    first = await controller.acquire()
+    second = await controller.acquire()
+
+    first.release(Outcome.OVERLOAD)
+    assert controller.limit == 4
+    # 减少之前就已发出的调用再报过载，不重复减少
+    second.release(Outcome.OVERLOAD)
+    assert controller.limit == 4
+    third = await controller.acquire()
+    third.release(Outcome.OVERLOAD)
+    assert controller.limit == 2
+
+    assert controller.stats()["overloads"] == 3
+    assert controller.stats()["decreases"] == 2
+
+
+async def test_overload_does_not_go_below_min_limit(make_controller):
+    controller = make_controller(initial_limit=2, min_limit=1)
+    for _ in range(3):
+        permit = await controller.acquire()
+        permit.release(Outcome.OVERLOAD)
+
+    assert controller.limit == 1
+    assert controller.stats()["overloads"] == 3
+    assert controller.stats()["decreases"] == 1   # 已在下限的两次不计
+
+
+async def test_ignore_keeps_limit(make_controller):
+    controller = make_controller(initial_limit=2)
+    permit = await controller.acquire()
+    permit.release(Outcome.IGNORE)
+
+    assert controller.limit == 2
+    assert controller.in_flight == 0
+
+
+async def test_waiters_are_admitted_in_arrival_order(make_controller):
+    controller = make_controller(initial_limit=1)
+    holder = await controller.acquire()
+    order = []
+
+    async def worker(index):
+        permit = await controller.acquire()
+        order.append(index)
+        await asyncio.sleep(0)
+        permit.release(Outcome.IGNORE)
+
+    tasks = []
+    for index in range(4):
+        tasks.append(asyncio.create_task(worker(index)))
+        await asyncio.sleep(0)
+    assert controller.stats()["waiting"] == 4
+    holder.release(Outcome.IGNORE)
+    await asyncio.gather(*tasks)
+
+    assert order == [0, 1, 2, 3]
+    assert controller.in_flight == 0
+    assert controller.stats()["queued"] == 4
+
+
+async def test_queue_timeout_rejects(make_controller):
+    controller = make_controller(initial_limit=1, queue_timeout=0.05)
+    holder = await controller.acquire()
+    started = time.monotonic()
+    with pytest.raises(AdmissionRejected):
+        await controller.acquire()
+    waited = time.monotonic() - started
+    holder.release()
+
+    assert 0.04 <= waited < 0.5
+    stats = controller.stats()
+    assert stats["queue_timeouts"] == 1
+    assert stats["waiting"] == 0
+    assert stats["in_flight"] == 0
+
+
+async def test_caller_timeout_is_capped_by_queue_timeout(make_controller):
+    controller = make_controller(initial_limit=1, queue_timeout=0.05)
+    await controller.acquire()
+    started = time.monotonic()
+    with pytest.raises(AdmissionRejected):
+        await controller.acquire(timeout=10)
+    assert time.monotonic() - started < 0.5
+
+
+async def test_full_queue_rejects_immediately(make_controller):
+    controller = make_controller(initial_limit=1, max_queue=2)
+    holder = await controller.acquire()
+
+    async def worker():
+        permit = await controller.acquire()
+        permit.release()
+
+    waiters = [asyncio.create_task(worker()) for _ in range(2)]
+    await asyncio.sleep(0)
+    with pytest.raises(AdmissionRejected) as rejected:
+        await controller.acquire()
+    holder.release()
+    await asyncio.gather(*waiters)
+
+    assert "队列已满" in rejected.value.reason
+    assert controller.stats()["queue_full"] == 1
+    assert controller.in_flight == 0
+
+
+async def test_cancelled_waiter_does_not_leak_a_slot(make_controller):
+    controller = make_controller(initial_limit=1)
+    holder = await controller.acquire()
+    waiter = asyncio.create_task(controller.acquire())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+    holder.release()
+    await controller.acquire()
+
+    assert controller.in_flight == 1
+    assert controller.stats()["waiting"] == 0
+
+
+async def test_token_bucket_paces_admissions(make_controller):
+    controller = make_controller(rate=20.0, burst=1, initial_limit=10)
+    await controller.acquire()
+    started = time.monotonic()
+    second = await controller.acquire()
+
+    assert time.monotonic() - started >= 0.04
+    assert second.queued_for >= 0.04
+
+
+async def test_disabled_admits_everything(make_controller):
+    controller = make_controller(enabled=False, initial_limit=1, max_queue=0)
+    permits = [await controller.acquire() for _ in range(5)]
+
+    assert len(permits) == 5
+    assert controller.in_flight == 0
@@ -0,0 +1,161 @@
+"""熔断器测试"""
+import pytest
+from app.services import circuit_breaker
+from app.services.circuit_breaker import CircuitBreaker, CircuitState
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", fake)
+    return fake
+
+
+def open_breaker(breaker: CircuitBreaker):
+    for _ in range(breaker.min_calls):
+        assert breaker.allow_request()
+        breaker.record_failure("HTTP 500")
+    assert breaker.state == CircuitState.OPEN
+
+
+def test_stays_closed_below_min_calls(clock, make_breaker):
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.allow_request()
+
+
+def test_opens_at_failure_rate(clock, make_breaker):
+    breaker = make_breaker()
+    breaker.record_success(0.1)
+    breaker.record_success(0.1)
+    breaker.record_failure()
+    assert breaker.state == CircuitState.CLOSED  # 3 次调用，未达到 min_calls
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN    # 4 次调用，失败率 50%
+    assert not breaker.allow_request()
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_stays_closed_below_failure_rate(clock, make_breaker):
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record_success(0.1)
+    breaker.record_failure()
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_slow_calls_and_timeouts_count_as_failures(clock, make_breaker):
+    breaker = make_breaker()
+    breaker.record_success(0.1)
+    breaker.record_success(0.1)
+    breaker.record_success(6.0)
+    breaker.record_timeout(5.0)
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.stats()["slow_calls"] == 2
+
+
+def test_half_open_after_cooldown(clock, make_breaker):
+    breaker = make_breaker()
+    open_breaker(breaker)
+
+    clock.now += 29.9
+    assert not breaker.allow_request()
+    assert breaker.state == CircuitState.OPEN
+
+    clock.now += 0.1
+    assert breaker.allow_request()
+    assert breaker.state == CircuitState.HALF_OPEN
+
+
+def test_half_open_allows_a_single_probe(clock, make_breaker):
+    breaker = make_breaker()
+    open_breaker(breaker)
+    clock.now += 30
+
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    assert not breaker.allow_request()
+    assert breaker.stats()["probes"] == 1
+
+
+def test_probe_success_closes(clock, make_breaker):
+    breaker = make_breaker()
+    open_breaker(breaker)
+    clock.now += 30
+
+    assert breaker.allow_request()
+    breaker.record_success(0.1)
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.allow_request()
+    assert breaker.stats()["window_calls"] == 0
+
+
+def test_probe_failure_reopens(clock, make_breaker):
+    breaker = make_breaker()
+    open_breaker(breaker)
+    clock.now += 30
+
+    assert breaker.allow_request()
+    breaker.record_failure("HTTP 503")
+    assert breaker.state == CircuitState.OPEN
+    assert not breaker.allow_request()
+
+    clock.now += 30
+    assert breaker.allow_request()
+    assert breaker.state == CircuitState.HALF_OPEN
+
+
+def test_abandoned_probe_frees_the_slot(clock, make_breaker):
+    breaker = make_breaker()
+    open_breaker(breaker)
+    clock.now += 30
+
+    assert breaker.allow_request()
+    breaker.record_abandoned()
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_stuck_probe_is_replaced_after_probe_timeout(clock, make_breaker):
+    breaker = make_breaker()
+    open_breaker(breaker)
+    clock.now += 30
+
+    assert breaker.allow_request()
+    clock.now += 59
+    assert not breaker.allow_request()
+    clock.now += 1
+    assert breaker.allow_request()
+
+
+def test_results_while_open_are_ignored(clock, make_breaker):
+    breaker = make_breaker()
+    open_breaker(breaker)
+    breaker.record_success(0.1)
+    assert breaker.state == CircuitState.OPEN
+
+
+def test_reset_closes(clock, make_breaker):
+    breaker = make_breaker()
+    open_breaker(breaker)
+    breaker.reset()
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.allow_request()
+
+
+def test_disabled_always_allows(clock, make_breaker):
+    breaker = make_breaker(enabled=False)
+    for _ in range(10):
+        breaker.record_failure()
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.allow_request()
@@ -0,0 +1,95 @@
+"""GLM 调用经准入控制和熔断器的集成测试（模拟 GLM 客户端）"""
+import asyncio
+import httpx
+import pytest
+from app.services import ai_service
+from app.services.admission import AdmissionController
+from app.services.ai_service import AIService, GLMDeadlineExceeded, GLMError
+from app.services.circuit_breaker import CircuitBreaker, CircuitState
+from app.services.deadline import Deadline
+from app.services.glm_client import GLMHttpClient
+from app.services.recognition_stages import RecognitionRequest
+
+
+class FakeGLMClient:
+    """按 delay 秒后返回识别结果的 GLM 客户端，delay 为 None 时一直不返回（GLM 挂起）"""
+
+    is_closed = False
+
+    def __init__(self, delay=0.0, content="米饭"):
+        self.delay = delay
+        self.content = content
+        self.calls = 0
+
+    async def post(self, url, headers=None, json=None):
+        self.calls += 1
+        if self.delay is None:
+            await asyncio.Event().wait()
+        await asyncio.sleep(self.delay)
+        return httpx.Response(200, json={"choices": [{"message": {"content": self.content}}]})
+
+
+@pytest.fixture
+def glm(monkeypatch):
+    """替换 GLM 客户端、熔断器和准入控制，返回 (客户端, 熔断器)"""
+    def install(client, breaker=None):
+        breaker = breaker or CircuitBreaker("GLM")
+        monkeypatch.setenv("GLM_API_KEY", "test-key")
+        monkeypatch.setattr(GLMHttpClient, "_client", client)
+        monkeypatch.setattr(ai_service, "glm_breaker", breaker)
+        monkeypatch.setattr(ai_service, "glm_admission", AdmissionController("GLM"))
+        return client, breaker
+    return install
+
+
+async def call(deadline):
+    request = RecognitionRequest("data:image/jpeg;base64,", False, AIService.GLM_MODEL, deadline)
+    try:
+        return await AIService.call_glm_admitted(request, request.image_base64)
+    except GLMError as e:
+        return e
+
+
+def test_default_slow_call_threshold_fits_the_default_deadline():
+    assert CircuitBreaker("GLM").slow_call_seconds < Deadline.from_header(None).budget()
+
+
+async def test_slow_successes_open_the_breaker(glm, make_breaker):
+    _, breaker = glm(FakeGLMClient(delay=0.2), make_breaker(slow_call_seconds=0.1))
+
+    results = await asyncio.gather(*(call(Deadline(2.0)) for _ in range(breaker.min_calls)))
+
+    assert results == [["米饭"]] * breaker.min_calls
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.stats()["slow_calls"] == breaker.min_calls
+
+
+async def test_fast_successes_keep_the_breaker_closed(glm, make_breaker):
+    _, breaker = glm(FakeGLMClient(delay=0.01), make_breaker(slow_call_seconds=0.1))
+
+    await asyncio.gather(*(call(Deadline(2.0)) for _ in range(breaker.min_calls)))
+
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.stats()["successes"] == breaker.min_calls
+
+
+
+async def test_hung_glm_opens_the_breaker_with_default_settings(glm):
+    _, breaker = glm(FakeGLMClient(delay=None))
+
+    # 默认截止时间（没有 X-Request-Timeout-Ms 请求头），并发发出以免测试等待 min_calls 倍的预算
+    results = await asyncio.gather(*(call(Deadline.from_header(None)) for _ in range(breaker.min_calls)))
+
+    assert all(isinstance(result, GLMDeadlineExceeded) for result in results)
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.stats()["slow_calls"] == breaker.min_calls
+
+
+async def test_short_client_deadline_does_not_open_the_breaker(glm):
+    _, breaker = glm(FakeGLMClient(delay=None))
+
+    results = await asyncio.gather(*(call(Deadline.from_header("1000")) for _ in range(breaker.min_calls)))
+
+    assert all(isinstance(result, GLMDeadlineExceeded) for result in results)
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.stats()["window_calls"] == 0
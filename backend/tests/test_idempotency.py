@@ -0,0 +1,130 @@
+"""记录接口幂等键测试"""
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.api.meal import CreateRecordRequest, _idempotent_write, _stage_meal_record
+from app.main import app
+from app.models import IdempotencyKey, MealRecord, VisualPortion, get_db
+from app.models import idempotency_key
+from app.models.idempotency_key import IDEMPOTENCY_TTL
+
+
+@pytest.fixture
+def portion_ids(db):
+    portions = [
+        VisualPortion(food_name="米饭", portion_name="一小碗（约100g）", weight_grams=100,
+                      calories_per_100g=116, protein_per_100g=2.6),
+        VisualPortion(food_name="鸡蛋", portion_name="一个（约50g）", weight_grams=50,
+                      calories_per_100g=144, protein_per_100g=13.3),
+    ]
+    db.add_all(portions)
+    db.commit()
+    return [portion.id for portion in portions]
+
+
+@pytest.fixture
+def client(db):
+    # 不进入 lifespan：不启动识别任务、GLM 客户端等后台服务
+    app.dependency_overrides[get_db] = lambda: db
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
+
+
+def record_body(portion_id, food_name="米饭"):
+    return {"image_url": "data:image/jpeg;base64,", "food_name": food_name, "visual_portion_id": portion_id}
+
+
+def test_replay_returns_the_first_record(client, db, portion_ids):
+    headers = {"Idempotency-Key": "key-1"}
+    first = client.post("/api/records", json=record_body(portion_ids[0]), headers=headers)
+    retry = client.post("/api/records", json=record_body(portion_ids[0]), headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert db.query(MealRecord).count() == 1
+
+
+def test_requests_without_a_key_are_not_deduplicated(client, db, portion_ids):
+    for _ in range(2):
+        assert client.post("/api/records", json=record_body(portion_ids[0])).status_code == 200
+    assert db.query(MealRecord).count() == 2
+
+
+def test_reusing_a_key_for_a_different_body_is_rejected(client, db, portion_ids):
+    headers = {"Idempotency-Key": "key-1"}
+    assert client.post("/api/records", json=record_body(portion_ids[0]), headers=headers).status_code == 200
+
+    response = client.post("/api/records", json=record_body(portion_ids[1], "鸡蛋"), headers=headers)
+
+    assert response.status_code == 422
+    assert response.json()["detail"]["code"] == "IDEMPOTENCY_KEY_REUSED"
+    assert db.query(MealRecord).count() == 1
+
+
+def test_keys_are_scoped_per_endpoint(client, db, portion_ids):
+    headers = {"Idempotency-Key": "key-1"}
+    client.post("/api/records", json=record_body(portion_ids[0]), headers=headers)
+    batch = {"image_url": "data:image/jpeg;base64,",
+             "items": [{"food_name": "米饭", "visual_portion_id": portion_ids[0]},
+                       {"food_name": "鸡蛋", "visual_portion_id": portion_ids[1]}]}
+
+    first = client.post("/api/records/batch", json=batch, headers=headers)
+    retry = client.post("/api/records/batch", json=batch, headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json()["records"] == first.json()["records"]
+    assert db.query(MealRecord).count() == 3
+
+
+def test_concurrent_request_with_the_same_key_wins(db, db_engine, portion_ids):
+    request = CreateRecordRequest(**record_body(portion_ids[0]))
+    request_hash = IdempotencyKey.hash_request(request.model_dump(mode="json"))
+    winner = {"id": 999}
+
+    def stage():
+        # 相同键的并发请求在本次提交之前先提交
+        with Session(db_engine) as other:
+            IdempotencyKey.save(other, "records", "key-1", winner, request_hash)
+            other.commit()
+        return _stage_meal_record(db, portion_ids[0], request.image_url, request.food_name)
+
+    response = _idempotent_write(db, "records", "key-1", request, stage)
+
+    assert response == winner
+    assert db.query(MealRecord).count() == 0   # 本次暂存的记录已回滚
+
+
+def save_key(db, key, age):
+    db.add(IdempotencyKey(endpoint="records", key=key, response="{}", request_hash=None,
+                          created_at=datetime.utcnow() - age))
+    db.commit()
+
+
+def test_expired_key_is_ignored_and_replaced(client, db, portion_ids):
+    save_key(db, "key-1", IDEMPOTENCY_TTL + timedelta(minutes=1))
+
+    response = client.post("/api/records", json=record_body(portion_ids[0]), headers={"Idempotency-Key": "key-1"})
+
+    assert response.status_code == 200
+    assert db.query(MealRecord).count() == 1
+    assert db.query(IdempotencyKey).count() == 1
+
+
+def test_purge_deletes_only_expired_keys(db):
+    save_key(db, "old", IDEMPOTENCY_TTL + timedelta(minutes=1))
+    save_key(db, "new", timedelta(minutes=1))
+
+    assert IdempotencyKey.purge_expired(db) == 1
+    db.commit()
+    assert [row.key for row in db.query(IdempotencyKey)] == ["new"]
+
+
+def test_save_purges_periodically(db, monkeypatch):
+    save_key(db, "old", IDEMPOTENCY_TTL + timedelta(minutes=1))
+    monkeypatch.setattr(IdempotencyKey, "_saved_since_purge", idempotency_key.PURGE_EVERY - 1)
+
+    IdempotencyKey.save(db, "records", "fresh", {"id": 1})
+    db.commit()
+
+    assert [row.key for row in db.query(IdempotencyKey)] == ["fresh"]
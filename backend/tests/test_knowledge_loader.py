@@ -0,0 +1,53 @@
+"""知识库加载器测试"""
+import pytest
+from sqlalchemy import select
+from app.models import VisualPortion
+from app.services.knowledge_loader import PortionSeed, load_portions
+
+
+SEEDS = [
+    PortionSeed("米饭", "一小碗（约100g）", 100, 116, 2.6),
+    PortionSeed("米饭", "一大碗（约200g）", 200, 116, 2.6),
+    PortionSeed("鸡蛋", "一个（约50g）", 50, 144, 13.3),
+]
+
+
+def portions(db):
+    return {
+        (row.food_name, row.portion_name): (row.id, row.weight_grams, row.calories_per_100g)
+        for row in db.execute(select(VisualPortion.id, VisualPortion.food_name, VisualPortion.portion_name,
+                                     VisualPortion.weight_grams, VisualPortion.calories_per_100g))
+    }
+
+
+@pytest.fixture(params=["sqlite", "mysql"])
+def dialect(request, db, monkeypatch):
+    """分别测试 ON CONFLICT 路径和其他数据库使用的插入/更新路径（仍在 SQLite 上执行）"""
+    monkeypatch.setattr(db.get_bind().dialect, "name", request.param)
+    return request.param
+
+
+def test_inserts_then_updates_in_place(db, dialect):
+    stats = load_portions(db, SEEDS)
+    assert stats["inserted"] == 3
+    before = portions(db)
+
+    changed = [SEEDS[0]._replace(calories_per_100g=130), SEEDS[1], SEEDS[2],
+               PortionSeed("鸡蛋", "两个（约100g）", 100, 144, 13.3)]
+    stats = load_portions(db, changed)
+
+    assert (stats["inserted"], stats["updated"], stats["unchanged"]) == (1, 1, 2)
+    after = portions(db)
+    assert len(after) == 4
+    key = ("米饭", "一小碗（约100g）")
+    assert after[key][0] == before[key][0]   # 保留原 ID
+    assert after[key][2] == 130
+
+
+def test_prune_removes_unreferenced_portions(db, dialect):
+    load_portions(db, SEEDS)
+    stats = load_portions(db, SEEDS[:2], prune=True)
+
+    assert stats["deleted"] == 1
+    assert ("鸡蛋", "一个（约50g）") not in portions(db)
+
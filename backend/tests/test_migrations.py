@@ -0,0 +1,167 @@
+"""数据库结构升级测试：从旧版本（首个发布版本）结构的数据库升级"""
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError
+from app.config import timezone
+from app.models import Base
+from app.models.migrations import MIGRATIONS, upgrade_schema
+
+# 旧版本 create_all 建出的表结构
+BASELINE_SCHEMA = [
+    """CREATE TABLE visual_portions (
+        id INTEGER NOT NULL,
+        food_name VARCHAR(100) NOT NULL,
+        portion_name VARCHAR(100) NOT NULL,
+        weight_grams FLOAT NOT NULL,
+        calories_per_100g FLOAT NOT NULL,
+        protein_per_100g FLOAT NOT NULL,
+        PRIMARY KEY (id)
+    )""",
+    "CREATE INDEX ix_visual_portions_food_name ON visual_portions (food_name)",
+    "CREATE INDEX ix_visual_portions_id ON visual_portions (id)",
+    """CREATE TABLE daily_goals (
+        id INTEGER NOT NULL,
+        gender VARCHAR(10) NOT NULL,
+        age INTEGER NOT NULL,
+        height_cm FLOAT NOT NULL,
+        weight_kg FLOAT NOT NULL,
+        deficit_target INTEGER NOT NULL,
+        calorie_target FLOAT NOT NULL,
+        protein_target FLOAT NOT NULL,
+        created_at DATETIME,
+        PRIMARY KEY (id)
+    )""",
+    "CREATE INDEX ix_daily_goals_id ON daily_goals (id)",
+    """CREATE TABLE meal_records (
+        id INTEGER NOT NULL,
+        image_url VARCHAR(500) NOT NULL,
+        food_name VARCHAR(100) NOT NULL,
+        visual_portion_id INTEGER NOT NULL,
+        calories FLOAT NOT NULL,
+        protein FLOAT NOT NULL,
+        record_date DATETIME,
+        created_at DATETIME,
+        PRIMARY KEY (id),
+        FOREIGN KEY(visual_portion_id) REFERENCES visual_portions (id)
+    )""",
+    "CREATE INDEX ix_meal_records_record_date ON meal_records (record_date)",
+    "CREATE INDEX ix_meal_records_id ON meal_records (id)",
+]
+
+# 份量 3、5 与 1 重复，4 与 2 重复
+PORTIONS = [
+    (1, "米饭", "一小碗（约100g）", 100, 116, 2.6),
+    (2, "鸡蛋", "一个（约50g）", 50, 144, 13.3),
+    (3, "米饭", "一小碗（约100g）", 100, 116, 2.6),
+    (4, "鸡蛋", "一个（约50g）", 50, 144, 13.3),
+    (5, "米饭", "一小碗（约100g）", 100, 116, 2.6),
+    (6, "豆腐", "一小块（约100g）", 100, 76, 8.1),
+]
+
+# (id, 份量, 热量, 蛋白质, UTC 记录时间)；UTC 16:00 起为北京时间的第二天
+RECORDS = [
+    (1, 3, 116, 2.6, datetime(2026, 3, 1, 1, 0)),
+    (2, 5, 116, 2.6, datetime(2026, 3, 1, 15, 59)),
+    (3, 4, 72, 6.7, datetime(2026, 3, 1, 16, 0)),
+    (4, 2, 72, 6.7, datetime(2026, 3, 1, 23, 30)),
+    (5, 1, 116, 2.6, datetime(2026, 3, 2, 4, 0)),
+    (6, 6, 76, 8.1, datetime(2026, 3, 2, 12, 0)),
+]
+
+
+@pytest.fixture(autouse=True)
+def shanghai(monkeypatch):
+    monkeypatch.setattr(timezone, "USER_TIMEZONE", ZoneInfo("Asia/Shanghai"))
+
+
+@pytest.fixture
+def baseline_engine(db_engine):
+    """旧版本结构和数据的数据库"""
+    with db_engine.begin() as conn:
+        for statement in BASELINE_SCHEMA:
+            conn.exec_driver_sql(statement)
+        conn.execute(text(
+            "INSERT INTO visual_portions VALUES (:id, :food, :portion, :weight, :calories, :protein)"
+        ), [dict(zip(("id", "food", "portion", "weight", "calories", "protein"), row)) for row in PORTIONS])
+        conn.execute(text(
+            "INSERT INTO meal_records (id, image_url, food_name, visual_portion_id, calories, protein, "
+            "record_date, created_at) VALUES (:id, '', '', :portion, :calories, :protein, :at, :at)"
+        ), [dict(zip(("id", "portion", "calories", "protein", "at"), row)) for row in RECORDS])
+    return db_engine
+
+
+def upgrade(engine):
+    """与应用启动时相同：先建缺失的表，再执行迁移"""
+    Base.metadata.create_all(bind=engine)
+    return upgrade_schema(engine)
+
+
+def test_runs_every_migration_once(baseline_engine):
+    assert upgrade(baseline_engine) == [version for version, _, _ in MIGRATIONS]
+    assert upgrade(baseline_engine) == []
+
+
+def test_merges_duplicate_portions(baseline_engine):
+    upgrade(baseline_engine)
+
+    with baseline_engine.connect() as conn:
+        portions = conn.execute(text("SELECT id, food_name FROM visual_portions ORDER BY id")).all()
+        references = dict(conn.execute(text("SELECT id, visual_portion_id FROM meal_records")).all())
+
+    # 每组保留 ID 最小的一行
+    assert portions == [(1, "米饭"), (2, "鸡蛋"), (6, "豆腐")]
+    # 引用被删除行的记录改为引用保留的行，其他记录不变
+    assert references == {1: 1, 2: 1, 3: 2, 4: 2, 5: 1, 6: 6}
+
+
+def test_adds_unique_index_on_food_and_portion(baseline_engine):
+    upgrade(baseline_engine)
+
+    indexes = {index["name"] for index in inspect(baseline_engine).get_indexes("visual_portions")}
+    assert "ux_visual_portions_food_portion" in indexes
+    assert "ix_visual_portions_food_name" not in indexes
+    with pytest.raises(IntegrityError):
+        with baseline_engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO visual_portions (food_name, portion_name, weight_grams, calories_per_100g, "
+                "protein_per_100g) VALUES ('米饭', '一小碗（约100g）', 100, 116, 2.6)"
+            ))
+
+
+def test_backfills_local_day_and_rebuilds_daily_totals(baseline_engine):
+    upgrade(baseline_engine)
+
+    with baseline_engine.connect() as conn:
+        days = dict(conn.execute(text("SELECT id, local_day FROM meal_records")).all())
+        totals = conn.execute(text(
+            "SELECT day, calories, protein, meals_count FROM daily_totals ORDER BY day"
+        )).all()
+
+    assert days == {
+        1: "2026-03-01", 2: "2026-03-01",
+        3: "2026-03-02", 4: "2026-03-02", 5: "2026-03-02", 6: "2026-03-02",
+    }
+    assert [(day, calories, meals) for day, calories, _, meals in totals] == [
+        ("2026-03-01", 232, 2),
+        ("2026-03-02", 72 + 72 + 116 + 76, 4),
+    ]
+    assert totals[1][2] == pytest.approx(6.7 + 6.7 + 2.6 + 8.1)
+
+
+def test_adds_display_rank_and_request_hash_columns(baseline_engine):
+    upgrade(baseline_engine)
+
+    columns = inspect(baseline_engine)
+    assert "display_rank" in {column["name"] for column in columns.get_columns("visual_portions")}
+    assert "request_hash" in {column["name"] for column in columns.get_columns("idempotency_keys")}
+    assert "ix_meal_records_day_nutrition" in {
+        index["name"] for index in columns.get_indexes("meal_records")
+    }
+
+
+def test_fresh_database_upgrades_cleanly(db_engine):
+    assert upgrade(db_engine) == [version for version, _, _ in MIGRATIONS]
+    with db_engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM daily_totals")).scalar() == 0
@@ -0,0 +1,111 @@
+"""单飞合并测试"""
+import asyncio
+from app.services.single_flight import SingleFlight
+
+
+async def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = 0
+
+    async def recognize():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return ["米饭"]
+
+    results = await asyncio.gather(*(flight.do("img", recognize) for _ in range(5)))
+
+    assert calls == 1
+    assert all(result is results[0] for result in results)
+    stats = flight.stats()
+    assert stats["calls"] == 1
+    assert stats["shared"] == 4
+    assert stats["in_flight"] == 0
+
+
+async def test_different_keys_are_not_merged():
+    flight = SingleFlight()
+    calls = []
+
+    async def recognize(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return key
+
+    results = await asyncio.gather(flight.do("a", lambda: recognize("a")),
+                                   flight.do("b", lambda: recognize("b")))
+
+    assert sorted(calls) == ["a", "b"]
+    assert results == ["a", "b"]
+
+
+async def test_waiters_share_the_exception():
+    flight = SingleFlight()
+
+    async def recognize():
+        await asyncio.sleep(0.01)
+        raise ValueError("GLM 错误")
+
+    results = await asyncio.gather(*(flight.do("img", recognize) for _ in range(3)),
+                                   return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.stats()["errors"] == 1
+
+
+async def test_one_waiter_leaving_does_not_cancel_the_call():
+    flight = SingleFlight()
+    started = asyncio.Event()
+
+    async def recognize():
+        started.set()
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    first = asyncio.create_task(flight.do("img", recognize))
+    second = asyncio.create_task(flight.do("img", recognize))
+    await started.wait()
+    first.cancel()
+
+    assert await second == "ok"
+    assert first.cancelled()
+    assert flight.stats()["abandoned"] == 0
+
+
+async def test_call_is_cancelled_when_the_last_waiter_leaves():
+    flight = SingleFlight()
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def recognize():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    waiters = [asyncio.create_task(flight.do("img", recognize)) for _ in range(2)]
+    await started.wait()
+    for waiter in waiters:
+        waiter.cancel()
+    await asyncio.gather(*waiters, return_exceptions=True)
+    await asyncio.wait_for(cancelled.wait(), 1)
+    await asyncio.sleep(0)
+
+    stats = flight.stats()
+    assert stats["abandoned"] == 1
+    assert stats["in_flight"] == 0
+
+
+async def test_disabled_calls_every_time():
+    flight = SingleFlight(enabled=False)
+    calls = 0
+
+    async def recognize():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(flight.do("img", recognize) for _ in range(3)))
+    assert calls == 3
@@ -4,6 +4,7 @@
 
 const API_BASE_URL = 'http://localhost:8000/api'
 const API_TIMEOUT = 5000 // 5 seconds timeout
+const ANALYZE_DEADLINE_MARGIN = 500 // 识别截止时间比请求超时提前，留出降级响应的传输时间
 
 /**
  * API Error Types
@@ -102,6 +103,28 @@ async function fetchWithTimeout(url: string, options: RequestInit = {}, timeout
   }
 }
 
+/**
+ * Generate an Idempotency-Key for one logical submit
+ * Generate it once and reuse it for every retry of that submit
+ * crypto.randomUUID is unavailable over plain http on a LAN IP, so fall back to time + random
+ */
+export function newIdempotencyKey(): string {
+  if (typeof crypto !== 'undefined' && typeof crypto.randomUUID === 'function') {
+    return crypto.randomUUID()
+  }
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}${Math.random().toString(36).slice(2)}`
+}
+
+/**
+ * Build JSON request headers, with an optional Idempotency-Key
+ * Retrying a record request with the same key returns the first result instead of creating a duplicate
+ */
+function jsonHeaders(idempotencyKey?: string): HeadersInit {
+  return idempotencyKey
+    ? { 'Content-Type': 'application/json', 'Idempotency-Key': idempotencyKey }
+    : { 'Content-Type': 'application/json' }
+}
+
 /**
  * Get user-friendly error message from ApiError or Error
  */
@@ -151,6 +174,11 @@ export interface DailyBalanceResponse {
   suggestions: SuggestionItem[]
 }
 
+export interface BatchRecordResponse {
+  records: MealRecordResponse[]
+  balance: DailyBalanceResponse
+}
+
 export interface SuggestionItem {
   id: number
   food_name: string
@@ -227,6 +255,19 @@ export interface IpConfig {
   timestamp: number
 }
 
+// 异步识别任务
+export type RecognitionJobStatus = 'queued' | 'running' | 'succeeded' | 'failed'
+
+export interface RecognitionJobResponse {
+  job_id: string
+  status: RecognitionJobStatus
+  multi_food: boolean
+  result: Record<string, any> | null  // 识别结果，格式同 analyze / analyze-multi 接口
+  error: ApiErrorResponse | null
+  created_at: string
+  updated_at: string
+}
+
 // API错误响应类型
 export interface ApiErrorResponse {
   message: string
@@ -244,13 +285,60 @@ export const api = {
   async analyzeImage(imageBase64: string): Promise<AnalyzeImageResponse> {
     const response = await fetchWithTimeout(`${API_BASE_URL}/analyze`, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      // 告知后端的超时时间比前端超时短一些，GLM 来不及返回时降级结果能在前端放弃之前送达
+      headers: { 'Content-Type': 'application/json', 'X-Request-Timeout-Ms': String(API_TIMEOUT - ANALYZE_DEADLINE_MARGIN) },
       body: JSON.stringify({ image_base64: imageBase64 })
     })
     if (!response.ok) throw new Error('图片识别失败')
     return response.json()
   },
 
+  /**
+   * 提交异步识别任务（立即返回任务 ID）
+   */
+  async createAnalyzeJob(imageBase64: string, multiFood = true): Promise<RecognitionJobResponse> {
+    const response = await fetchWithTimeout(`${API_BASE_URL}/analyze/jobs`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ image_base64: imageBase64, multi_food: multiFood })
+    })
+    if (!response.ok) throw new Error('提交识别任务失败')
+    return response.json()
+  },
+
+  /**
+   * 查询异步识别任务状态（轮询）
+   */
+  async getAnalyzeJob(jobId: string): Promise<RecognitionJobResponse> {
+    const response = await fetchWithTimeout(`${API_BASE_URL}/analyze/jobs/${jobId}`)
+    if (!response.ok) throw new Error('查询识别任务失败')
+    return response.json()
+  },
+
+  /**
+   * 订阅异步识别任务状态（SSE），任务完成后自动关闭
+   * 返回取消订阅函数
+   */
+  watchAnalyzeJob(jobId: string, onUpdate: (job: RecognitionJobResponse) => void, onError?: () => void): () => void {
+    const source = new EventSource(`${API_BASE_URL}/analyze/jobs/${jobId}/events`)
+    const handle = (event: MessageEvent) => {
+      const job: RecognitionJobResponse = JSON.parse(event.data)
+      onUpdate(job)
+      if (job.status === 'succeeded' || job.status === 'failed') source.close()
+    }
+    for (const status of ['queued', 'running', 'succeeded', 'failed']) {
+      source.addEventListener(status, handle as EventListener)
+    }
+    source.onerror = () => {
+      // 任务完成后服务端关闭连接也会触发 error，此时已经关闭，不再重连
+      if (source.readyState !== EventSource.CLOSED) {
+        source.close()
+        onError?.()
+      }
+    }
+    return () => source.close()
+  },
+
   /**
    * 创建饮食记录
    */
@@ -258,10 +346,26 @@ export const api = {
     image_url: string
     food_name: string
     visual_portion_id: number
-  }): Promise<MealRecordResponse> {
+  }, idempotencyKey?: string): Promise<MealRecordResponse> {
     const response = await fetch(`${API_BASE_URL}/records`, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers: jsonHeaders(idempotencyKey),
+      body: JSON.stringify(data)
+    })
+    if (!response.ok) throw new Error('创建记录失败')
+    return response.json()
+  },
+
+  /**
+   * 批量创建饮食记录（多食物识别后整餐提交）
+   */
+  async createRecordsBatch(data: {
+    image_url: string
+    items: { food_name: string; visual_portion_id: number }[]
+  }, idempotencyKey?: string): Promise<BatchRecordResponse> {
+    const response = await fetch(`${API_BASE_URL}/records/batch`, {
+      method: 'POST',
+      headers: jsonHeaders(idempotencyKey),
       body: JSON.stringify(data)
     })
     if (!response.ok) throw new Error('创建记录失败')
@@ -323,10 +427,10 @@ export const api = {
   /**
    * 快速记录 - 无需拍照
    */
-  async quickRecord(visualPortionId: number): Promise<MealRecordResponse> {
+  async quickRecord(visualPortionId: number, idempotencyKey?: string): Promise<MealRecordResponse> {
     const response = await fetchWithTimeout(`${API_BASE_URL}/quick-record`, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers: jsonHeaders(idempotencyKey),
       body: JSON.stringify({ visual_portion_id: visualPortionId })
     })
     if (!response.ok) throw new Error('快速记录失败')